@@ -0,0 +1,87 @@
+"""
+Benchmark for clean_genius_metadata.
+
+Replays the Genius payload fixtures in tests/fixtures/genius through the legacy
+multi-pass cleaner (kept below for comparison) and the current pre-compiled
+implementation, checks that both produce identical output, and reports
+throughput in MB/s.
+
+Usage:
+    python -m benchmarks.bench_clean_lyrics [--repeat 200]
+"""
+
+# Standard library imports
+import argparse
+import re
+import time
+from pathlib import Path
+
+# Local application imports
+from src.utils.text_processors import clean_genius_metadata
+
+FIXTURES_DIR = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "genius"
+
+
+def legacy_clean_genius_metadata(lyrics: str) -> str:
+    """The original cleaner: seven inline regexes and two extra passes per line."""
+    if not isinstance(lyrics, str):
+        return "[Error: Invalid input]"
+
+    lyrics = re.sub(r"^\d+\s*Contributors?.+?Lyrics\s*", "", lyrics, flags=re.DOTALL | re.IGNORECASE)
+    lyrics = re.sub(r"\d*You might also like.*", "", lyrics, flags=re.DOTALL | re.IGNORECASE)
+    lyrics = re.sub(r"\d+Embed$", "", lyrics.strip())
+    lyrics = re.sub(r"\[[^\]]*\]", "", lyrics)
+    lyrics = lyrics.replace('\u200b', '')
+
+    cleaned_lines = []
+    for line in lyrics.splitlines():
+        if re.search(r"[。？！」]?\s*English:", line, re.IGNORECASE):
+            continue
+        if re.match(r"^\s*The first thing you can do is to.*", line, re.IGNORECASE):
+            continue
+        cleaned_lines.append(line)
+
+    lyrics = "\n".join(cleaned_lines)
+    lyrics = re.sub(r"(\r\n|\r|\n){2,}", "\n\n", lyrics)
+
+    return lyrics.strip()
+
+
+def load_payloads():
+    """Load the raw Genius payload fixtures, preserving their line endings."""
+    payloads = []
+    for path in sorted(FIXTURES_DIR.glob("*.txt")):
+        with open(path, encoding="utf-8", newline="") as f:
+            payloads.append(f.read())
+    return payloads
+
+
+def measure(clean, payloads, repeat):
+    """Return the throughput of a cleaner over the payloads in MB/s."""
+    total_bytes = sum(len(payload.encode("utf-8")) for payload in payloads) * repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for payload in payloads:
+            clean(payload)
+    elapsed = time.perf_counter() - start
+    return total_bytes / elapsed / 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Genius lyrics cleaner.")
+    parser.add_argument("--repeat", type=int, default=200, help="Passes over the fixture corpus.")
+    args = parser.parse_args()
+
+    payloads = load_payloads()
+    for payload in payloads:
+        assert legacy_clean_genius_metadata(payload) == clean_genius_metadata(payload)
+
+    before = measure(legacy_clean_genius_metadata, payloads, args.repeat)
+    after = measure(clean_genius_metadata, payloads, args.repeat)
+    print(f"Corpus: {len(payloads)} payloads, {args.repeat} passes (outputs identical)")
+    print(f"Before: {before:8.2f} MB/s")
+    print(f"After:  {after:8.2f} MB/s  ({after / before:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark for the table-driven katakana transliterator.
+
+Tokenizes the lyrics in benchmarks/corpus with SudachiPy, then converts every
+distinct katakana reading with Pykakasi (the previous per-token path) and with
+katakana_to_hepburn, checks that both produce identical output, and reports the
+cost per token.
+
+Usage:
+    python -m benchmarks.bench_kana_romaji [--repeat 20]
+"""
+
+# Standard library imports
+import argparse
+import time
+
+# Local application imports
+from benchmarks.run_benchmarks import load_corpus
+from src.extensions import get_kks_converter
+from src.utils.kana_romaji import katakana_to_hepburn
+from src.utils.text_processors import clean_genius_metadata, tokenize_line
+
+
+def pykakasi_hepburn(text: str) -> str:
+    """The previous per-token conversion: Pykakasi's general-purpose converter."""
+    return "".join(part['hepburn'] for part in get_kks_converter().convert(text))
+
+
+def load_readings():
+    """Return the distinct katakana readings of the corpus tokens."""
+    readings = set()
+    for texts in load_corpus().values():
+        for text in texts:
+            for line in clean_genius_metadata(text).splitlines():
+                if line.strip():
+                    readings.update(reading for _, reading, _ in tokenize_line(line))
+    return sorted(reading for reading in readings if katakana_to_hepburn(reading) is not None)
+
+
+def measure(convert, readings, repeat):
+    """Return the best time per token in microseconds over `repeat` passes."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for reading in readings:
+            convert(reading)
+        best = min(best, time.perf_counter() - start)
+    return best / len(readings) * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark katakana to Hepburn conversion.")
+    parser.add_argument("--repeat", type=int, default=20, help="Passes over the corpus readings.")
+    args = parser.parse_args()
+
+    readings = load_readings()
+    for reading in readings:
+        assert pykakasi_hepburn(reading) == katakana_to_hepburn(reading), reading
+
+    before = measure(pykakasi_hepburn, readings, args.repeat)
+    after = measure(katakana_to_hepburn, readings, args.repeat)
+    print(f"Corpus: {len(readings)} distinct katakana readings, {args.repeat} passes (outputs identical)")
+    print(f"Pykakasi: {before:8.2f} us/token")
+    print(f"Table:    {after:8.2f} us/token  ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
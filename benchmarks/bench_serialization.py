@@ -0,0 +1,130 @@
+"""
+Benchmark for the cache serialization formats of track entries.
+
+Builds a full track record (metadata, original, romanized and translated lyrics)
+for every song in benchmarks/corpus and stores it in each format: the pickled dict
+Flask-Caching used to write, the plain JSON hash fields, and msgpack fields with
+and without compression. For each format it reports the stored bytes per track,
+how many tracks fit in a megabyte, and the encode/decode cost per track.
+
+Translations are not available offline, so a lowercased copy of the romanized
+lyrics stands in for the translated lyrics (both are Latin-script text of about
+the same length; a separate string, so pickle cannot share the two). Sizes
+count field names and values only, not Redis's own per-key overhead.
+
+Usage:
+    python -m benchmarks.bench_serialization [--repeat 20]
+"""
+
+# Standard library imports
+import argparse
+import time
+
+# Third-party imports
+from cachelib.serializers import RedisSerializer
+
+# Local application imports
+from benchmarks.run_benchmarks import load_corpus
+from src.utils.serializers import JSONFieldSerializer, MsgpackFieldSerializer, zstandard
+from src.utils.text_processors import clean_genius_metadata, romanize_lyrics
+
+
+class PickledEntry:
+    """The previous format: the whole dict pickled into one string value."""
+
+    def __init__(self):
+        self.serializer = RedisSerializer()
+
+    def encode(self, record):
+        return self.serializer.dumps(record)
+
+    def decode(self, stored):
+        return self.serializer.loads(stored)
+
+    @staticmethod
+    def size(stored):
+        return len(stored)
+
+
+class HashEntry:
+    """A Redis hash with one encoded value per field."""
+
+    def __init__(self, serializer):
+        self.serializer = serializer
+
+    def encode(self, record):
+        return {field: self.serializer.dumps(value) for field, value in record.items()}
+
+    def decode(self, stored):
+        return {field: self.serializer.loads(value) for field, value in stored.items()}
+
+    @staticmethod
+    def size(stored):
+        return sum(len(field) + len(value) for field, value in stored.items())
+
+
+def load_records():
+    """Build one complete track record per corpus song."""
+    records = []
+    for category, texts in load_corpus().items():
+        for index, text in enumerate(texts):
+            original = clean_genius_metadata(text)
+            romanized = romanize_lyrics(original)
+            records.append({
+                "track_id": f"{category}{index:04d}5Yq2mH8kVbN3",
+                "song_title": f"{category} song {index}",
+                "artist_name": "Corpus Artist",
+                "artist_id": "0hCNtLu0JehylgoiP8L4Gh",
+                "album_id": "4yP0hdKOZPNshxUOjY0cZj",
+                "image_url": "https://i.scdn.co/image/ab67616d0000b273a1b2c3d4e5f6a7b8c9d0e1f2",
+                "original_lyrics": original,
+                "romanized_lyrics": romanized,
+                "translated_lyrics": romanized.lower(),
+                "youtube_url": "https://www.youtube.com/embed/dQw4w9WgXcQ",
+                "cached_at": "2025-01-01T12:00:00.000000",
+            })
+    return records
+
+
+def measure(func, items, repeat):
+    """Return the best time per item in microseconds over `repeat` passes."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter() - start)
+    return best / len(items) * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark track cache serialization formats.")
+    parser.add_argument("--repeat", type=int, default=20, help="Passes over the corpus records.")
+    args = parser.parse_args()
+
+    formats = {
+        "pickle (previous)": PickledEntry(),
+        "json fields": HashEntry(JSONFieldSerializer()),
+        "msgpack fields": HashEntry(MsgpackFieldSerializer(compression="none")),
+        "msgpack + zlib": HashEntry(MsgpackFieldSerializer(compression="zlib")),
+    }
+    if zstandard is not None:
+        formats["msgpack + zstd"] = HashEntry(MsgpackFieldSerializer(compression="zstd"))
+
+    records = load_records()
+    print(f"Corpus: {len(records)} tracks, {args.repeat} passes")
+    print(f"{'format':20} {'bytes/track':>12} {'tracks/MB':>10} {'encode us':>10} {'decode us':>10}")
+    baseline = None
+    for name, entry in formats.items():
+        stored = [entry.encode(record) for record in records]
+        assert all(entry.decode(value) == record for value, record in zip(stored, records)), name
+        size = sum(entry.size(value) for value in stored) / len(stored)
+        per_mb = 1024 * 1024 / size
+        baseline = baseline or per_mb
+        encode = measure(entry.encode, records, args.repeat)
+        decode = measure(entry.decode, stored, args.repeat)
+        print(f"{name:20} {size:12.0f} {per_mb:10.0f} {encode:10.1f} {decode:10.1f}  ({per_mb / baseline:.2f}x tracks)")
+
+
+if __name__ == "__main__":
+    main()
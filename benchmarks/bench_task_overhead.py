@@ -0,0 +1,85 @@
+"""
+Benchmark for the Flask bootstrap overhead of Celery tasks.
+
+Simulates the bootstrap work of priming a playlist: every track runs the fetch,
+romanize, translate and YouTube tasks. For each task it measures only the cost of
+providing the application context, not the task's own work:
+- "create_app per task" builds a new app for every task, as the tasks used to.
+  That means config validation, cache and Celery setup, Spotify OAuth and
+  blueprint registration each time.
+- "shared app (FlaskTask)" goes through FlaskTask.__call__, which pushes a context
+  of the process's app built once by get_flask_app().
+
+No Redis, broker or external API is contacted. Dummy API keys are set if the
+environment has none, so config validation passes.
+
+Usage:
+    python -m benchmarks.bench_task_overhead [--tracks 100] [--repeat 3]
+"""
+
+# Standard library imports
+import argparse
+import logging
+import os
+import time
+
+for variable in ("GENIUS_ACCESS_TOKEN", "SPOTIFY_CLIENT_ID", "SPOTIFY_CLIENT_SECRET", "YOUTUBE_API_KEY"):
+    os.environ.setdefault(variable, "benchmark")
+
+# Local application imports
+from src.app import create_app  # noqa: E402
+from src.celery_worker import FlaskTask, get_flask_app  # noqa: E402
+from src.extensions import celery_app  # noqa: E402
+
+# The four tasks each primed track goes through.
+TASKS_PER_TRACK = 4
+
+
+@celery_app.task(base=FlaskTask)
+def noop_task():
+    """A task with no work of its own, so only the bootstrap is measured."""
+
+
+def create_app_per_task():
+    """The previous bootstrap: build an app for the task and run it in its context."""
+    with create_app().app_context():
+        noop_task.run()
+
+
+def shared_app_task():
+    """The current bootstrap: FlaskTask pushes a context of the process's app."""
+    noop_task()
+
+
+def measure(bootstrap, tasks, repeat):
+    """Return the best time per task in microseconds over `repeat` priming runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(tasks):
+            bootstrap()
+        best = min(best, time.perf_counter() - start)
+    return best / tasks * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the per-task Flask bootstrap of Celery tasks.")
+    parser.add_argument("--tracks", type=int, default=100, help="Tracks in the simulated priming run.")
+    parser.add_argument("--repeat", type=int, default=3, help="Priming runs per bootstrap (best is reported).")
+    args = parser.parse_args()
+
+    # create_app() logs every step; keep the worker's INFO logging out of the timings.
+    logging.disable(logging.INFO)
+    get_flask_app()  # Built once per process, like worker_process_init does.
+
+    tasks = args.tracks * TASKS_PER_TRACK
+    print(f"Priming run: {args.tracks} tracks, {tasks} tasks, best of {args.repeat}")
+    print(f"{'bootstrap':26} {'us/task':>10} {'run total ms':>13}")
+    before = measure(create_app_per_task, tasks, args.repeat)
+    after = measure(shared_app_task, tasks, args.repeat)
+    print(f"{'create_app per task':26} {before:10.1f} {before * tasks / 1000:13.1f}")
+    print(f"{'shared app (FlaskTask)':26} {after:10.1f} {after * tasks / 1000:13.1f}  ({before / after:.0f}x less overhead)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Romanization Benchmark Suite
+
+Measures the lyrics pipeline in src/utils/text_processors.py on the checked-in
+corpus in benchmarks/corpus (Japanese, mixed-script and non-Japanese lyrics, stored
+as raw Genius payloads). For each corpus category it reports, per function:
+- lines/sec and tokens/sec (tokens are SudachiPy morphemes of the cleaned lyrics),
+- peak memory allocated during one pass over the category (via tracemalloc).
+
+Results are written as JSON. When a baseline JSON file is given, any throughput
+drop larger than the threshold is reported as a regression and the script exits
+with status 1.
+
+Usage:
+    python -m benchmarks.run_benchmarks [--repeat 5] [--output results.json]
+                                        [--baseline baseline.json] [--threshold 0.25]
+"""
+
+# Standard library imports
+import argparse
+import datetime
+import json
+import platform
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+
+# Local application imports
+from src.utils.text_processors import (
+    ROMANIZER_VERSION,
+    clean_genius_metadata,
+    format_processed_text,
+    romanize_lyrics,
+    token_to_romaji,
+    tokenize_line,
+)
+
+CORPUS_DIR = Path(__file__).resolve().parent / "corpus"
+CATEGORIES = ("japanese", "mixed", "non_japanese")
+
+
+def load_corpus():
+    """Load the raw payloads of each corpus category, keyed by category name."""
+    corpus = {}
+    for category in CATEGORIES:
+        corpus[category] = [
+            path.read_text(encoding="utf-8") for path in sorted((CORPUS_DIR / category).glob("*.txt"))
+        ]
+    return corpus
+
+
+def count_tokens(texts):
+    """Count the SudachiPy morphemes in the non-empty lines of the given texts."""
+    return sum(len(tokenize_line(line)) for text in texts for line in text.splitlines() if line.strip())
+
+
+def _romanize_cold(text):
+    """Romanize with an empty per-token cache, so every run does the full work."""
+    token_to_romaji.cache_clear()
+    return romanize_lyrics(text)
+
+
+def benchmark(func, inputs, repeat, lines, tokens):
+    """Time `func` over all inputs (best of `repeat` samples) and measure the peak memory of one pass."""
+    func_inputs = list(inputs)
+    for text in func_inputs:
+        func(text)  # Warm up lazy loaders (dictionaries, compiled patterns).
+
+    def one_pass():
+        for text in func_inputs:
+            func(text)
+
+    # Each timed sample loops enough passes to last at least 0.2s, and the fastest
+    # sample is kept since it is the least disturbed by other activity on the machine.
+    timer = timeit.Timer(one_pass)
+    loops, _ = timer.autorange()
+    elapsed = min(timer.repeat(repeat=repeat, number=loops)) / loops
+
+    tracemalloc.start()
+    for text in func_inputs:
+        func(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "seconds_per_pass": round(elapsed, 6),
+        "lines_per_sec": round(lines / elapsed, 1),
+        "tokens_per_sec": round(tokens / elapsed, 1),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def run(repeat):
+    """Run every benchmark on every corpus category and return the JSON-ready results."""
+    results = {}
+    for category, raw_texts in load_corpus().items():
+        cleaned = [clean_genius_metadata(text) for text in raw_texts]
+        romanized = [romanize_lyrics(text) for text in cleaned]
+        lines = sum(len(text.splitlines()) for text in cleaned)
+        tokens = count_tokens(cleaned)
+
+        cases = {
+            "clean_genius_metadata": (clean_genius_metadata, raw_texts),
+            "romanize_lyrics": (_romanize_cold, cleaned),
+            "format_processed_text": (format_processed_text, romanized),
+        }
+        for name, (func, inputs) in cases.items():
+            results[f"{name}/{category}"] = benchmark(func, inputs, repeat, lines, tokens)
+
+    return {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "romanizer_version": ROMANIZER_VERSION,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def find_regressions(current, baseline, threshold):
+    """Return a description of every throughput drop larger than `threshold` (a fraction)."""
+    regressions = []
+    for name, metrics in current["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        for metric in ("lines_per_sec", "tokens_per_sec"):
+            before, after = previous[metric], metrics[metric]
+            if before and (before - after) / before > threshold:
+                regressions.append(f"{name} {metric}: {before:.1f} -> {after:.1f} ({after / before - 1:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the lyrics romanization pipeline.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed samples per benchmark.")
+    parser.add_argument("--output", type=Path, help="Write the JSON results to this file.")
+    parser.add_argument("--baseline", type=Path, help="Compare against a previous JSON results file.")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Throughput drop (fraction) reported as a regression.")
+    args = parser.parse_args()
+
+    report = run(args.repeat)
+    for name, metrics in report["results"].items():
+        print(f"{name:40} {metrics['lines_per_sec']:>12.1f} lines/s {metrics['tokens_per_sec']:>12.1f} tokens/s "
+              f"{metrics['peak_memory_kb']:>10.1f} KiB peak")
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = find_regressions(report, baseline, args.threshold)
+        if regressions:
+            print("Performance regressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
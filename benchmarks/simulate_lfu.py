@@ -0,0 +1,162 @@
+"""
+LFU eviction simulator.
+
+Replays an access trace against a model of LFUCacheManager's history index and
+reports the hit ratio of plain LFU (scores only ever grow) against time-decayed LFU
+(see ACCESS_WEIGHT_LUA) at several half-lives and MAX_ENTRIES values.
+
+The model follows the Lua scripts: a miss stores the track with a score of one
+access weight, evicting the lowest-scored tracks (ties by key) while the index is
+full; a hit adds one access weight to the score. Favorites are not modelled, since
+they never take part in eviction.
+
+The trace is either a file with one "<unix seconds> <track id>" access per line,
+or a synthetic one: Zipf-distributed requests whose popular tracks slide through
+the catalog over time (new releases displacing old hits), mixed with a share of
+evergreen requests drawn from a fixed Zipf distribution.
+
+Usage:
+    python -m benchmarks.simulate_lfu [--max-entries 50,100,200] [--half-lives 86400,604800]
+                                      [--trace accesses.txt] [--accesses 200000] [--days 90]
+"""
+
+# Standard library imports
+import argparse
+import bisect
+import heapq
+import itertools
+import random
+
+# Same bound as LFUCacheManager.MAX_WEIGHT_EXPONENT.
+MAX_WEIGHT_EXPONENT = 64
+
+
+class LFUModel:
+    """The history index of LFUCacheManager, with decay disabled when half_life is 0."""
+
+    def __init__(self, max_entries, half_life=0):
+        self.max_entries = max_entries
+        self.half_life = half_life
+        self.epoch = None
+        self.scores = {}
+        self.heap = []  # (score, key) entries; stale ones are skipped when popped.
+
+    def _weight(self, now):
+        if self.half_life <= 0:
+            return 1.0
+        if self.epoch is None:
+            self.epoch = now
+        exponent = (now - self.epoch) / self.half_life
+        if exponent >= MAX_WEIGHT_EXPONENT:
+            factor = 2 ** -exponent
+            self.scores = {key: score * factor for key, score in self.scores.items()}
+            self.heap = [(score, key) for key, score in self.scores.items()]
+            heapq.heapify(self.heap)
+            self.epoch, exponent = now, 0
+        return 2 ** exponent
+
+    def _evict(self):
+        while True:
+            score, key = heapq.heappop(self.heap)
+            if self.scores.get(key) == score:
+                del self.scores[key]
+                return
+
+    def access(self, now, key):
+        """Record one access and return True on a cache hit."""
+        weight = self._weight(now)
+        hit = key in self.scores
+        if hit:
+            self.scores[key] += weight
+        else:
+            while len(self.scores) >= self.max_entries:
+                self._evict()
+            self.scores[key] = weight
+        heapq.heappush(self.heap, (self.scores[key], key))
+        if len(self.heap) > 4 * len(self.scores) + 1024:
+            self.heap = [(score, key) for key, score in self.scores.items()]
+            heapq.heapify(self.heap)
+        return hit
+
+
+def zipf_sampler(size, exponent, rng):
+    """Return a function drawing ranks 0..size-1 with probability proportional to 1 / (rank + 1) ** exponent."""
+    cumulative = list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(size)))
+    total = cumulative[-1]
+    return lambda: bisect.bisect_left(cumulative, rng.random() * total)
+
+
+def synthetic_trace(accesses, days, catalog, drift, evergreen, exponent, seed):
+    """Yield (timestamp, track id) pairs with drifting popularity, in time order."""
+    rng = random.Random(seed)
+    trending_rank = zipf_sampler(catalog, exponent, rng)
+    evergreen_rank = zipf_sampler(catalog, exponent, rng)
+    duration = days * 24 * 3600
+    for i in range(accesses):
+        now = duration * i / accesses
+        if rng.random() < evergreen:
+            yield now, f"evergreen_{evergreen_rank()}"
+        else:
+            # The most popular trending track moves `drift` places through the catalog per day.
+            offset = int(drift * now / (24 * 3600))
+            yield now, f"track_{offset + trending_rank()}"
+
+
+def read_trace(path):
+    """Yield (timestamp, track id) pairs from a "<unix seconds> <track id>" file."""
+    with open(path, encoding="utf-8") as trace:
+        for line in trace:
+            if line.strip():
+                timestamp, key = line.split()[:2]
+                yield float(timestamp), key
+
+
+def simulate(trace, max_entries, half_life):
+    """Replay the trace and return the hit ratio."""
+    model = LFUModel(max_entries, half_life)
+    hits = total = 0
+    for now, key in trace:
+        hits += model.access(now, key)
+        total += 1
+    return hits / total if total else 0.0
+
+
+def _int_list(text):
+    return [int(value) for value in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare plain and time-decayed LFU hit ratios on an access trace.")
+    parser.add_argument("--max-entries", type=_int_list, default=[50, 100, 200],
+                        help="Comma-separated MAX_ENTRIES values.")
+    parser.add_argument("--half-lives", type=_int_list, default=[24 * 3600, 7 * 24 * 3600, 30 * 24 * 3600],
+                        help="Comma-separated half-lives in seconds.")
+    parser.add_argument("--trace", help="Replay this trace file instead of a synthetic trace.")
+    parser.add_argument("--accesses", type=int, default=200_000, help="Synthetic trace length.")
+    parser.add_argument("--days", type=float, default=90, help="Synthetic trace duration.")
+    parser.add_argument("--catalog", type=int, default=20_000, help="Distinct tracks per synthetic popularity ranking.")
+    parser.add_argument("--drift", type=float, default=20, help="Trending tracks displaced per day.")
+    parser.add_argument("--evergreen", type=float, default=0.3, help="Share of requests for evergreen tracks.")
+    parser.add_argument("--zipf", type=float, default=1.0, help="Zipf exponent of track popularity.")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed of the synthetic trace.")
+    args = parser.parse_args()
+
+    if args.trace:
+        trace = list(read_trace(args.trace))
+        print(f"Trace: {args.trace}, {len(trace)} accesses")
+    else:
+        trace = list(synthetic_trace(args.accesses, args.days, args.catalog, args.drift,
+                                     args.evergreen, args.zipf, args.seed))
+        print(f"Synthetic trace: {len(trace)} accesses over {args.days:g} days, drift {args.drift:g} tracks/day, "
+              f"{args.evergreen:.0%} evergreen")
+
+    policies = {"lfu (no decay)": 0}
+    policies.update({f"decay, half-life {half_life / 3600:g}h": half_life for half_life in args.half_lives})
+    print(f"{'policy':28}" + "".join(f"{f'max={max_entries}':>12}" for max_entries in args.max_entries))
+    for name, half_life in policies.items():
+        ratios = [simulate(trace, max_entries, half_life) for max_entries in args.max_entries]
+        print(f"{name:28}" + "".join(f"{ratio:12.1%}" for ratio in ratios))
+
+
+if __name__ == "__main__":
+    main()
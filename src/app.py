@@ -17,6 +17,7 @@ from spotipy.oauth2 import SpotifyOAuth
 from src.config import Config
 from src.extensions import cache, celery_app
 from src.routes import main_bp
+from src.utils.metrics import metrics
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -53,6 +54,12 @@ def create_app():
     celery_app.conf.update(
         broker_url=app.config["CELERY_BROKER_URL"],
         result_backend=app.config["CELERY_RESULT_BACKEND"],
+        task_routes=app.config["CELERY_TASK_ROUTES"],
+        # Bound and health-check Celery's own Redis connections like the shared pool's.
+        redis_max_connections=Config.CACHE_OPTIONS["REDIS_MAX_CONNECTIONS"],
+        redis_backend_health_check_interval=Config.REDIS_HEALTH_CHECK_INTERVAL,
+        redis_socket_keepalive=True,
+        broker_transport_options={"health_check_interval": Config.REDIS_HEALTH_CHECK_INTERVAL},
     )
     celery_app.set_default()
     app.celery = celery_app
@@ -73,6 +80,9 @@ def create_app():
         app.cache_handler = cache_handler
         logger.info("Spotify OAuth and cache handler initialized.")
 
+    # Record request latency for /metrics
+    metrics.init_app(app)
+
     # Register blueprints
     app.register_blueprint(main_bp)
     logger.info("Blueprint '%s' registered.", main_bp.name)
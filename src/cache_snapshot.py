@@ -0,0 +1,162 @@
+"""
+Cache Snapshot CLI
+
+Exports the track cache to a file and loads it back, so that a flushed Redis or a
+new deployment starts warm instead of fetching every track from Genius, YouTube
+and Google Translate again.
+
+A snapshot holds every track hash (with its remaining TTL), the access counts,
+the history index, the access epoch and the favorites. It is a gzip-compressed
+stream of msgpack objects: a header with the format name and version, then one
+object per track or per batch of scores. Track field values are copied as stored,
+without decoding them, so a snapshot loads into any deployment that reads the
+same field encodings (see src/utils/serializers.py).
+
+Export walks the keyspace with SCAN (and ZSCAN/SSCAN for the indexes), so Redis
+keeps serving requests throughout; writes made during an export may or may not be
+included. Import sends the file in pipelined batches and overwrites tracks that
+already exist. Both directions report their throughput in entries per second.
+
+Usage:
+    python -m src.cache_snapshot export cache.snapshot.gz
+    python -m src.cache_snapshot import cache.snapshot.gz [--batch-size 500]
+"""
+
+# Standard library imports
+import argparse
+import datetime
+import gzip
+import itertools
+import logging
+import sys
+import time
+
+# Third-party imports
+import msgpack
+import redis
+
+# Local application imports
+from src.config import Config
+from src.extensions import get_redis_client
+from src.utils import cache_keys
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = "spotify-romanizer-cache"
+SNAPSHOT_VERSION = 1
+
+
+def _batches(iterable, size):
+    """Yield lists of up to `size` items."""
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def export_snapshot(client, output, key_prefix=None, batch_size=500):
+    """
+    Write a snapshot of the track cache to the binary file `output`.
+    Returns the number of tracks and of entries (tracks, scores and favorites) written.
+    """
+    key_prefix = key_prefix or Config.CACHE_KEY_PREFIX
+    packer = msgpack.Packer(use_bin_type=True)
+    output.write(packer.pack({
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "created_at": datetime.datetime.now().isoformat(),
+    }))
+
+    tracks = entries = 0
+    track_keys = client.scan_iter(match=f"{key_prefix}track_*", count=batch_size, _type="hash")
+    for batch in _batches(track_keys, batch_size):
+        pipe = client.pipeline(transaction=False)
+        for cache_key in batch:
+            pipe.hgetall(cache_key)
+            pipe.pttl(cache_key)
+        results = pipe.execute()
+        for cache_key, fields, ttl in zip(batch, results[::2], results[1::2]):
+            if fields:  # Skip tracks that expired since the SCAN.
+                output.write(packer.pack(["track", cache_key[len(key_prefix):].decode(), fields, ttl]))
+                tracks += 1
+
+    for kind, index_key in (("access", cache_keys.ACCESS_COUNT_KEY), ("history", cache_keys.HISTORY_KEY)):
+        for batch in _batches(client.zscan_iter(index_key, count=batch_size), batch_size):
+            output.write(packer.pack([kind, [[key.decode(), score] for key, score in batch]]))
+            entries += len(batch)
+    for batch in _batches(client.sscan_iter(cache_keys.FAVORITES_KEY, count=batch_size), batch_size):
+        output.write(packer.pack(["favorites", [key.decode() for key in batch]]))
+        entries += len(batch)
+    epoch = client.get(cache_keys.ACCESS_EPOCH_KEY)
+    if epoch is not None:
+        output.write(packer.pack(["epoch", epoch.decode()]))
+
+    return tracks, tracks + entries
+
+
+def import_snapshot(client, source, key_prefix=None, batch_size=500):
+    """
+    Load a snapshot from the binary file `source` into Redis, in pipelined batches.
+    Returns the number of tracks and of entries loaded.
+    """
+    key_prefix = key_prefix or Config.CACHE_KEY_PREFIX
+    unpacker = msgpack.Unpacker(source, raw=False, strict_map_key=False)
+    header = next(unpacker, None)
+    if not isinstance(header, dict) or header.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError("Not a cache snapshot file.")
+    if header.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported cache snapshot version {header.get('version')}, expected {SNAPSHOT_VERSION}.")
+
+    tracks = entries = 0
+    for batch in _batches(unpacker, batch_size):
+        pipe = client.pipeline(transaction=False)
+        for kind, *payload in batch:
+            if kind == "track":
+                key, fields, ttl = payload
+                pipe.delete(key_prefix + key)
+                pipe.hset(key_prefix + key, mapping=fields)
+                if ttl > 0:
+                    pipe.pexpire(key_prefix + key, ttl)
+                tracks += 1
+            elif kind in ("access", "history"):
+                index_key = cache_keys.ACCESS_COUNT_KEY if kind == "access" else cache_keys.HISTORY_KEY
+                pipe.zadd(index_key, dict(payload[0]))
+                entries += len(payload[0])
+            elif kind == "favorites":
+                pipe.sadd(cache_keys.FAVORITES_KEY, *payload[0])
+                entries += len(payload[0])
+            elif kind == "epoch":
+                pipe.set(cache_keys.ACCESS_EPOCH_KEY, payload[0])
+        pipe.execute()
+
+    return tracks, tracks + entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or import a snapshot of the track cache.")
+    parser.add_argument("command", choices=("export", "import"), help="Write a snapshot, or load one into Redis.")
+    parser.add_argument("path", help="The snapshot file (gzip-compressed).")
+    parser.add_argument("--batch-size", type=int, default=500, help="Keys per SCAN step and per pipeline (default: 500).")
+    args = parser.parse_args(argv)
+
+    client = get_redis_client()
+    start = time.perf_counter()
+    try:
+        if args.command == "export":
+            with gzip.open(args.path, "wb") as output:
+                tracks, entries = export_snapshot(client, output, batch_size=args.batch_size)
+        else:
+            with gzip.open(args.path, "rb") as source:
+                tracks, entries = import_snapshot(client, source, batch_size=args.batch_size)
+    except (redis.exceptions.RedisError, ValueError, OSError) as e:
+        logger.error("Cache snapshot %s failed: %s", args.command, e)
+        return 1
+
+    elapsed = time.perf_counter() - start
+    logger.info("%sed %d tracks (%d entries) in %.2fs (%.0f entries/s).",
+                args.command.capitalize(), tracks, entries, elapsed, entries / elapsed if elapsed else 0.0)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
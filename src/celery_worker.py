@@ -5,36 +5,111 @@ This module defines the background tasks that the application can offload
 to a separate worker process. It imports the shared Celery app instance.
 """
 import logging
-from deep_translator import GoogleTranslator
+import threading
+import time
+from celery import Task
+from celery.signals import task_failure, task_postrun, task_prerun, worker_process_init
+from flask import current_app, has_app_context
 from src.extensions import celery_app
-from src.utils.text_processors import format_processed_text, clean_genius_metadata, romanize_lyrics
+from src.utils.metrics import metrics
+from src.utils.text_processors import format_processed_text, clean_genius_metadata, romanize_lyrics_iter
 
 logger = logging.getLogger(__name__)
 
+_task_start_times = {}
+_flask_app = None
+_flask_app_lock = threading.Lock()
 
-@celery_app.task(bind=True)
-def fetch_and_populate_task(self, job_id, track_id, song_title, artist_name):
+
+def get_flask_app():
+    """
+    Return this worker process's Flask app, creating it on first use. create_app()
+    validates the config, initializes the cache, Celery and Spotify OAuth and registers
+    the blueprints, so it runs once per process rather than once per task.
+    """
+    global _flask_app
+    if _flask_app is None:
+        with _flask_app_lock:
+            if _flask_app is None:
+                from src.app import create_app
+                _flask_app = create_app()
+    return _flask_app
+
+
+@worker_process_init.connect
+def _init_flask_app(**kwargs):
+    """Build the app as each prefork child starts, before its first task arrives."""
+    get_flask_app()
+
+
+class FlaskTask(Task):
+    """
+    Base class of the tasks below: each run happens inside an application context of
+    the process's shared Flask app, or of the caller's app when a context is already
+    active (e.g. a task called directly from a request or a test).
+    """
+
+    def __call__(self, *args, **kwargs):
+        if has_app_context():
+            return super().__call__(*args, **kwargs)
+        with get_flask_app().app_context():
+            return super().__call__(*args, **kwargs)
+
+
+@task_prerun.connect
+def _start_task_timer(task_id=None, **kwargs):
+    _task_start_times[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def _record_task_duration(task_id=None, task=None, **kwargs):
+    """Record the task's run time and flush, so a worker's last tasks are not left unreported."""
+    start = _task_start_times.pop(task_id, None)
+    if start is not None:
+        metrics.observe("celery_task_duration_seconds", time.perf_counter() - start, {"task": task.name})
+    metrics.flush()
+
+
+@task_failure.connect
+def _record_task_failure(sender=None, **kwargs):
+    metrics.inc("celery_task_failures_total", {"task": sender.name})
+
+
+def get_translator():
+    """
+    Create the lyrics translator. deep_translator is imported here rather than at
+    module level so that the web process, which imports this module to dispatch
+    tasks, never loads it.
+    """
+    from deep_translator import GoogleTranslator
+    return GoogleTranslator(source='auto', target='en')
+
+
+@celery_app.task(bind=True, base=FlaskTask)
+def fetch_and_populate_task(self, job_id, track_id, song_title, artist_name, claim_token=None):
     """
     Primary background task to fetch Genius lyrics content for a track.
-    Imports are done inside the task to ensure app context is available.
+    It only does network I/O; romanization is handed off to romanize_and_update_cache_task.
+    Songs Genius recently had no lyrics for are not searched again (see NegativeCache).
+    `claim_token` is the in-flight claim of the fetch stage, released when done (see InFlightRegistry).
+    Imports are done inside the task so the web process can import this module cheaply.
     """
-    from src.app import create_app
-    flask_app = create_app()
-    with flask_app.app_context():
-        from src.extensions import cache
-        from src.services.genius_services import get_genius_client
-        from src.services.youtube_services import search_youtube_video
-        from src.utils.cache_manager import lfu_cache_manager
+    from src.services.genius_services import get_genius_client
+    from src.utils.cache_manager import in_flight, lfu_cache_manager, negative_cache
 
-        cache_key = f"track_{track_id}"
-        progress_key = f"priming:job:{job_id}" if job_id else None
-        logger.info("Worker: Starting content fetch for track_id: %s", track_id)
+    cache_key = f"track_{track_id}"
+    progress_key = f"priming:job:{job_id}" if job_id else None
+    logger.info("Worker: Starting content fetch for track_id: %s", track_id)
 
-        try:
+    try:
+        lyrics_text = None
+        known_missing = negative_cache.is_known_missing("genius", song_title, artist_name)
+        if known_missing:
+            logger.info("Worker: Skipping Genius search for track_id %s (recently not found).", track_id)
+        else:
             genius = get_genius_client()
             search_term = f"{song_title} {artist_name}"
             search_results = genius.search_songs(search_term)
-            lyrics_text = None
             if search_results and search_results.get('hits'):
                 hits = search_results['hits']
                 sorted_hits = sorted(hits, key=lambda h: len(h['result']['title']))
@@ -44,146 +119,195 @@ def fetch_and_populate_task(self, job_id, track_id, song_title, artist_name):
                         lyrics_text = genius.lyrics(result['id'])
                         if lyrics_text:
                             break
-            
-            lyrics_not_found_msg = "Lyrics not found for this track."
-            original_lyrics = lyrics_not_found_msg
-            romanized_lyrics = lyrics_not_found_msg
-
-            if lyrics_text:
-                cleaned_lyrics = clean_genius_metadata(lyrics_text)
-                original_lyrics = cleaned_lyrics
-                romanized_lyrics = romanize_lyrics(cleaned_lyrics)
-                translate_and_update_cache_task.delay(track_id, cleaned_lyrics)
-            
-            fetch_youtube_task.delay(track_id, song_title, artist_name)
-            
-            content = cache.get(cache_key)
-            if content:
-                content.update({
-                    "original_lyrics": original_lyrics,
-                    "romanized_lyrics": romanized_lyrics,
-                })
-                
-                is_favorite = lfu_cache_manager.redis.sismember(lfu_cache_manager.FAVORITES_KEY, cache_key)
-                timeout = 0 if is_favorite else flask_app.config.get("CACHE_DEFAULT_TIMEOUT")
-                cache.set(cache_key, content, timeout=timeout)
-                logger.info("Worker: Populated lyrics for track_id: %s", track_id)
-
-        except Exception as e:
-            logger.error("Worker: Failed to fetch lyrics for track_id '%s': %s", track_id, e, exc_info=True)
-            content = cache.get(cache_key)
-            if content:
-                content.update({
-                    "original_lyrics": "An error occurred while fetching lyrics.",
-                    "romanized_lyrics": "An error occurred.",
-                })
-                cache.set(cache_key, content)
-        finally:
-            if progress_key:
-                lfu_cache_manager.redis.incr(progress_key)
+        
+        lyrics_not_found_msg = "Lyrics not found for this track."
+        original_lyrics = lyrics_not_found_msg
+        romanized_lyrics = lyrics_not_found_msg
 
+        if lyrics_text:
+            negative_cache.clear("genius", song_title, artist_name)
+            cleaned_lyrics = clean_genius_metadata(lyrics_text)
+            original_lyrics = cleaned_lyrics
+            romanized_lyrics = "Loading..."
+            in_flight.dispatch_once(
+                "translate", track_id, translate_and_update_cache_task,
+                track_id, cleaned_lyrics, song_title, artist_name,
+            )
+        elif not known_missing:
+            negative_cache.record_miss("genius", song_title, artist_name)
+        
+        in_flight.dispatch_once("youtube", track_id, fetch_youtube_task, track_id, song_title, artist_name)
+        
+        if lfu_cache_manager.update_fields(cache_key, {
+            "original_lyrics": original_lyrics,
+            "romanized_lyrics": romanized_lyrics,
+        }):
+            logger.info("Worker: Populated lyrics for track_id: %s", track_id)
 
-@celery_app.task
-def fetch_youtube_task(track_id, song_title, artist_name):
+        # Romanization is CPU-bound, so it runs on its own queue and process pool. It reports
+        # the priming progress, unless a romanization of this track was already in flight.
+        if lyrics_text and in_flight.dispatch_once(
+            "romanize", track_id, romanize_and_update_cache_task, job_id, track_id, original_lyrics
+        ):
+            progress_key = None
+
+    except Exception as e:
+        logger.error("Worker: Failed to fetch lyrics for track_id '%s': %s", track_id, e, exc_info=True)
+        metrics.inc("celery_task_failures_total", {"task": fetch_and_populate_task.name})
+        lfu_cache_manager.update_fields(cache_key, {
+            "original_lyrics": "An error occurred while fetching lyrics.",
+            "romanized_lyrics": "An error occurred.",
+        })
+    finally:
+        in_flight.release("fetch", track_id, claim_token)
+        if progress_key:
+            lfu_cache_manager.redis.incr(progress_key)
+
+
+@celery_app.task(base=FlaskTask)
+def romanize_and_update_cache_task(job_id, track_id, lyrics, claim_token=None):
+    """
+    A CPU-bound Celery task that romanizes cleaned lyrics and updates the cache.
+    It is routed to the dedicated romanization queue (see Config.CELERY_TASK_ROUTES).
+    While a long song is processed, every ROMANIZE_PUBLISH_BATCH_LINES lines are
+    published to `romanized_lyrics_partial` so the track page can display them early.
+    """
+    from src.utils.cache_manager import in_flight, lfu_cache_manager, romaji_line_cache
+
+    cache_key = f"track_{track_id}"
+    progress_key = f"priming:job:{job_id}" if job_id else None
+    logger.info("Worker: Starting romanization for track_id: %s", track_id)
+
+    try:
+        batch_size = current_app.config["ROMANIZE_PUBLISH_BATCH_LINES"]
+        romanized_lines = []
+        for line in romanize_lyrics_iter(lyrics, line_cache=romaji_line_cache, batch_size=batch_size):
+            romanized_lines.append(line)
+            if len(romanized_lines) % batch_size == 0:
+                # Publish the growing prefix so the track page can show it right away.
+                lfu_cache_manager.update_fields(
+                    cache_key, {'romanized_lyrics_partial': "\n".join(romanized_lines)}
+                )
+
+        if lfu_cache_manager.update_fields(
+            cache_key, {'romanized_lyrics': "\n".join(romanized_lines)}, remove=['romanized_lyrics_partial']
+        ):
+            logger.info("Worker: Populated romanized lyrics for track_id: %s", track_id)
+        else:
+            logger.warning("Worker: Could not find content in cache for key %s. Romanization will be lost.", cache_key)
+
+    except Exception as e:
+        logger.error("Worker: Failed to romanize lyrics for track_id '%s': %s", track_id, e, exc_info=True)
+        metrics.inc("celery_task_failures_total", {"task": romanize_and_update_cache_task.name})
+        lfu_cache_manager.update_fields(
+            cache_key, {'romanized_lyrics': "An error occurred."}, remove=['romanized_lyrics_partial']
+        )
+    finally:
+        in_flight.release("romanize", track_id, claim_token)
+        if progress_key:
+            lfu_cache_manager.redis.incr(progress_key)
+
+
+@celery_app.task(base=FlaskTask)
+def fetch_youtube_task(track_id, song_title, artist_name, claim_token=None):
     """
     A dedicated Celery task to fetch a YouTube URL and update the cache.
+    A search that recently fell back to the placeholder video is not repeated.
     """
-    from src.app import create_app
-    flask_app = create_app()
-    with flask_app.app_context():
-        from src.extensions import cache
-        from src.services.youtube_services import search_youtube_video
-        from src.utils.cache_manager import lfu_cache_manager
+    from src.services.youtube_services import search_youtube_video
+    from src.utils.cache_manager import in_flight, lfu_cache_manager, negative_cache
 
-        cache_key = f"track_{track_id}"
-        logger.info("Worker: Starting YouTube fetch for track_id: %s", track_id)
-        
-        try:
+    cache_key = f"track_{track_id}"
+    fallback_url = current_app.config["FALLBACK_YOUTUBE_URL"]
+    logger.info("Worker: Starting YouTube fetch for track_id: %s", track_id)
+    
+    try:
+        if negative_cache.is_known_missing("youtube", song_title, artist_name):
+            logger.info("Worker: Skipping YouTube search for track_id %s (recently failed).", track_id)
+            youtube_url = fallback_url
+        else:
             youtube_url = search_youtube_video(song_title, artist_name)
-            content = cache.get(cache_key)
-            if content:
-                content['youtube_url'] = youtube_url
-                is_favorite = lfu_cache_manager.redis.sismember(lfu_cache_manager.FAVORITES_KEY, cache_key)
-                timeout = 0 if is_favorite else flask_app.config.get("CACHE_DEFAULT_TIMEOUT")
-                cache.set(cache_key, content, timeout=timeout)
-                logger.info("Worker: Successfully updated YouTube URL for track_id: %s", track_id)
-        except Exception as e:
-            logger.error("Worker: Failed to fetch YouTube URL for track_id '%s': %s", track_id, e, exc_info=True)
-            content = cache.get(cache_key)
-            if content:
-                content['youtube_url'] = flask_app.config["FALLBACK_YOUTUBE_URL"]
-                cache.set(cache_key, content)
+            if youtube_url == fallback_url:
+                negative_cache.record_miss("youtube", song_title, artist_name)
+            else:
+                negative_cache.clear("youtube", song_title, artist_name)
+        if lfu_cache_manager.update_fields(cache_key, {'youtube_url': youtube_url}):
+            logger.info("Worker: Successfully updated YouTube URL for track_id: %s", track_id)
+    except Exception as e:
+        logger.error("Worker: Failed to fetch YouTube URL for track_id '%s': %s", track_id, e, exc_info=True)
+        metrics.inc("celery_task_failures_total", {"task": fetch_youtube_task.name})
+        lfu_cache_manager.update_fields(cache_key, {'youtube_url': fallback_url})
+    finally:
+        in_flight.release("youtube", track_id, claim_token)
 
 
-@celery_app.task
-def translate_and_update_cache_task(track_id, text_to_translate):
+@celery_app.task(base=FlaskTask)
+def translate_and_update_cache_task(track_id, text_to_translate, song_title=None, artist_name=None, claim_token=None):
     """
     A Celery task to translate lyrics in the background and update the cache.
+    When the song is given, a translation that recently failed is not retried.
     """
-    from src.app import create_app
-    flask_app = create_app()
-    with flask_app.app_context():
-        from src.extensions import cache
-        from src.utils.cache_manager import lfu_cache_manager
-        
-        cache_key = f"track_{track_id}"
-        logger.info("Worker: Starting translation for track_id: %s", track_id)
+    from src.utils.cache_manager import in_flight, lfu_cache_manager, negative_cache
+    
+    cache_key = f"track_{track_id}"
+    song_known = song_title is not None and artist_name is not None
+    logger.info("Worker: Starting translation for track_id: %s", track_id)
+
+    try:
+        if song_known and negative_cache.is_known_missing("translate", song_title, artist_name):
+            logger.info("Worker: Skipping translation for track_id %s (recently failed).", track_id)
+            lfu_cache_manager.update_fields(cache_key, {'translated_lyrics': "Translation failed."})
+            return
+
+        raw_translation = get_translator().translate(text_to_translate)
+        translated_lyrics = format_processed_text(raw_translation)
         
-        try:
-            raw_translation = GoogleTranslator(source='auto', target='en').translate(text_to_translate)
-            translated_lyrics = format_processed_text(raw_translation)
-            
-            content = cache.get(cache_key)
-            if content:
-                content['translated_lyrics'] = translated_lyrics
-                
-                is_favorite = lfu_cache_manager.redis.sismember(lfu_cache_manager.FAVORITES_KEY, cache_key)
-                timeout = 0 if is_favorite else flask_app.config.get("CACHE_DEFAULT_TIMEOUT")
-                cache.set(cache_key, content, timeout=timeout)
-                
-                logger.info("Worker: Successfully translated and updated cache for track_id: %s", track_id)
-            else:
-                logger.warning("Worker: Could not find content in cache for key %s. Translation will be lost.", cache_key)
+        if song_known:
+            negative_cache.clear("translate", song_title, artist_name)
+        if lfu_cache_manager.update_fields(cache_key, {'translated_lyrics': translated_lyrics}):
+            logger.info("Worker: Successfully translated and updated cache for track_id: %s", track_id)
+        else:
+            logger.warning("Worker: Could not find content in cache for key %s. Translation will be lost.", cache_key)
 
-        except Exception as e:
-            logger.error("Worker: Failed to translate lyrics for track_id '%s': %s", track_id, e, exc_info=True)
-            content = cache.get(cache_key)
-            if content:
-                content['translated_lyrics'] = "Translation failed."
-                cache.set(cache_key, content)
+    except Exception as e:
+        logger.error("Worker: Failed to translate lyrics for track_id '%s': %s", track_id, e, exc_info=True)
+        metrics.inc("celery_task_failures_total", {"task": translate_and_update_cache_task.name})
+        if song_known:
+            negative_cache.record_miss("translate", song_title, artist_name)
+        lfu_cache_manager.update_fields(cache_key, {'translated_lyrics': "Translation failed."})
+    finally:
+        in_flight.release("translate", track_id, claim_token)
 
 
-@celery_app.task
+@celery_app.task(base=FlaskTask)
 def create_spotify_playlist_task(token_info, track_ids, playlist_name):
     """
     A Celery task to create a Spotify playlist and add tracks to it.
     """
-    from src.app import create_app
     from spotipy import Spotify
     
-    flask_app = create_app()
-    with flask_app.app_context():
-        try:
-            sp = Spotify(auth=token_info['access_token'])
-            user_id = sp.current_user()['id']
-
-            playlist_description = "Playlist created by Spotify Romanizer."
-            new_playlist = sp.user_playlist_create(
-                user=user_id, name=playlist_name, public=True, description=playlist_description
-            )
-            playlist_id = new_playlist['id']
-
-            if track_ids:
-                track_uris = [f"spotify:track:{tid}" for tid in track_ids]
-                for i in range(0, len(track_uris), 100):
-                    chunk = track_uris[i:i + 100]
-                    sp.playlist_add_items(playlist_id, chunk)
-            
-            logger.info("Worker: Successfully created playlist '%s' and added %d tracks for user %s.", 
-                        playlist_name, len(track_ids), user_id)
-
-        except Exception as e:
-            logger.error("Worker: Failed to create playlist for user. Error: %s", e, exc_info=True)
+    try:
+        sp = Spotify(auth=token_info['access_token'])
+        user_id = sp.current_user()['id']
+
+        playlist_description = "Playlist created by Spotify Romanizer."
+        new_playlist = sp.user_playlist_create(
+            user=user_id, name=playlist_name, public=True, description=playlist_description
+        )
+        playlist_id = new_playlist['id']
+
+        if track_ids:
+            track_uris = [f"spotify:track:{tid}" for tid in track_ids]
+            for i in range(0, len(track_uris), 100):
+                chunk = track_uris[i:i + 100]
+                sp.playlist_add_items(playlist_id, chunk)
+        
+        logger.info("Worker: Successfully created playlist '%s' and added %d tracks for user %s.", 
+                    playlist_name, len(track_ids), user_id)
+
+    except Exception as e:
+        logger.error("Worker: Failed to create playlist for user. Error: %s", e, exc_info=True)
+        metrics.inc("celery_task_failures_total", {"task": create_spotify_playlist_task.name})
 
 
 @celery_app.task
@@ -21,7 +21,7 @@ class Config:
     SECRET_KEY = os.urandom(64)
 
     # Cache Configuration
-    CACHE_TYPE = os.getenv("CACHE_TYPE", "RedisCache")
+    CACHE_TYPE = os.getenv("CACHE_TYPE", "src.extensions.pooled_redis_cache")
     CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://redis:6379/0")
     CACHE_DEFAULT_TIMEOUT = int(os.getenv("CACHE_DEFAULT_TIMEOUT", "10800"))
     CACHE_KEY_PREFIX = os.getenv("CACHE_KEY_PREFIX", "lyrics_")
@@ -32,6 +32,39 @@ class Config:
         "REDIS_MAX_CONNECTIONS": int(os.getenv("CACHE_OPTIONS_REDIS_MAX_CONNECTIONS", "20")),
         "MAX_ENTRIES": int(os.getenv("CACHE_OPTIONS_MAX_ENTRIES", "100")),
     }
+    # Shared Redis connection pool (see get_redis_client); sized by REDIS_MAX_CONNECTIONS above.
+    REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))
+    REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))
+    REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+    REDIS_RETRIES = int(os.getenv("REDIS_RETRIES", "3"))
+    # Seconds between flushes of each process's buffered metrics to Redis (see src/utils/metrics.py).
+    METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+    HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "50"))
+    # Half-life in seconds of a track's access count for LFU eviction (0 disables decay).
+    LFU_HALF_LIFE = int(os.getenv("LFU_HALF_LIFE", str(7 * 24 * 3600)))
+    # Encoding of track fields (see src/utils/serializers.py).
+    TRACK_SERIALIZER = os.getenv("TRACK_SERIALIZER", "msgpack")
+    TRACK_COMPRESSION = os.getenv("TRACK_COMPRESSION", "zlib")
+    TRACK_COMPRESSION_MIN_BYTES = int(os.getenv("TRACK_COMPRESSION_MIN_BYTES", "256"))
+    # Optional per-process cache of track content in front of Redis (see L1Cache).
+    L1_CACHE_ENABLED = os.getenv("L1_CACHE_ENABLED", "false").lower() == "true"
+    L1_CACHE_MAX_ENTRIES = int(os.getenv("L1_CACHE_MAX_ENTRIES", "512"))
+    L1_CACHE_TTL = int(os.getenv("L1_CACHE_TTL", "30"))
+    # SQLite copy of completed tracks and favorites, refilling Redis misses (see DurableTrackStore).
+    # An empty path disables it.
+    DURABLE_STORE_PATH = os.getenv("DURABLE_STORE_PATH", "data/tracks.db")
+    # Days a non-favorite track is kept in the durable store after it was last saved or restored (0 = forever).
+    DURABLE_STORE_RETENTION_DAYS = int(os.getenv("DURABLE_STORE_RETENTION_DAYS", "90"))
+    # Back-off window of a lookup that found nothing (see NegativeCache), doubled per repeated miss up to the max.
+    NEGATIVE_CACHE_TTL = int(os.getenv("NEGATIVE_CACHE_TTL", "1800"))
+    NEGATIVE_CACHE_MAX_TTL = int(os.getenv("NEGATIVE_CACHE_MAX_TTL", "86400"))
+    # Seconds a dispatched task's claim on its track and stage lasts if it never finishes (see InFlightRegistry).
+    IN_FLIGHT_TTL = int(os.getenv("IN_FLIGHT_TTL", "600"))
+
+    # Romanization Configuration
+    ROMAJI_TOKEN_CACHE_SIZE = int(os.getenv("ROMAJI_TOKEN_CACHE_SIZE", "50000"))
+    ROMAJI_LINE_CACHE_TTL = int(os.getenv("ROMAJI_LINE_CACHE_TTL", str(30 * 24 * 3600)))
+    ROMANIZE_PUBLISH_BATCH_LINES = int(os.getenv("ROMANIZE_PUBLISH_BATCH_LINES", "20"))
 
     # API Keys
     GENIUS_ACCESS_TOKEN = os.getenv("GENIUS_ACCESS_TOKEN")
@@ -50,6 +83,11 @@ class Config:
     # Celery Configuration
     CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://redis:6379/1")
     CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://redis:6379/2")
+    CELERY_ROMANIZE_QUEUE = os.getenv("CELERY_ROMANIZE_QUEUE", "romanize")
+    # CPU-bound romanization is served by its own worker pool (see docker-compose.yml).
+    CELERY_TASK_ROUTES = {
+        "src.celery_worker.romanize_and_update_cache_task": {"queue": CELERY_ROMANIZE_QUEUE},
+    }
 
     # Application Constants
     FALLBACK_YOUTUBE_URL = "https://www.youtube.com/embed/dQw4w9WgXcQ"
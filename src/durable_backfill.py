@@ -0,0 +1,47 @@
+"""
+Durable Store Backfill CLI
+
+Copies the favorites and completed tracks already cached in Redis to the durable
+store (see src/utils/durable_store.py), e.g. right after DURABLE_STORE_PATH is first
+enabled on a warm cache. Tracks cached afterwards are saved as they complete, so
+this only needs to run once; running it again simply refreshes the saved copies.
+
+The keyspace is walked with SCAN and the tracks are read in pipelined batches, so
+Redis keeps serving requests throughout.
+
+Usage:
+    python -m src.durable_backfill [--batch-size 500]
+"""
+
+# Standard library imports
+import argparse
+import logging
+import sys
+import time
+
+# Local application imports
+from src.utils.cache_manager import lfu_cache_manager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Copy the cached tracks and favorites to the durable store.")
+    parser.add_argument("--batch-size", type=int, default=500, help="Keys per SCAN step and per pipeline (default: 500).")
+    args = parser.parse_args(argv)
+
+    if not lfu_cache_manager.durable:
+        logger.error("The durable store is disabled (DURABLE_STORE_PATH is empty).")
+        return 1
+
+    start = time.perf_counter()
+    saved = lfu_cache_manager.backfill_durable_store(batch_size=args.batch_size)
+    if saved is None:
+        return 1
+    logger.info("Saved %d tracks in %.2fs.", saved, time.perf_counter() - start)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,31 +3,99 @@ Extensions Module
 
 This module initializes and configures Flask extensions, external libraries, and global objects
 used throughout the application. It includes configurations for Flask-Caching,
-Pykakasi (for Romanization), and SudachiPy (for tokenization).
+Pykakasi (for Romanization), SudachiPy (for tokenization) and the Redis connection pool.
+
+Pykakasi and SudachiPy are only loaded on first use, so processes that never
+romanize anything (e.g. the web server) do not pay for their dictionaries.
 """
 
 # Third-party imports
-import pykakasi
+import redis
 from celery import Celery
 from flask_caching import Cache
-from sudachipy import dictionary
+from redis.backoff import ExponentialBackoff
+from redis.retry import Retry
+
+# Local application imports
+from src.config import Config
 
 # Initialize Flask extensions
 cache = Cache()
 celery_app = Celery(__name__)
 
-# Initialize Pykakasi for Romanization
-_kks = pykakasi.kakasi()
-_kks.setMode("H", "a")
-_kks.setMode("K", "a")
-_kks.setMode("J", "a")
-_kks.setMode("s", True)
-_kks.setMode("C", True)
-KKS_CONVERTER = _kks.getConverter()
+_kks_converter = None
+_tokenizer = None
+_redis_pools = {}
+
+
+def get_kks_converter():
+    """Initializes and returns a singleton Pykakasi converter for Romanization."""
+    global _kks_converter
+    if _kks_converter is None:
+        import pykakasi
+
+        kks = pykakasi.kakasi()
+        kks.setMode("H", "a")
+        kks.setMode("K", "a")
+        kks.setMode("J", "a")
+        kks.setMode("s", True)
+        kks.setMode("C", True)
+        _kks_converter = kks.getConverter()
+    return _kks_converter
+
+
+def get_tokenizer():
+    """Initializes and returns a singleton SudachiPy tokenizer."""
+    global _tokenizer
+    if _tokenizer is None:
+        from sudachipy import dictionary
+
+        _tokenizer = dictionary.Dictionary().create()
+    return _tokenizer
+
+
+def get_redis_client(decode_responses=False):
+    """
+    Returns a Redis client on this process's shared connection pool.
+
+    Every Redis user (Flask-Caching, LFUCacheManager, the Spotify helpers and the
+    Celery tasks through them) borrows from the same bounded pool, one per decode
+    mode, so a process never holds more than REDIS_MAX_CONNECTIONS sockets per mode.
+    When the pool is exhausted, callers wait up to REDIS_POOL_TIMEOUT for a free
+    connection instead of failing. Idle connections are health-checked before
+    reuse, and commands are retried with backoff after a dropped connection.
+    redis-py replaces the pool's connections after a fork, so prefork workers never
+    share sockets with their parent.
+    """
+    pool = _redis_pools.get(decode_responses)
+    if pool is None:
+        pool = redis.BlockingConnectionPool.from_url(
+            Config.CACHE_REDIS_URL,
+            max_connections=Config.CACHE_OPTIONS["REDIS_MAX_CONNECTIONS"],
+            timeout=Config.REDIS_POOL_TIMEOUT,
+            decode_responses=decode_responses,
+            health_check_interval=Config.REDIS_HEALTH_CHECK_INTERVAL,
+            socket_keepalive=True,
+            socket_connect_timeout=Config.REDIS_SOCKET_TIMEOUT,
+            socket_timeout=Config.REDIS_SOCKET_TIMEOUT,
+            retry=Retry(ExponentialBackoff(cap=1, base=0.05), Config.REDIS_RETRIES),
+            retry_on_error=[redis.exceptions.ConnectionError, redis.exceptions.TimeoutError],
+        )
+        _redis_pools[decode_responses] = pool
+    return redis.Redis(connection_pool=pool)
+
+
+def pooled_redis_cache(app, config, args, kwargs):
+    """Flask-Caching backend factory (see Config.CACHE_TYPE): a RedisCache on the shared pool."""
+    from flask_caching.backends.rediscache import RedisCache
+
+    return RedisCache(
+        host=get_redis_client(),
+        key_prefix=config.get("CACHE_KEY_PREFIX"),
+        default_timeout=kwargs["default_timeout"],
+    )
 
-# Initialize SudachiPy for tokenization
-TOKENIZER_OBJ = dictionary.Dictionary().create()
 
 # Placeholders for Spotify OAuth and cache handler
 SP_OAUTH = None
-CACHE_HANDLER = None
\ No newline at end of file
+CACHE_HANDLER = None
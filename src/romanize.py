@@ -0,0 +1,148 @@
+"""
+Batch Romanizer CLI
+
+Romanizes lyrics offline across all CPU cores, without Redis or Celery, for
+backfilling thousands of songs at once. Input is either a directory of lyric
+files (*.txt, searched recursively) or a JSONL stream with one song per line.
+Each song goes through `clean_genius_metadata` and `romanize_lyrics`, exactly
+like the fetch and romanize tasks.
+
+Work is spread over a process pool. Each worker loads the SudachiPy dictionary
+once, in its initializer, and results are written as JSONL in input order. At
+most `--window` songs are in flight at a time, so memory stays bounded however
+large the input is.
+
+Usage:
+    python -m src.romanize lyrics_dir/ > romanized.jsonl
+    python -m src.romanize songs.jsonl --output romanized.jsonl
+    cat songs.jsonl | python -m src.romanize - --field lyrics_text
+
+Each output record is the input JSON object (or {"path": ...} for files) with
+"original_lyrics" (cleaned) and "romanized_lyrics" added, or "error" if the
+song could not be processed.
+"""
+
+# Standard library imports
+import argparse
+import collections
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Local application imports
+from src.extensions import get_tokenizer
+from src.utils.text_processors import clean_genius_metadata, romanize_lyrics
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _init_worker():
+    """Load the SudachiPy dictionary once per worker process, before any song arrives."""
+    get_tokenizer()
+
+
+def romanize_song(lyrics: str, clean: bool = True):
+    """Clean (optionally) and romanize one song. Returns (original_lyrics, romanized_lyrics)."""
+    original_lyrics = clean_genius_metadata(lyrics) if clean else lyrics
+    return original_lyrics, romanize_lyrics(original_lyrics)
+
+
+def read_directory(directory: Path):
+    """Yield (record, lyrics) for every *.txt file under `directory`, in sorted path order."""
+    for path in sorted(directory.rglob("*.txt")):
+        yield {"path": str(path.relative_to(directory))}, path.read_text(encoding="utf-8")
+
+
+def read_jsonl(stream, field: str):
+    """Yield (record, lyrics) for every JSON object in the stream; `field` holds the lyrics."""
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield {"line": line_number, "error": f"Invalid JSON: {e}"}, None
+            continue
+        lyrics = record.get(field) if isinstance(record, dict) else None
+        if not isinstance(lyrics, str):
+            yield {"line": line_number, "error": f"Missing '{field}' field."}, None
+            continue
+        yield record, lyrics
+
+
+def romanize_stream(songs, workers=None, window=None, clean=True):
+    """
+    Romanize (record, lyrics) pairs on a process pool and yield the output records in input order.
+
+    At most `window` songs are submitted ahead of the one being written, which
+    bounds memory while keeping every worker busy.
+    """
+    workers = workers or os.cpu_count() or 1
+    window = window or workers * 4
+    pending = collections.deque()
+
+    def finish(record, future):
+        if future is None:
+            return record  # Input error, already recorded on the record.
+        try:
+            record["original_lyrics"], record["romanized_lyrics"] = future.result()
+        except Exception as e:
+            logger.error("Failed to romanize %s: %s", record.get("path", record.get("id")), e)
+            record["error"] = str(e)
+        return record
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        for record, lyrics in songs:
+            future = executor.submit(romanize_song, lyrics, clean) if lyrics is not None else None
+            pending.append((record, future))
+            if len(pending) >= window:
+                yield finish(*pending.popleft())
+        while pending:
+            yield finish(*pending.popleft())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Romanize lyrics files or a JSONL stream across all cores.")
+    parser.add_argument("input", help="A directory of *.txt lyric files, a JSONL file, or '-' for JSONL on stdin.")
+    parser.add_argument("--output", type=Path, help="Write JSONL here instead of stdout.")
+    parser.add_argument("--field", default="lyrics", help="JSONL field holding the lyrics (default: lyrics).")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU).")
+    parser.add_argument("--window", type=int, help="Songs in flight at once (default: 4 per worker).")
+    parser.add_argument("--no-clean", action="store_true", help="Skip clean_genius_metadata (input is already clean).")
+    args = parser.parse_args(argv)
+
+    if args.input == "-":
+        source = sys.stdin
+    elif Path(args.input).is_dir():
+        source = None
+    else:
+        source = open(args.input, encoding="utf-8")
+    songs = read_directory(Path(args.input)) if source is None else read_jsonl(source, args.field)
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    processed = errors = 0
+    start = time.perf_counter()
+    try:
+        for record in romanize_stream(songs, workers=args.workers, window=args.window, clean=not args.no_clean):
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            processed += 1
+            errors += "error" in record
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if source not in (None, sys.stdin):
+            source.close()
+
+    elapsed = time.perf_counter() - start
+    logger.info("Romanized %d songs (%d errors) in %.1fs (%.1f songs/s).",
+                processed, errors, elapsed, processed / elapsed if elapsed else 0.0)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
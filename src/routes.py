@@ -6,6 +6,7 @@ import logging
 import uuid
 from flask import (
     Blueprint,
+    Response,
     request,
     redirect,
     session,
@@ -32,13 +33,14 @@ from src.services.spotify_services import (
     get_user_playlists,
     get_playlist_details_and_tracks,
 )
-from src.services.genius_services import create_skeleton_cache_entry
-from src.utils.cache_manager import lfu_cache_manager
-from src.extensions import cache
+from src.services.genius_services import build_skeleton_content, create_skeleton_cache_entry
+from src.utils.cache_manager import in_flight, lfu_cache_manager
+from src.utils.metrics import metrics
 from src.celery_worker import (
     create_spotify_playlist_task, 
     fetch_and_populate_task, 
     fetch_youtube_task,
+    romanize_and_update_cache_task,
     translate_and_update_cache_task
 )
 
@@ -56,7 +58,7 @@ def before_request_auth():
     - Redirects to login if authentication is required and not present.
     """
     # Define endpoints that do NOT require authentication
-    unprotected_endpoints = ['main.home', 'main.login', 'main.callback', 'main.logout', 'static']
+    unprotected_endpoints = ['main.home', 'main.login', 'main.callback', 'main.logout', 'main.metrics_endpoint', 'static']
     
     if request.endpoint in unprotected_endpoints:
         return
@@ -81,6 +83,12 @@ def home():
     return render_template("login.html")
 
 
+@main_bp.route("/metrics")
+def metrics_endpoint():
+    """Cache, request and task metrics of every process, in the Prometheus text format."""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 @main_bp.route("/login")
 def login():
     """Redirects the user to the Spotify authorization page."""
@@ -124,11 +132,18 @@ def logout():
 def search():
     """Renders the main search page."""
     # No need to check for auth, before_request handles it.
-    cached_data = lfu_cache_manager.get_formatted_lfu_list()
+    page_size = current_app.config.get("HISTORY_PAGE_SIZE", 50)
+    history_page = max(request.args.get("history_page", 1, type=int), 1)
+    cached_data = lfu_cache_manager.get_formatted_lfu_list(
+        history_offset=(history_page - 1) * page_size,
+        history_limit=page_size,
+    )
     return render_template(
         "search_form.html", 
         favorites=cached_data["favorites"],
-        history=cached_data["history"]
+        history=cached_data["history"],
+        history_page=history_page,
+        history_pages=max(-(-cached_data["history_total"] // page_size), 1),
     )
 
 
@@ -217,8 +232,8 @@ def add_favorite():
     if not cache_key:
         return jsonify({"success": False, "error": "Missing cache_key"}), 400
     
-    success = lfu_cache_manager.add_to_favorites(cache_key)
-    return jsonify({"success": success})
+    present = lfu_cache_manager.add_to_favorites(cache_key)
+    return jsonify({"success": present is not None, "present": present})
 
 
 @main_bp.route("/api/favorites/remove", methods=["POST"])
@@ -229,8 +244,8 @@ def remove_favorite():
     if not cache_key:
         return jsonify({"success": False, "error": "Missing cache_key"}), 400
     
-    success = lfu_cache_manager.remove_from_favorites(cache_key)
-    return jsonify({"success": success})
+    present = lfu_cache_manager.remove_from_favorites(cache_key)
+    return jsonify({"success": present is not None, "present": present})
 
 
 @main_bp.route("/api/favorites/add_bulk", methods=["POST"])
@@ -241,8 +256,8 @@ def add_favorite_bulk():
     if not cache_keys:
         return jsonify({"success": False, "error": "Missing cache_keys"}), 400
     
-    success = lfu_cache_manager.add_to_favorites_bulk(cache_keys)
-    return jsonify({"success": success})
+    present = lfu_cache_manager.add_to_favorites_bulk(cache_keys)
+    return jsonify({"success": present is not None, "present": present})
 
 
 @main_bp.route("/api/favorites/remove_bulk", methods=["POST"])
@@ -253,8 +268,8 @@ def remove_favorite_bulk():
     if not cache_keys:
         return jsonify({"success": False, "error": "Missing cache_keys"}), 400
     
-    success = lfu_cache_manager.remove_from_favorites_bulk(cache_keys)
-    return jsonify({"success": success})
+    present = lfu_cache_manager.remove_from_favorites_bulk(cache_keys)
+    return jsonify({"success": present is not None, "present": present})
 
 
 @main_bp.route("/api/playlist/delete", methods=["POST"])
@@ -367,29 +382,43 @@ def prime_playlist_cache(playlist_id):
             return jsonify({"success": False, "error": "Playlist not found."}), 404
 
         tasks_to_run_args = []
-        for track in playlist_data['tracks']:
-            cache_key = f"track_{track['track_id']}"
-            if cache.get(cache_key) is None:
-                tasks_to_run_args.append({
-                    "track_id": track['track_id'],
-                    "song_title": track['title'],
-                    "artist_name": track['artist']
-                })
-                create_skeleton_cache_entry(
-                    track_id=track['track_id'], song_title=track['title'], artist_name=track['artist'],
-                    album_id=track['album_id'], artist_id=track['artist_id'], image_url=track['image_url_lg']
+        dispatched = 0
+        try:
+            for track in playlist_data['tracks']:
+                cache_key = f"track_{track['track_id']}"
+                if lfu_cache_manager.exists(cache_key):
+                    continue
+                claim_token = in_flight.claim("fetch", track['track_id'])
+                if claim_token:
+                    tasks_to_run_args.append({
+                        "track_id": track['track_id'],
+                        "song_title": track['title'],
+                        "artist_name": track['artist'],
+                        "claim_token": claim_token,
+                    })
+                    create_skeleton_cache_entry(
+                        track_id=track['track_id'], song_title=track['title'], artist_name=track['artist'],
+                        album_id=track['album_id'], artist_id=track['artist_id'], image_url=track['image_url_lg']
+                    )
+
+            if not tasks_to_run_args:
+                return jsonify({"success": True, "message": "All tracks are already cached.", "tasks_dispatched": 0})
+
+            job_id = str(uuid.uuid4())
+            progress_key = f"priming:job:{job_id}"
+            lfu_cache_manager.redis.set(progress_key, 0)
+            lfu_cache_manager.redis.expire(progress_key, 3600)
+
+            for args in tasks_to_run_args:
+                fetch_and_populate_task.delay(
+                    job_id, args['track_id'], args['song_title'], args['artist_name'], claim_token=args['claim_token']
                 )
-
-        if not tasks_to_run_args:
-            return jsonify({"success": True, "message": "All tracks are already cached.", "tasks_dispatched": 0})
-
-        job_id = str(uuid.uuid4())
-        progress_key = f"priming:job:{job_id}"
-        lfu_cache_manager.redis.set(progress_key, 0)
-        lfu_cache_manager.redis.expire(progress_key, 3600)
-
-        for args in tasks_to_run_args:
-            fetch_and_populate_task.delay(job_id, args['track_id'], args['song_title'], args['artist_name'])
+                dispatched += 1
+        except Exception:
+            # Release the claims of the tracks that were not queued, so the next request can retry them.
+            for args in tasks_to_run_args[dispatched:]:
+                in_flight.release("fetch", args['track_id'], args['claim_token'])
+            raise
 
         return jsonify({
             "success": True, 
@@ -440,6 +469,8 @@ def api_playlists():
 def track_details(track_id):
     """
     Display track details. Implements a "cache-first, self-healing" strategy.
+    Each background task is dispatched at most once per track at a time (see
+    InFlightRegistry); concurrent viewers wait for the same tasks.
     """
     cache_key = f"track_{track_id}"
     content = lfu_cache_manager.get(cache_key)
@@ -448,12 +479,26 @@ def track_details(track_id):
         logger.info("Cache MISS for track_id: %s. Creating skeleton and dispatching all tasks.", track_id)
         try:
             track = g.sp.track(track_id)
-            content = create_skeleton_cache_entry(
+            skeleton_args = dict(
                 track_id=track_id, song_title=track["name"], artist_name=track["artists"][0]["name"],
                 album_id=track["album"]["id"], artist_id=track["artists"][0]["id"],
                 image_url=track["album"]["images"][0]["url"] if track.get("album", {}).get("images") else ""
             )
-            fetch_and_populate_task.delay(None, track_id, content['song_title'], content['artist_name'])
+            claim_token = in_flight.claim("fetch", track_id)
+            if claim_token:
+                try:
+                    content = create_skeleton_cache_entry(**skeleton_args)
+                    fetch_and_populate_task.delay(
+                        None, track_id, content['song_title'], content['artist_name'], claim_token=claim_token
+                    )
+                except Exception:
+                    in_flight.release("fetch", track_id, claim_token)
+                    raise
+            else:
+                # Another request is already fetching this track; rewriting its skeleton would undo progress.
+                logger.info("Fetch for track_id %s already in flight. Attaching to it.", track_id)
+                content = lfu_cache_manager.get(cache_key, count_access=False)
+                content = content or build_skeleton_content(**skeleton_args)
         except Exception as e:
             logger.error("Failed to fetch initial track data for %s: %s", track_id, e)
             flash("Could not retrieve track details from Spotify.", "error")
@@ -463,13 +508,26 @@ def track_details(track_id):
         logger.info("Cache HIT for track_id: %s. Performing health check.", track_id)
         if not content.get('youtube_url'):
             logger.info("Health check: YouTube URL missing for %s. Re-dispatching task.", track_id)
-            fetch_youtube_task.delay(track_id, content['song_title'], content['artist_name'])
+            in_flight.dispatch_once(
+                "youtube", track_id, fetch_youtube_task, track_id, content['song_title'], content['artist_name']
+            )
+
+        original_lyrics = content.get('original_lyrics', '')
+        lyrics_available = 'not found' not in original_lyrics.lower() and 'loading' not in original_lyrics.lower()
+        if 'loading' in content.get('romanized_lyrics', '').lower() and lyrics_available:
+            logger.info("Health check: Romanization incomplete for %s. Re-dispatching task.", track_id)
+            in_flight.dispatch_once(
+                "romanize", track_id, romanize_and_update_cache_task, None, track_id, original_lyrics
+            )
         
         translation_status = content.get('translated_lyrics', '').lower()
         if 'loading' in translation_status or 'in progress' in translation_status or 'failed' in translation_status:
             logger.info("Health check: Translation incomplete for %s. Re-dispatching task.", track_id)
             if 'not found' not in content.get('original_lyrics', '').lower() and 'loading' not in content.get('original_lyrics', '').lower():
-                translate_and_update_cache_task.delay(track_id, content['original_lyrics'])
+                in_flight.dispatch_once(
+                    "translate", track_id, translate_and_update_cache_task,
+                    track_id, content['original_lyrics'], content['song_title'], content['artist_name']
+                )
 
     return render_template("track_info.html", track_data=content)
 
@@ -538,10 +596,11 @@ def playlist_details(playlist_id):
 def track_status(track_id):
     """
     Checks the cache for a track's full content status.
-    This is polled by the front-end to update skeleton loaders.
+    This is polled by the front-end to update skeleton loaders, so reads here do
+    not count towards the track's LFU score.
     """
     cache_key = f"track_{track_id}"
-    content = cache.get(cache_key)
+    content = lfu_cache_manager.get(cache_key, count_access=False)
 
     if not content:
         return jsonify({"status": "error", "message": "Track not found in cache."}), 404
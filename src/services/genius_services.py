@@ -28,13 +28,11 @@ def get_genius_client():
         genius_client = lyricsgenius.Genius(token, verbose=False, timeout=15)
     return genius_client
 
-def create_skeleton_cache_entry(track_id, song_title, artist_name, album_id, artist_id, image_url):
+def build_skeleton_content(track_id, song_title, artist_name, album_id, artist_id, image_url):
     """
-    Creates an initial 'skeleton' cache entry with placeholders.
+    Builds the 'skeleton' content of a track, with placeholders for every fetched field.
     """
-    logger.info("Creating skeleton cache for track_id: %s", track_id)
-    
-    content = {
+    return {
         "track_id": track_id,
         "song_title": song_title,
         "artist_name": artist_name,
@@ -47,6 +45,13 @@ def create_skeleton_cache_entry(track_id, song_title, artist_name, album_id, art
         "youtube_url": ""
     }
 
+
+def create_skeleton_cache_entry(track_id, song_title, artist_name, album_id, artist_id, image_url):
+    """
+    Creates an initial 'skeleton' cache entry with placeholders.
+    """
+    logger.info("Creating skeleton cache for track_id: %s", track_id)
+    content = build_skeleton_content(track_id, song_title, artist_name, album_id, artist_id, image_url)
     cache_key = f"track_{track_id}"
     lfu_cache_manager.set(cache_key, content)
     return content
\ No newline at end of file
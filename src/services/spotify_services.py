@@ -11,7 +11,7 @@ import requests
 from datetime import datetime
 from flask import current_app
 from spotipy import Spotify
-from src.utils.cache_manager import lfu_cache_manager
+from src.extensions import get_redis_client
 
 logger = logging.getLogger(__name__)
 
@@ -202,7 +202,7 @@ def get_user_playlist_order(sp_client):
     try:
         user_id = sp_client.current_user()['id']
         redis_key = f"user:{user_id}:playlist_order"
-        ordered_ids = lfu_cache_manager.redis.lrange(redis_key, 0, -1)
+        ordered_ids = get_redis_client(decode_responses=True).lrange(redis_key, 0, -1)
         return ordered_ids
     except Exception as e:
         logger.error("Could not retrieve playlist order for user: %s", e)
@@ -217,7 +217,7 @@ def save_user_playlist_order(sp_client, playlist_ids):
         user_id = sp_client.current_user()['id']
         redis_key = f"user:{user_id}:playlist_order"
         
-        pipe = lfu_cache_manager.redis.pipeline()
+        pipe = get_redis_client(decode_responses=True).pipeline()
         pipe.delete(redis_key)
         if playlist_ids:
             pipe.rpush(redis_key, *playlist_ids)
@@ -0,0 +1,15 @@
+"""
+Cache Key Names
+
+The Redis keys of the track cache's indexes, shared by LFUCacheManager and the
+tools that read or write the cache directly (e.g. src/cache_snapshot.py). This
+module has no side effects, so importing it never connects to Redis.
+"""
+
+# Access counts of every cached track (see LFUCacheManager.ACCESS_WEIGHT_LUA).
+ACCESS_COUNT_KEY = "track_access_counts"
+# The history index: access counts of non-favorites only, used for eviction and listing.
+HISTORY_KEY = "track_history_counts"
+FAVORITES_KEY = "favorite_tracks"
+# Start time (Redis clock, seconds) of the current access weight scale.
+ACCESS_EPOCH_KEY = "track_access_epoch"
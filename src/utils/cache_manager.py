@@ -4,82 +4,410 @@ This module provides a cache manager that handles both an LFU (Least Frequently
 cache for recent items and a permanent set for user favorites.
 """
 import datetime
+import hashlib
+import itertools
 import logging
+import os
+import threading
+import time
+import unicodedata
+import uuid
+from collections import OrderedDict
 import redis
-from flask import current_app
-from src.extensions import cache
+from cachelib.serializers import RedisSerializer
 from src.config import Config
+from src.extensions import get_redis_client
+from src.utils import cache_keys
+from src.utils.durable_store import DurableTrackStore
+from src.utils.metrics import metrics
+from src.utils.serializers import create_field_serializer
+from src.utils.text_processors import ROMANIZER_VERSION
 
 logger = logging.getLogger(__name__)
 
+# Decodes track entries cached by older versions through Flask-Caching (pickled dicts).
+LEGACY_SERIALIZER = RedisSerializer()
+
 
 class LFUCacheManager:
     """
     A Cache Manager that handles both an LFU cache and a permanent favorites list.
     - Favorites are permanent: they do not expire and do not count towards the LFU cache limit.
     - History items are temporary: they are subject to LFU eviction and default timeouts.
+    - Each track is stored as a Redis hash (one encoded value per field), so
+      background tasks update single fields instead of rewriting the whole entry.
+    - Completed tracks and favorites are also written to an optional durable store,
+      which refills Redis when a track was evicted or lost.
+    """
+
+    ACCESS_COUNT_KEY = cache_keys.ACCESS_COUNT_KEY
+    HISTORY_KEY = cache_keys.HISTORY_KEY
+    FAVORITES_KEY = cache_keys.FAVORITES_KEY
+    # Start time (Redis clock, seconds) of the current access weight scale, see ACCESS_WEIGHT_LUA.
+    ACCESS_EPOCH_KEY = cache_keys.ACCESS_EPOCH_KEY
+    # Weights are rescaled once they reach 2 ** MAX_WEIGHT_EXPONENT, well within double range.
+    MAX_WEIGHT_EXPONENT = 64
+    # Set once the pickled entries of older versions have been converted to hashes.
+    RECORDS_MIGRATED_KEY = "track_records_migrated:v1"
+    # Listing summaries of older versions, now read straight from the track hashes.
+    LEGACY_SUMMARY_KEY = "track_summaries"
+
+    # The fields of a track needed to list it in the library (no lyrics).
+    SUMMARY_FIELDS = ("track_id", "song_title", "artist_name", "image_url", "artist_id", "album_id", "cached_at")
+    # The fields set by background tasks; a track is complete once all of them hold a final value.
+    RESULT_FIELDS = ("original_lyrics", "romanized_lyrics", "translated_lyrics", "youtube_url")
+    # Placeholder and error values, which are retried rather than kept in the durable store.
+    PENDING_VALUES = frozenset({
+        "", "Loading...", "Loading lyrics...", "An error occurred.",
+        "An error occurred while fetching lyrics.", "Translation failed.",
+    })
+
+    # Time-decayed access counts. Rather than halving every score each half-life, each
+    # access adds a weight of 2 ** ((now - epoch) / half_life): an access one half-life ago
+    # is then worth half of one made now, so ordering by score is ordering by decayed
+    # count, and an old favorite of the past no longer outranks new popular tracks
+    # forever. When weights grow too large, every score is scaled down in one ZUNIONSTORE
+    # and the epoch restarts. A half-life of 0 disables decay (every access weighs 1).
+    ACCESS_WEIGHT_LUA = """
+    local function access_weight(access_key, history_key, epoch_key, half_life)
+        if half_life <= 0 then
+            return 1
+        end
+        local time = redis.call('TIME')
+        local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+        local epoch = tonumber(redis.call('GET', epoch_key))
+        if not epoch then
+            epoch = now
+            redis.call('SET', epoch_key, tostring(epoch))
+        end
+        local exponent = (now - epoch) / half_life
+        if exponent >= %(max_exponent)d then
+            local factor = tostring(2 ^ -exponent)
+            redis.call('ZUNIONSTORE', access_key, 1, access_key, 'WEIGHTS', factor)
+            redis.call('ZUNIONSTORE', history_key, 1, history_key, 'WEIGHTS', factor)
+            redis.call('SET', epoch_key, tostring(now))
+            exponent = 0
+        end
+        return 2 ^ exponent
+    end
+
+    local function count_access(access_key, history_key, epoch_key, key, half_life)
+        local weight = access_weight(access_key, history_key, epoch_key, half_life)
+        redis.call('ZINCRBY', access_key, weight, key)
+        if redis.call('ZSCORE', history_key, key) then
+            redis.call('ZINCRBY', history_key, weight, key)
+        end
+    end
+    """ % {"max_exponent": MAX_WEIGHT_EXPONENT}
+
+    # Counts one access to a key (used when the content itself came from the L1 cache).
+    # KEYS: access counts, history, access epoch. ARGV: key, half-life.
+    COUNT_ACCESS_SCRIPT = ACCESS_WEIGHT_LUA + """
+    count_access(KEYS[1], KEYS[2], KEYS[3], ARGV[1], tonumber(ARGV[2]))
+    return 1
+    """
+
+    # Keeps the history index (non-favorites only, same scores as ACCESS_COUNT_KEY) within
+    # max_entries and writes the track, atomically and in O(log N): the capacity check is a
+    # ZCARD and the least used non-favorite is simply the lowest-scored history entry.
+    # Favorites are stored without expiry, everything else with the default timeout.
+    # KEYS: access counts, history, favorites, track hash, access epoch.
+    # ARGV: key, max_entries, cache key prefix, timeout, half-life, then field/value pairs.
+    # Returns the evicted keys.
+    SET_AND_EVICT_SCRIPT = ACCESS_WEIGHT_LUA + """
+    local key, max_entries, prefix, timeout = ARGV[1], tonumber(ARGV[2]), ARGV[3], tonumber(ARGV[4])
+    local weight = access_weight(KEYS[1], KEYS[2], KEYS[5], tonumber(ARGV[5]))
+    local evicted = {}
+    local is_favorite = redis.call('SISMEMBER', KEYS[3], key) == 1
+    if not is_favorite then
+        if not redis.call('ZSCORE', KEYS[2], key) then
+            while redis.call('ZCARD', KEYS[2]) >= max_entries do
+                local victim = redis.call('ZRANGE', KEYS[2], 0, 0)[1]
+                if not victim then
+                    break
+                end
+                redis.call('ZREM', KEYS[2], victim)
+                redis.call('ZREM', KEYS[1], victim)
+                redis.call('DEL', prefix .. victim)
+                evicted[#evicted + 1] = victim
+            end
+        end
+        redis.call('ZADD', KEYS[2], weight, key)
+    end
+    redis.call('ZADD', KEYS[1], weight, key)
+    redis.call('DEL', KEYS[4])
+    redis.call('HSET', KEYS[4], unpack(ARGV, 6))
+    if not is_favorite and timeout > 0 then
+        redis.call('EXPIRE', KEYS[4], timeout)
+    end
+    return evicted
+    """
+
+    # Reads a track and, only on a hit and when counting is enabled, bumps the key's access
+    # count (and its history score, if it is in history). One round-trip per read.
+    # Returns the hash as a flat field/value list, nil on a miss, or -1 for a legacy entry.
+    # KEYS: track hash, access counts, history, access epoch. ARGV: key, count_access (1 or 0), half-life.
+    GET_AND_COUNT_SCRIPT = ACCESS_WEIGHT_LUA + """
+    local kind = redis.call('TYPE', KEYS[1]).ok
+    if kind == 'none' then
+        return false
+    elseif kind ~= 'hash' then
+        return -1
+    end
+    if ARGV[2] == '1' then
+        count_access(KEYS[2], KEYS[3], KEYS[4], ARGV[1], tonumber(ARGV[3]))
+    end
+    return redis.call('HGETALL', KEYS[1])
+    """
+
+    # Sets and removes fields of an existing track, keeping its expiry. A track that was
+    # evicted or expired is not recreated. Returns 1 if updated, 0 if missing, -1 for a legacy entry.
+    # KEYS: track hash. ARGV: number of fields to set, field/value pairs, then fields to remove.
+    UPDATE_FIELDS_SCRIPT = """
+    local kind = redis.call('TYPE', KEYS[1]).ok
+    if kind == 'none' then
+        return 0
+    elseif kind ~= 'hash' then
+        return -1
+    end
+    local count = tonumber(ARGV[1])
+    if count > 0 then
+        redis.call('HSET', KEYS[1], unpack(ARGV, 2, 1 + 2 * count))
+    end
+    for i = 2 + 2 * count, #ARGV do
+        redis.call('HDEL', KEYS[1], ARGV[i])
+    end
+    return 1
+    """
+
+    # Adds keys to favorites, takes them out of the history index and makes their tracks
+    # permanent, without reading any track. Returns how many of the tracks are cached.
+    # KEYS: history, favorites. ARGV: cache key prefix, then the keys to favorite.
+    FAVORITE_SCRIPT = """
+    local present = 0
+    for i = 2, #ARGV do
+        local key = ARGV[i]
+        redis.call('SADD', KEYS[2], key)
+        redis.call('ZREM', KEYS[1], key)
+        if redis.call('EXISTS', ARGV[1] .. key) == 1 then
+            redis.call('PERSIST', ARGV[1] .. key)
+            present = present + 1
+        end
+    end
+    return present
     """
 
-    ACCESS_COUNT_KEY = "track_access_counts"
-    FAVORITES_KEY = "favorite_tracks"
+    # Removes keys from favorites, returns them to the history index with their access count
+    # and puts their tracks back on the default timeout (none if it is 0, as in SET_AND_EVICT_SCRIPT).
+    # Returns how many of the tracks are cached.
+    # KEYS: access counts, history, favorites. ARGV: cache key prefix, timeout, then the keys.
+    UNFAVORITE_SCRIPT = """
+    local timeout = tonumber(ARGV[2])
+    local present = 0
+    for i = 3, #ARGV do
+        local key = ARGV[i]
+        redis.call('SREM', KEYS[3], key)
+        local score = redis.call('ZSCORE', KEYS[1], key)
+        if score then
+            redis.call('ZADD', KEYS[2], score, key)
+        end
+        if redis.call('EXISTS', ARGV[1] .. key) == 1 then
+            present = present + 1
+            if timeout > 0 then
+                redis.call('EXPIRE', ARGV[1] .. key, timeout)
+            end
+        end
+    end
+    return present
+    """
+
+    # One-off backfill of the history index from the access counts, for caches created before it existed.
+    REBUILD_HISTORY_SCRIPT = """
+    if redis.call('EXISTS', KEYS[2]) == 1 then
+        return 0
+    end
+    local entries = redis.call('ZRANGE', KEYS[1], 0, -1, 'WITHSCORES')
+    local added = 0
+    for i = 1, #entries, 2 do
+        if redis.call('SISMEMBER', KEYS[3], entries[i]) == 0 then
+            redis.call('ZADD', KEYS[2], entries[i + 1], entries[i])
+            added = added + 1
+        end
+    end
+    return added
+    """
 
     def __init__(self, max_entries=None):
         """
         Initialize the LFUCacheManager.
         """
         self.max_entries = max_entries or Config.CACHE_OPTIONS["MAX_ENTRIES"]
-        try:
-            self.redis = redis.Redis(
-                host=Config.CACHE_REDIS_HOST,
-                port=Config.CACHE_REDIS_PORT,
-                decode_responses=True,
+        self.key_prefix = Config.CACHE_KEY_PREFIX
+        self.default_timeout = Config.CACHE_DEFAULT_TIMEOUT
+        self.half_life = Config.LFU_HALF_LIFE
+        self.serializer = create_field_serializer(
+            Config.TRACK_SERIALIZER, Config.TRACK_COMPRESSION, Config.TRACK_COMPRESSION_MIN_BYTES
+        )
+        self.durable = None
+        if Config.DURABLE_STORE_PATH:
+            self.durable = DurableTrackStore(
+                Config.DURABLE_STORE_PATH, self.serializer, retention=Config.DURABLE_STORE_RETENTION_DAYS * 86400
             )
+        try:
+            self.redis = get_redis_client(decode_responses=True)
             self.redis.ping()
+            # Track hashes are read and written through a client that returns raw bytes,
+            # so field values are decoded by _decode_value alone.
+            self.binary_redis = get_redis_client()
             logger.info("LFUCacheManager connected to Redis successfully.")
         except redis.exceptions.RedisError as e:
             logger.error("Redis initialization error in LFUCacheManager: %s", e)
             self.redis = None
+            self.binary_redis = None
 
-    def get(self, key):
+        self.l1 = None
+        if self.redis and Config.L1_CACHE_ENABLED:
+            self.l1 = L1Cache(
+                self.redis, self.key_prefix,
+                max_entries=Config.L1_CACHE_MAX_ENTRIES, ttl=Config.L1_CACHE_TTL,
+            )
+
+        if self.redis:
+            self._count_access = self.redis.register_script(self.COUNT_ACCESS_SCRIPT)
+            self._get_and_count = self.binary_redis.register_script(self.GET_AND_COUNT_SCRIPT)
+            self._set_and_evict = self.binary_redis.register_script(self.SET_AND_EVICT_SCRIPT)
+            self._update_fields = self.binary_redis.register_script(self.UPDATE_FIELDS_SCRIPT)
+            self._favorite = self.redis.register_script(self.FAVORITE_SCRIPT)
+            self._unfavorite = self.redis.register_script(self.UNFAVORITE_SCRIPT)
+            self._rebuild_history()
+            self.migrate_legacy_entries()
+            if self.durable:
+                self._restore_favorites()
+
+    def get(self, key, count_access=True):
         """
-        Retrieve content from the cache and increment its access count.
+        Retrieve content from the cache and, on a hit, increment its access count.
+
+        The read and the count happen in one scripted round-trip. Pass
+        count_access=False for reads that should not affect LFU scores (e.g. polling).
+        When the L1 cache is enabled, hits are served from process memory and only
+        the access count (if requested) goes to Redis. On a Redis miss, a track kept
+        in the durable store is written back to Redis and returned.
         """
         if not self.redis:
             return None
         try:
-            self.redis.zincrby(self.ACCESS_COUNT_KEY, 1, key)
-            return cache.get(key)
+            if self.l1:
+                content = self.l1.get(key)
+                if content is not None:
+                    metrics.inc("track_cache_requests_total", {"result": "l1_hit"})
+                    if count_access:
+                        self._count_access(
+                            keys=[self.ACCESS_COUNT_KEY, self.HISTORY_KEY, self.ACCESS_EPOCH_KEY],
+                            args=[key, self.half_life],
+                        )
+                    return content
+                l1_version = self.l1.version()
+
+            script_args = dict(
+                keys=[self.key_prefix + key, self.ACCESS_COUNT_KEY, self.HISTORY_KEY, self.ACCESS_EPOCH_KEY],
+                args=[key, 1 if count_access else 0, self.half_life],
+            )
+            with metrics.timer("track_cache_operation_seconds", {"operation": "get"}):
+                fields = self._get_and_count(**script_args)
+                if fields == -1:
+                    self._migrate_legacy_entry(key)
+                    fields = self._get_and_count(**script_args)
+            if not fields or fields == -1:
+                content = self._restore_from_durable(key)
+                metrics.inc("track_cache_requests_total", {"result": "miss" if content is None else "durable_hit"})
+                return content
+            metrics.inc("track_cache_requests_total", {"result": "hit"})
+
+            content = self._decode_record(fields)
+            if self.l1:
+                self.l1.set(key, content, l1_version)
+            return content
         except redis.exceptions.RedisError as e:
             logger.error("Redis error during get operation for key '%s': %s", key, e)
         return None
 
+    def exists(self, key):
+        """
+        Check whether a track is cached, without loading it or counting an access.
+        A track only found in the durable store is written back to Redis first.
+        """
+        if not self.redis:
+            return False
+        try:
+            if self.redis.exists(self.key_prefix + key):
+                return True
+            return self._restore_from_durable(key) is not None
+        except redis.exceptions.RedisError as e:
+            logger.error("Redis error during exists check for key '%s': %s", key, e)
+            return False
+
     def set(self, key, content_dict):
         """
         Cache content and manage cache size by evicting the least used non-favorite item if full.
         Favorites do not count towards the max_entries limit.
+
+        The capacity check, eviction, index update and the write of the track hash run as
+        one Lua script, so the cost does not grow with the cache size and concurrent
+        workers cannot over-fill it.
         """
         if not self.redis:
             return
         try:
-            all_keys = self.redis.zrange(self.ACCESS_COUNT_KEY, 0, -1)
-            favorite_keys = self.redis.smembers(self.FAVORITES_KEY)
-            non_favorite_count = len(set(all_keys) - favorite_keys)
-
-            if non_favorite_count >= self.max_entries:
-                potential_evictees = self.redis.zrange(self.ACCESS_COUNT_KEY, 0, 10)
-                for key_to_evict in potential_evictees:
-                    if key_to_evict not in favorite_keys:
-                        self.delete(key_to_evict)
-                        logger.info("Non-favorite cache full. Evicted least used key: %s", key_to_evict)
-                        break
-
             content_dict["cached_at"] = datetime.datetime.now().isoformat()
-            cache.set(key, content_dict)
-            self.redis.zadd(self.ACCESS_COUNT_KEY, {key: 1})
+            field_values = [part for item in self._encode_record(content_dict).items() for part in item]
+            with metrics.timer("track_cache_operation_seconds", {"operation": "set"}):
+                evicted = self._set_and_evict(
+                    keys=[
+                        self.ACCESS_COUNT_KEY, self.HISTORY_KEY, self.FAVORITES_KEY,
+                        self.key_prefix + key, self.ACCESS_EPOCH_KEY,
+                    ],
+                    args=[key, self.max_entries, self.key_prefix, self.default_timeout, self.half_life, *field_values],
+                )
+            if evicted:
+                metrics.inc("track_cache_evictions_total", amount=len(evicted))
+            for key_to_evict in evicted:
+                logger.info("Non-favorite cache full. Evicted least used key: %s", key_to_evict.decode())
+
+            self._invalidate_l1(key)
             logger.info("Cached new content for key: %s", key)
         except redis.exceptions.RedisError as e:
             logger.error("Redis error during set operation for key '%s': %s", key, e)
 
+    def update_fields(self, key, fields, remove=()):
+        """
+        Set (and optionally remove) individual fields of a cached track in one round-trip.
+
+        Only the given fields are sent, and the entry keeps its expiry (or permanence,
+        for favorites). Returns False if the track is no longer cached. Once a result
+        field completes the track, the whole track is copied to the durable store.
+        """
+        if not self.redis:
+            return False
+        try:
+            encoded = self._encode_record(fields)
+            script_args = dict(
+                keys=[self.key_prefix + key],
+                args=[len(encoded), *[part for item in encoded.items() for part in item], *remove],
+            )
+            with metrics.timer("track_cache_operation_seconds", {"operation": "update_fields"}):
+                updated = self._update_fields(**script_args)
+                if updated == -1:
+                    self._migrate_legacy_entry(key)
+                    updated = self._update_fields(**script_args)
+            self._invalidate_l1(key)
+            if updated == 1 and self.durable and any(field in fields for field in self.RESULT_FIELDS):
+                self._write_through(key)
+            return updated == 1
+        except redis.exceptions.RedisError as e:
+            logger.error("Redis error updating fields %s for key '%s': %s", list(fields), key, e)
+            return False
+
     def delete(self, key):
         """
         Deletes an item from the cache, access tracking, and favorites.
@@ -89,9 +417,13 @@ class LFUCacheManager:
         try:
             pipe = self.redis.pipeline()
             pipe.zrem(self.ACCESS_COUNT_KEY, key)
+            pipe.zrem(self.HISTORY_KEY, key)
             pipe.srem(self.FAVORITES_KEY, key)
-            cache.delete(key)
+            pipe.delete(self.key_prefix + key)
             pipe.execute()
+            self._invalidate_l1(key)
+            if self.durable:
+                self.durable.delete(key)
             logger.info("Deleted cache key: %s", key)
             return True
         except redis.exceptions.RedisError as e:
@@ -100,118 +432,310 @@ class LFUCacheManager:
 
     def add_to_favorites(self, key):
         """
-        Adds a cache key to the set of favorites and makes its cache entry permanent.
+        Adds a cache key to the favorites and makes its cache entry permanent.
+        Returns 1 if the track is cached, 0 if not, or None on failure.
         """
-        if not self.redis:
-            return False
-        try:
-            self.redis.sadd(self.FAVORITES_KEY, key)
-            
-            content = cache.get(key)
-            if content:
-                cache.set(key, content, timeout=0)
-                logger.info("Added key to favorites and made cache permanent: %s", key)
-            else:
-                logger.warning("Added key %s to favorites set, but no content found in cache.", key)
-            return True
-        except redis.exceptions.RedisError as e:
-            logger.error("Redis error adding favorite for key '%s': %s", key, e)
-            return False
+        present = self.add_to_favorites_bulk([key])
+        if present:
+            logger.info("Added key to favorites and made cache permanent: %s", key)
+        elif present == 0:
+            logger.warning("Added key %s to favorites set, but no content found in cache.", key)
+        return present
 
     def remove_from_favorites(self, key):
         """
         Removes a cache key from favorites and reverts its cache entry to a default timeout.
+        Returns 1 if the track is cached, 0 if not, or None on failure.
         """
-        if not self.redis:
-            return False
-        try:
-            self.redis.srem(self.FAVORITES_KEY, key)
-
-            content = cache.get(key)
-            if content:
-                default_timeout = current_app.config.get("CACHE_DEFAULT_TIMEOUT", 3600)
-                cache.set(key, content, timeout=default_timeout)
-                logger.info("Removed key from favorites and reverted to default timeout: %s", key)
-            else:
-                logger.warning("Removed key %s from favorites set, but no content found in cache to update.", key)
-            return True
-        except redis.exceptions.RedisError as e:
-            logger.error("Redis error removing favorite for key '%s': %s", key, e)
-            return False
+        present = self.remove_from_favorites_bulk([key])
+        if present:
+            logger.info("Removed key from favorites and reverted to default timeout: %s", key)
+        elif present == 0:
+            logger.warning("Removed key %s from favorites set, but no content found in cache to update.", key)
+        return present
 
     def add_to_favorites_bulk(self, keys):
         """
         Adds multiple keys to favorites efficiently.
+
+        One script call changes every entry's expiry in place, without transferring
+        any track. Returns the number of keys whose track is cached, or None on failure.
         """
         if not self.redis or not keys:
-            return False
+            return None
         try:
-            # SADD can take multiple arguments for a single, efficient operation
-            self.redis.sadd(self.FAVORITES_KEY, *keys)
-            # Iterate to make each cache entry permanent
-            for key in keys:
-                content = cache.get(key)
-                if content:
-                    cache.set(key, content, timeout=0)
-            logger.info("Bulk added %d keys to favorites.", len(keys))
-            return True
+            present = self._favorite(keys=[self.HISTORY_KEY, self.FAVORITES_KEY], args=[self.key_prefix, *keys])
+            if self.durable:
+                self.durable.set_favorite(keys, True)
+            logger.info("Bulk added %d keys to favorites (%d cached).", len(keys), present)
+            return present
         except redis.exceptions.RedisError as e:
             logger.error("Redis error during bulk add to favorites: %s", e)
-            return False
+            return None
 
     def remove_from_favorites_bulk(self, keys):
         """
         Removes multiple keys from favorites efficiently.
+
+        One script call moves every key back to the history index and reverts its
+        entry to the default timeout, without transferring any track. Returns the
+        number of keys whose track is cached, or None on failure.
         """
         if not self.redis or not keys:
-            return False
+            return None
         try:
-            # SREM can take multiple arguments for a single, efficient operation
-            self.redis.srem(self.FAVORITES_KEY, *keys)
-            # Iterate to revert each cache entry to a default timeout
-            default_timeout = current_app.config.get("CACHE_DEFAULT_TIMEOUT", 3600)
-            for key in keys:
-                content = cache.get(key)
-                if content:
-                    cache.set(key, content, timeout=default_timeout)
-            logger.info("Bulk removed %d keys from favorites.", len(keys))
-            return True
+            present = self._unfavorite(
+                keys=[self.ACCESS_COUNT_KEY, self.HISTORY_KEY, self.FAVORITES_KEY],
+                args=[self.key_prefix, self.default_timeout, *keys],
+            )
+            if self.durable:
+                self.durable.set_favorite(keys, False)
+            logger.info("Bulk removed %d keys from favorites (%d cached).", len(keys), present)
+            return present
         except redis.exceptions.RedisError as e:
             logger.error("Redis error during bulk remove from favorites: %s", e)
+            return None
+
+    def _is_complete(self, content):
+        """Return True if every result field of a track holds a final value."""
+        if "romanized_lyrics_partial" in content:
             return False
+        return all(content.get(field) not in self.PENDING_VALUES for field in self.RESULT_FIELDS)
+
+    def _write_through(self, key):
+        """Copy a track to the durable store if it is complete."""
+        fields = self._get_and_count(
+            keys=[self.key_prefix + key, self.ACCESS_COUNT_KEY, self.HISTORY_KEY, self.ACCESS_EPOCH_KEY],
+            args=[key, 0, self.half_life],
+        )
+        if not fields or fields == -1:
+            return
+        content = self._decode_record(fields)
+        if self._is_complete(content):
+            self.durable.put(key, content)
+            logger.info("Saved completed track to the durable store: %s", key)
+
+    def _restore_from_durable(self, key):
+        """Write a track kept in the durable store back to Redis. Returns its content, or None."""
+        if not self.durable:
+            return None
+        entry = self.durable.get(key)
+        if not entry or entry[0] is None:
+            return None
+        content, is_favorite = entry
+        if is_favorite:
+            # The favorites set may have been evicted too; set() stores favorites without expiry.
+            self.redis.sadd(self.FAVORITES_KEY, key)
+        self.set(key, content)
+        self.durable.touch(key)
+        logger.info("Restored track from the durable store: %s", key)
+        return content
+
+    def _restore_favorites(self):
+        """Restore the favorites set from the durable store if Redis lost it."""
+        try:
+            if not self.redis.exists(self.FAVORITES_KEY):
+                favorite_keys = self.durable.favorite_keys()
+                if favorite_keys:
+                    self.redis.sadd(self.FAVORITES_KEY, *favorite_keys)
+                    logger.info("Restored %d favorites from the durable store.", len(favorite_keys))
+        except redis.exceptions.RedisError as e:
+            logger.error("Redis error while restoring favorites from the durable store: %s", e)
+
+    def backfill_durable_store(self, batch_size=500):
+        """
+        Copy the favorites and completed tracks already cached in Redis to the durable store,
+        e.g. when it is first enabled. A one-off step (see src/durable_backfill.py) rather than
+        startup work: it scans every track, in pipelined batches of `batch_size`.
+        Returns the number of tracks saved, or None on failure.
+        """
+        if not self.redis or not self.durable:
+            return None
+        saved = 0
+        try:
+            cache_keys = self.binary_redis.scan_iter(match=f"{self.key_prefix}track_*", count=batch_size, _type="hash")
+            while batch := list(itertools.islice(cache_keys, batch_size)):
+                pipe = self.binary_redis.pipeline(transaction=False)
+                for cache_key in batch:
+                    pipe.hgetall(cache_key)
+                for cache_key, fields in zip(batch, pipe.execute()):
+                    content = {field.decode(): self._decode_value(value) for field, value in fields.items()}
+                    if content and self._is_complete(content):
+                        self.durable.put(cache_key[len(self.key_prefix):].decode(), content)
+                        saved += 1
+            self.durable.set_favorite(self.redis.smembers(self.FAVORITES_KEY), True)
+        except redis.exceptions.RedisError as e:
+            logger.error("Redis error while filling the durable store: %s", e)
+            return None
+        logger.info("Filled the durable store with %d cached tracks.", saved)
+        return saved
+
+    def _access_weight(self, now, epoch):
+        """The weight an access made at `now` adds to a score (see ACCESS_WEIGHT_LUA)."""
+        if self.half_life <= 0 or epoch is None:
+            return 1.0
+        return 2 ** ((now - float(epoch)) / self.half_life)
+
+    def _invalidate_l1(self, key):
+        """Drop a key from this process's L1 cache right away, ahead of the keyspace notification."""
+        if self.l1:
+            self.l1.invalidate(key)
+
+    def l1_stats(self):
+        """Return the L1 cache's hit-ratio metrics, or None when the L1 cache is disabled."""
+        return self.l1.stats() if self.l1 else None
+
+    def _rebuild_history(self):
+        """
+        Build the history index from the access counts if it does not exist yet.
+        """
+        try:
+            added = self.redis.eval(
+                self.REBUILD_HISTORY_SCRIPT, 3,
+                self.ACCESS_COUNT_KEY, self.HISTORY_KEY, self.FAVORITES_KEY,
+            )
+            if added:
+                logger.info("Rebuilt the LFU history index with %d keys.", added)
+        except redis.exceptions.RedisError as e:
+            logger.error("Redis error while rebuilding the LFU history index: %s", e)
 
-    def get_formatted_lfu_list(self):
+    def migrate_legacy_entries(self):
+        """
+        Convert tracks cached by older versions (a pickled dict per key) into hashes,
+        keeping their expiry. Runs once per Redis database; entries written later by a
+        not-yet-upgraded worker are converted on first access instead.
+        """
+        try:
+            if self.redis.exists(self.RECORDS_MIGRATED_KEY):
+                return 0
+            migrated = 0
+            for cache_key in self.redis.scan_iter(match=f"{self.key_prefix}track_*", _type="string"):
+                if self._migrate_legacy_entry(cache_key[len(self.key_prefix):]):
+                    migrated += 1
+            self.redis.delete(self.LEGACY_SUMMARY_KEY)
+            self.redis.set(self.RECORDS_MIGRATED_KEY, 1)
+            if migrated:
+                logger.info("Migrated %d pickled track entries to hashes.", migrated)
+            return migrated
+        except redis.exceptions.RedisError as e:
+            logger.error("Redis error while migrating legacy track entries: %s", e)
+            return 0
+
+    def _migrate_legacy_entry(self, key):
+        """Rewrite one pickled track entry as a hash with the same expiry. Returns the content."""
+        cache_key = self.key_prefix + key
+        raw = self.binary_redis.get(cache_key)
+        if raw is None:
+            return None
+        content = LEGACY_SERIALIZER.loads(raw)
+        if not isinstance(content, dict):
+            return None
+        ttl = self.binary_redis.pttl(cache_key)
+        pipe = self.binary_redis.pipeline()
+        pipe.delete(cache_key)
+        pipe.hset(cache_key, mapping=self._encode_record(content))
+        if ttl > 0:
+            pipe.pexpire(cache_key, ttl)
+        pipe.execute()
+        return content
+
+    def get_formatted_lfu_list(self, history_offset=0, history_limit=None):
         """
         Retrieve and format cached songs, separating favorites from history.
         Both lists remain sorted by access count.
+
+        History is paginated with `history_offset`/`history_limit` (all of it when no
+        limit is given). Songs are built from an HMGET of their summary fields in two
+        pipelined round-trips, whatever the number of songs; lyrics are never loaded.
         """
+        empty = {"favorites": [], "history": [], "history_total": 0}
         if not self.redis:
-            return {"favorites": [], "history": []}
-        
-        favorites = []
-        history = []
+            return empty
+
         try:
-            track_keys = self.redis.zrange(
-                self.ACCESS_COUNT_KEY, 0, -1, desc=True, withscores=True
-            )
-            favorite_keys = self.redis.smembers(self.FAVORITES_KEY)
-            
-            for key, score in track_keys:
-                content = cache.get(key)
-                if content and content.get("track_id"):
-                    song_data = self._format_song_data(key, content, score)
-                    is_favorite = key in favorite_keys
-                    song_data["is_favorite"] = is_favorite
-                    
-                    if is_favorite:
-                        favorites.append(song_data)
-                    else:
-                        history.append(song_data)
-            
+            history_end = history_offset + history_limit - 1 if history_limit else -1
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.smembers(self.FAVORITES_KEY)
+            pipe.zrevrange(self.HISTORY_KEY, history_offset, history_end, withscores=True)
+            pipe.zcard(self.HISTORY_KEY)
+            pipe.get(self.ACCESS_EPOCH_KEY)
+            favorite_keys, history_entries, history_total, epoch = pipe.execute()
+            # Scores are in the current epoch's weight scale; dividing gives decayed counts.
+            weight = self._access_weight(time.time(), epoch)
+
+            favorite_keys = sorted(favorite_keys)
+            keys = favorite_keys + [key for key, _ in history_entries]
+            if not keys:
+                return empty
+
+            # Round-trip 2: favorites' access counts and the summary fields of every song.
+            pipe = self.binary_redis.pipeline(transaction=False)
+            if favorite_keys:
+                pipe.zmscore(self.ACCESS_COUNT_KEY, favorite_keys)
+            for key in keys:
+                pipe.hmget(self.key_prefix + key, self.SUMMARY_FIELDS)
+            results = pipe.execute(raise_on_error=False)
+            favorite_scores = results.pop(0) if favorite_keys else []
+            summaries = {key: self._decode_summary(key, values) for key, values in zip(keys, results)}
+
+            favorites = []
+            favorite_entries = [
+                (key, score) for key, score in zip(favorite_keys, favorite_scores) if score is not None
+            ]
+            for key, score in sorted(favorite_entries, key=lambda entry: (entry[1], entry[0]), reverse=True):
+                song_data = self._summary_song_data(key, summaries[key], score / weight, is_favorite=True)
+                if song_data:
+                    favorites.append(song_data)
+
+            history = []
+            for key, score in history_entries:
+                song_data = self._summary_song_data(key, summaries[key], score / weight, is_favorite=False)
+                if song_data:
+                    history.append(song_data)
+
+            return {"favorites": favorites, "history": history, "history_total": history_total}
+
         except Exception as e:
             logger.error(f"An unexpected error occurred formatting cached songs: {e}", exc_info=True)
-            
-        return {"favorites": favorites, "history": history}
+
+        return empty
+
+    def _decode_summary(self, key, values):
+        """Decode an HMGET of SUMMARY_FIELDS, migrating the entry if it is still pickled."""
+        if isinstance(values, redis.exceptions.ResponseError):
+            content = self._migrate_legacy_entry(key) or {}
+            return {field: content[field] for field in self.SUMMARY_FIELDS if field in content}
+        return {
+            field: self._decode_value(value)
+            for field, value in zip(self.SUMMARY_FIELDS, values) if value is not None
+        }
+
+    def _summary_song_data(self, key, summary, score, is_favorite):
+        """Format a song from its summary fields, or return None if its cache entry is gone."""
+        if not summary.get("track_id"):
+            return None
+        song_data = self._format_song_data(key, summary, score)
+        song_data["is_favorite"] = is_favorite
+        return song_data
+
+    def _encode_value(self, value):
+        """Encode one field value for storage in a track hash."""
+        return self.serializer.dumps(value)
+
+    def _decode_value(self, raw):
+        """Decode one field value read from a track hash (any supported format)."""
+        return self.serializer.loads(raw)
+
+    def _encode_record(self, content):
+        """Encode a track dict as a hash mapping of field -> encoded value."""
+        return {field: self._encode_value(value) for field, value in content.items()}
+
+    def _decode_record(self, flat_fields):
+        """Decode the flat field/value list returned by HGETALL inside a script."""
+        return {
+            flat_fields[i].decode(): self._decode_value(flat_fields[i + 1])
+            for i in range(0, len(flat_fields), 2)
+        }
 
     def _format_song_data(self, key, content, score=None):
         """Helper function to format song data from cache content."""
@@ -226,8 +750,389 @@ class LFUCacheManager:
             "album_id": content.get("album_id")
         }
         if score is not None:
-            song_data["access_count"] = int(score)
+            song_data["access_count"] = round(score)
         return song_data
 
+
+class L1Cache:
+    """
+    An optional in-process LRU cache with a TTL, in front of Redis, for track content.
+    - Entries are dropped as soon as Redis reports a change to their key (a set by a
+      Celery task, a delete, an eviction or an expiry) via keyspace notifications.
+    - The TTL bounds staleness should a notification ever be missed.
+    - Each process listens on its own background thread, started on first use so it
+      survives forking web servers.
+    - The server must publish the events listed in REQUIRED_EVENTS (see redis.conf);
+      if it does not, the L1 cache disables itself rather than serve stale content.
+    """
+
+    # Key-space events (K) for generic commands (g), hashes (h), strings ($), expiries (x)
+    # and evictions (e).
+    REQUIRED_EVENTS = "Kgh$xe"
+
+    def __init__(self, redis_client, key_prefix, max_entries, ttl):
+        """
+        Initialize the L1Cache on top of an existing (decoding) Redis client.
+        """
+        self.redis = redis_client
+        self.key_prefix = key_prefix
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+        self._listener_pid = None
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return a copy of the cached content for `key`, or None if absent or expired."""
+        self._ensure_listener()
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def version(self):
+        """Return the invalidation counter; pass it back to set() to detect a racing invalidation."""
+        return self._version
+
+    def set(self, key, content, version):
+        """
+        Store content read from Redis, unless an invalidation arrived since `version` was
+        taken (the value read may then already be stale).
+        """
+        with self._lock:
+            if not self.enabled or version != self._version:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, dict(content))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        """Drop a key, e.g. after Redis reported that it changed."""
+        with self._lock:
+            self._version += 1
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        """Drop every entry, e.g. after the notification stream was interrupted."""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit-ratio metrics for this process's L1 cache."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+        }
+
+    def _ensure_listener(self):
+        """Start the invalidation listener once per process."""
+        if self._listener_pid == os.getpid():
+            return
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            if self._listener_pid is not None:
+                self._entries.clear()  # Entries inherited across a fork were not being kept coherent.
+            self._listener_pid = os.getpid()
+        if not self._notifications_configured():
+            return
+        try:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.psubscribe(**{f"__keyspace@*__:{self.key_prefix}track_*": self._on_keyspace_event})
+            pubsub.run_in_thread(sleep_time=1, daemon=True, exception_handler=self._on_listener_error)
+            logger.info("L1 cache invalidation listener started in process %d.", os.getpid())
+        except redis.exceptions.RedisError as e:
+            logger.error("Could not start the L1 cache invalidation listener: %s", e)
+
+    def _notifications_configured(self):
+        """
+        Check (without changing it) that Redis publishes the key-space events the listener
+        relies on. If it does not, disable the L1 cache and return False.
+        """
+        try:
+            current = self.redis.config_get("notify-keyspace-events").get("notify-keyspace-events", "")
+        except redis.exceptions.RedisError as e:
+            # Managed Redis services often disable CONFIG; the server setting cannot be verified.
+            logger.warning(
+                "Could not read notify-keyspace-events (%s); L1 entries are only bounded by their %ds TTL.",
+                e, self.ttl,
+            )
+            return True
+        missing = "".join(flag for flag in self.REQUIRED_EVENTS if flag not in current)
+        if missing and not ("A" in current and "K" in current):
+            logger.warning(
+                "Redis notify-keyspace-events is '%s' and lacks '%s' (see redis.conf). Disabling the L1 cache.",
+                current, missing,
+            )
+            with self._lock:
+                self.enabled = False
+                self._entries.clear()
+            return False
+        return True
+
+    def _on_keyspace_event(self, message):
+        """Invalidate the track whose cache key changed."""
+        channel = message["channel"]
+        cache_key = channel.split(":", 1)[1][len(self.key_prefix):]
+        self.invalidate(cache_key)
+
+    def _on_listener_error(self, error, pubsub, thread):
+        """Notifications may have been missed while disconnected, so start from an empty cache."""
+        logger.warning("L1 cache invalidation listener error: %s. Clearing the L1 cache.", error)
+        self.clear()
+        time.sleep(1)
+
+
+class RomajiLineCache:
+    """
+    A fleet-wide cache of romanized lyric lines, shared by every worker.
+    - Each line is its own Redis string with its own TTL, so lines that stop being
+      requested expire (or are evicted) individually instead of one hash growing forever.
+    - Keys include the romanizer version, so a romanization change simply starts afresh.
+    - Each lookup (MGET) or store (pipelined SETEX) is a single round-trip,
+      regardless of the number of lines.
+    """
+
+    KEY_TEMPLATE = "romaji_lines:v{version}:{digest}"
+
+    def __init__(self, redis_client, version=ROMANIZER_VERSION, ttl=None):
+        """
+        Initialize the RomajiLineCache on top of an existing Redis client.
+        """
+        self.redis = redis_client
+        self.version = version
+        self.ttl = ttl or Config.ROMAJI_LINE_CACHE_TTL
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, line):
+        """Hash a normalized line into its cache key."""
+        return self.KEY_TEMPLATE.format(
+            version=self.version, digest=hashlib.sha1(line.encode("utf-8")).hexdigest()
+        )
+
+    def get_many(self, lines):
+        """
+        Look up the romaji of many lines at once. Returns a dict of the lines found.
+        """
+        if not self.redis or not lines:
+            return {}
+        try:
+            values = self.redis.mget([self._key(line) for line in lines])
+        except redis.exceptions.RedisError as e:
+            logger.error("Redis error during romaji line cache lookup: %s", e)
+            return {}
+
+        found = {line: value for line, value in zip(lines, values) if value is not None}
+        self.hits += len(found)
+        self.misses += len(lines) - len(found)
+        logger.info(
+            "Romaji line cache: %d/%d lines hit (lifetime hit rate %.1f%%).",
+            len(found), len(lines), self.hit_rate() * 100,
+        )
+        return found
+
+    def set_many(self, romanized_lines):
+        """
+        Store a dict of normalized line -> romaji, each line with its own expiry.
+        """
+        if not self.redis or not romanized_lines:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for line, romaji in romanized_lines.items():
+                pipe.setex(self._key(line), self.ttl, romaji)
+            pipe.execute()
+        except redis.exceptions.RedisError as e:
+            logger.error("Redis error while storing romanized lines: %s", e)
+
+    def hit_rate(self):
+        """Return the fraction of line lookups served from the cache in this process."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class NegativeCache:
+    """
+    A fleet-wide memory of external lookups that found nothing, so they are not
+    repeated while the answer is unlikely to have changed.
+    - Entries are keyed by provider and normalized (title, artist), so every track
+      sharing a song shares the result.
+    - Each consecutive miss doubles the window in which the lookup is skipped, from
+      `ttl` up to `max_ttl`. The miss count is kept for another `max_ttl` after the
+      window ends, so a lookup that keeps failing keeps backing off.
+    - A successful lookup clears the entry.
+    """
+
+    KEY_TEMPLATE = "negative:{provider}:{digest}"
+
+    # Counts a miss and opens the next back-off window, on the Redis clock.
+    # KEYS: entry. ARGV: base TTL, max TTL. Returns the window in seconds.
+    RECORD_MISS_SCRIPT = """
+    local misses = redis.call('HINCRBY', KEYS[1], 'misses', 1)
+    local window = math.min(tonumber(ARGV[1]) * 2 ^ (misses - 1), tonumber(ARGV[2]))
+    local now = tonumber(redis.call('TIME')[1])
+    redis.call('HSET', KEYS[1], 'until', now + window)
+    redis.call('EXPIRE', KEYS[1], math.floor(window + tonumber(ARGV[2])))
+    return math.floor(window)
+    """
+
+    def __init__(self, redis_client, ttl=None, max_ttl=None):
+        """
+        Initialize the NegativeCache on top of an existing (decoding) Redis client.
+        """
+        self.redis = redis_client
+        self.ttl = ttl or Config.NEGATIVE_CACHE_TTL
+        self.max_ttl = max_ttl or Config.NEGATIVE_CACHE_MAX_TTL
+        self._record_miss = self.redis.register_script(self.RECORD_MISS_SCRIPT) if self.redis else None
+
+    def _key(self, provider, song_title, artist_name):
+        """Build the entry key from the case-, width- and whitespace-normalized title and artist."""
+        normalized = "\x1f".join(
+            " ".join(unicodedata.normalize("NFKC", value or "").casefold().split())
+            for value in (song_title, artist_name)
+        )
+        return self.KEY_TEMPLATE.format(
+            provider=provider, digest=hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+        )
+
+    def is_known_missing(self, provider, song_title, artist_name):
+        """Return True if the lookup missed recently and is still within its back-off window."""
+        if not self.redis:
+            return False
+        try:
+            until = self.redis.hget(self._key(provider, song_title, artist_name), "until")
+            return until is not None and float(until) > time.time()
+        except redis.exceptions.RedisError as e:
+            logger.error("Redis error during negative cache lookup: %s", e)
+            return False
+
+    def record_miss(self, provider, song_title, artist_name):
+        """Remember a lookup that found nothing. Returns the back-off window in seconds."""
+        if not self.redis:
+            return None
+        try:
+            window = self._record_miss(
+                keys=[self._key(provider, song_title, artist_name)], args=[self.ttl, self.max_ttl]
+            )
+            logger.info("Negative cache: %s found nothing for '%s - %s'; skipping it for %ds.",
+                        provider, song_title, artist_name, window)
+            return window
+        except redis.exceptions.RedisError as e:
+            logger.error("Redis error while recording a negative cache miss: %s", e)
+            return None
+
+    def clear(self, provider, song_title, artist_name):
+        """Forget the misses of a lookup that has now succeeded."""
+        if not self.redis:
+            return
+        try:
+            self.redis.delete(self._key(provider, song_title, artist_name))
+        except redis.exceptions.RedisError as e:
+            logger.error("Redis error while clearing a negative cache entry: %s", e)
+
+
+class InFlightRegistry:
+    """
+    A fleet-wide registry of the background work in progress for each track, so
+    that each stage of a track (fetch, romanize, translate, youtube) is queued at
+    most once at a time however many requests ask for it.
+    - A dispatcher claims a stage with SET NX, storing a unique token that it passes
+      to the task; the task releases the stage with that token when it finishes.
+    - Claims expire after `ttl` seconds, so a worker that dies mid-task only delays
+      the next attempt. A task that outlives its claim cannot release the claim of
+      the task dispatched after it, as release only deletes a matching token.
+    - If Redis cannot be reached, claims succeed (fail open): a duplicate task is
+      better than no task.
+    """
+
+    KEY_TEMPLATE = "inflight:{stage}:{track_id}"
+
+    # Deletes the claim only if it still holds the caller's token.
+    # KEYS: claim. ARGV: token. Returns 1 if released.
+    RELEASE_SCRIPT = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, redis_client, ttl=None):
+        """
+        Initialize the InFlightRegistry on top of an existing Redis client.
+        """
+        self.redis = redis_client
+        self.ttl = ttl or Config.IN_FLIGHT_TTL
+        self._release = self.redis.register_script(self.RELEASE_SCRIPT) if self.redis else None
+
+    def claim(self, stage, track_id):
+        """
+        Try to take ownership of the stage. Returns the claim token to pass to release(),
+        or None if the stage is already in flight.
+        """
+        token = uuid.uuid4().hex
+        if not self.redis:
+            return token
+        try:
+            key = self.KEY_TEMPLATE.format(stage=stage, track_id=track_id)
+            return token if self.redis.set(key, token, nx=True, ex=self.ttl) else None
+        except redis.exceptions.RedisError as e:
+            logger.error("Redis error while claiming %s for track_id %s: %s", stage, track_id, e)
+            return token
+
+    def release(self, stage, track_id, token):
+        """
+        Mark the stage as finished, so the next request may dispatch it again. Does
+        nothing if the claim expired and was taken by someone else (or `token` is None).
+        """
+        if not self.redis or token is None:
+            return
+        try:
+            self._release(keys=[self.KEY_TEMPLATE.format(stage=stage, track_id=track_id)], args=[token])
+        except redis.exceptions.RedisError as e:
+            logger.error("Redis error while releasing %s for track_id %s: %s", stage, track_id, e)
+
+    def dispatch_once(self, stage, track_id, task, *args):
+        """
+        Queue `task` with `args` (and the claim token as `claim_token`) unless the stage
+        is already in flight for the track, in which case the caller simply waits for
+        the existing task. Returns True if queued.
+        If queuing fails (e.g. the broker is down), the claim is released before re-raising.
+        """
+        token = self.claim(stage, track_id)
+        if token is None:
+            logger.info("%s for track_id %s is already in flight; not dispatching again.", stage, track_id)
+            return False
+        try:
+            task.delay(*args, claim_token=token)
+        except Exception:
+            self.release(stage, track_id, token)
+            raise
+        return True
+
+
 # Create a single, shared instance of the cache manager for the application to use.
-lfu_cache_manager = LFUCacheManager()
\ No newline at end of file
+lfu_cache_manager = LFUCacheManager()
+romaji_line_cache = RomajiLineCache(lfu_cache_manager.redis)
+negative_cache = NegativeCache(lfu_cache_manager.redis)
+in_flight = InFlightRegistry(lfu_cache_manager.redis)
\ No newline at end of file
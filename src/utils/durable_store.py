@@ -0,0 +1,175 @@
+"""
+Durable Track Store Module
+
+A local SQLite copy of completed tracks and of the favorites list, underneath the
+Redis cache (see LFUCacheManager). Redis runs with `maxmemory` and `allkeys-lfu`
+(see redis.conf), so under memory pressure it may evict any key, favorites and the
+favorites set included, and a restart without persistence loses everything.
+Re-creating a track means another Genius scrape, romanization and translation; with
+this store, a Redis miss is refilled from disk instead.
+
+The database runs in WAL mode, so the web and Celery processes sharing the file
+read while another one writes. Each thread of each process opens its own connection.
+
+Favorites are kept until they are unfavorited and deleted. Other tracks are kept for
+`retention` seconds after they were last saved or restored, so the file stays bounded
+by what was used recently rather than by everything ever cached.
+"""
+
+# Standard library imports
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class DurableTrackStore:
+    """
+    A SQLite table of track records and favorite flags, keyed by cache key.
+    - Records are stored whole, encoded with the track field serializer.
+    - A favorite may have a flag but no record yet, until its track completes.
+    - Records of non-favorites older than `retention` seconds (0 keeps them forever) are
+      pruned by put(), at most every PRUNE_INTERVAL seconds per process.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS tracks (
+        cache_key TEXT PRIMARY KEY,
+        record BLOB,
+        is_favorite INTEGER NOT NULL DEFAULT 0,
+        updated_at REAL NOT NULL
+    )
+    """
+    INDEX = "CREATE INDEX IF NOT EXISTS tracks_updated_at ON tracks (updated_at) WHERE is_favorite = 0"
+    # Seconds a writer waits for another process's write transaction to finish.
+    BUSY_TIMEOUT = 5
+    # Seconds between two prunes of expired records by the same process.
+    PRUNE_INTERVAL = 3600
+
+    def __init__(self, path, serializer, retention=0):
+        """
+        Initialize the DurableTrackStore. The database is created on first use.
+        """
+        self.path = path
+        self.serializer = serializer
+        self.retention = retention
+        self._local = threading.local()
+        self._next_prune = 0.0
+
+    def _connection(self):
+        """Return this thread's connection, opening it (again, after a fork) if needed."""
+        if getattr(self._local, "pid", None) != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=self.BUSY_TIMEOUT)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # In WAL mode, NORMAL only risks the last commits on a power loss, never corruption.
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(self.SCHEMA)
+            connection.execute(self.INDEX)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def get(self, key):
+        """
+        Return (record, is_favorite) for a key, with a record of None if only its
+        favorite flag is stored. Returns None if the key is unknown or on failure.
+        """
+        try:
+            row = self._connection().execute(
+                "SELECT record, is_favorite FROM tracks WHERE cache_key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error("SQLite error reading key '%s' from the durable store: %s", key, e)
+            return None
+        if row is None:
+            return None
+        record, is_favorite = row
+        return (self.serializer.loads(record) if record is not None else None), bool(is_favorite)
+
+    def put(self, key, record):
+        """Store (or replace) the record of a key, keeping its favorite flag."""
+        try:
+            with self._connection() as connection:
+                connection.execute(
+                    "INSERT INTO tracks (cache_key, record, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(cache_key) DO UPDATE SET record = excluded.record, updated_at = excluded.updated_at",
+                    (key, self.serializer.dumps(record), time.time()),
+                )
+        except sqlite3.Error as e:
+            logger.error("SQLite error writing key '%s' to the durable store: %s", key, e)
+            return False
+        if self.retention and time.monotonic() >= self._next_prune:
+            self._next_prune = time.monotonic() + self.PRUNE_INTERVAL
+            self.prune()
+        return True
+
+    def touch(self, key):
+        """Restart a record's retention period, e.g. when it was restored to Redis."""
+        try:
+            with self._connection() as connection:
+                connection.execute("UPDATE tracks SET updated_at = ? WHERE cache_key = ?", (time.time(), key))
+            return True
+        except sqlite3.Error as e:
+            logger.error("SQLite error updating key '%s' in the durable store: %s", key, e)
+            return False
+
+    def prune(self):
+        """Delete the records of non-favorites older than the retention period. Returns the number deleted."""
+        if not self.retention:
+            return 0
+        try:
+            with self._connection() as connection:
+                deleted = connection.execute(
+                    "DELETE FROM tracks WHERE is_favorite = 0 AND updated_at < ?", (time.time() - self.retention,)
+                ).rowcount
+        except sqlite3.Error as e:
+            logger.error("SQLite error pruning the durable store: %s", e)
+            return 0
+        if deleted:
+            logger.info("Pruned %d tracks older than %d days from the durable store.", deleted, self.retention // 86400)
+        return deleted
+
+    def set_favorite(self, keys, is_favorite):
+        """Flag keys as favorites (adding a row for keys without one) or unflag them."""
+        now = time.time()
+        try:
+            with self._connection() as connection:
+                if is_favorite:
+                    connection.executemany(
+                        "INSERT INTO tracks (cache_key, is_favorite, updated_at) VALUES (?, 1, ?) "
+                        "ON CONFLICT(cache_key) DO UPDATE SET is_favorite = 1",
+                        [(key, now) for key in keys],
+                    )
+                else:
+                    connection.executemany(
+                        "UPDATE tracks SET is_favorite = 0 WHERE cache_key = ?", [(key,) for key in keys]
+                    )
+            return True
+        except sqlite3.Error as e:
+            logger.error("SQLite error updating favorites in the durable store: %s", e)
+            return False
+
+    def favorite_keys(self):
+        """Return the keys of every favorite."""
+        try:
+            rows = self._connection().execute("SELECT cache_key FROM tracks WHERE is_favorite = 1").fetchall()
+        except sqlite3.Error as e:
+            logger.error("SQLite error listing favorites in the durable store: %s", e)
+            return []
+        return [key for key, in rows]
+
+    def delete(self, key):
+        """Remove a key's record and favorite flag."""
+        try:
+            with self._connection() as connection:
+                connection.execute("DELETE FROM tracks WHERE cache_key = ?", (key,))
+            return True
+        except sqlite3.Error as e:
+            logger.error("SQLite error deleting key '%s' from the durable store: %s", key, e)
+            return False
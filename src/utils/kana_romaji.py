@@ -0,0 +1,116 @@
+"""
+Kana Romaji Module
+
+A table-driven katakana to Hepburn transliterator for SudachiPy readings.
+
+SudachiPy already returns each token's reading in katakana, so romanizing it only
+needs a fixed kana mapping rather than Pykakasi's general-purpose converter. The
+lookup table below is built once at import time from the kana rows, the youon
+digraphs and the sokuon (ッ) geminates, and conversion is a greedy longest-match
+walk over it. Long vowel marks (ー) repeat the previous letter.
+
+The output is kept identical to Pykakasi's Hepburn output, including its quirks,
+so switching converters does not change any romanized lyrics. Anything that is not
+plain katakana (kanji, hiragana, Latin text, symbols) is left to Pykakasi.
+"""
+
+# Standard library imports
+import re
+from typing import Optional
+
+# --- Conversion Tables ---
+
+# Full-width katakana (ァ to ヶ) and the long vowel mark; other input falls back to Pykakasi.
+KATAKANA_READING_REGEX = re.compile(r"[ァ-ヶー]+")
+
+LONG_VOWEL_MARK = "ー"
+
+KANA_ROWS = {
+    "ァ": "a", "ア": "a", "ィ": "i", "イ": "i", "ゥ": "u", "ウ": "u", "ェ": "e", "エ": "e", "ォ": "o", "オ": "o",
+    "カ": "ka", "ガ": "ga", "キ": "ki", "ギ": "gi", "ク": "ku", "グ": "gu", "ケ": "ke", "ゲ": "ge", "コ": "ko", "ゴ": "go",
+    "サ": "sa", "ザ": "za", "シ": "shi", "ジ": "ji", "ス": "su", "ズ": "zu", "セ": "se", "ゼ": "ze", "ソ": "so", "ゾ": "zo",
+    "タ": "ta", "ダ": "da", "チ": "chi", "ヂ": "ji", "ッ": "tsu", "ツ": "tsu", "ヅ": "zu", "テ": "te", "デ": "de",
+    "ト": "to", "ド": "do",
+    "ナ": "na", "ニ": "ni", "ヌ": "nu", "ネ": "ne", "ノ": "no",
+    "ハ": "ha", "バ": "ba", "パ": "pa", "ヒ": "hi", "ビ": "bi", "ピ": "pi", "フ": "fu", "ブ": "bu", "プ": "pu",
+    "ヘ": "he", "ベ": "be", "ペ": "pe", "ホ": "ho", "ボ": "bo", "ポ": "po",
+    "マ": "ma", "ミ": "mi", "ム": "mu", "メ": "me", "モ": "mo",
+    "ャ": "ya", "ヤ": "ya", "ュ": "yu", "ユ": "yu", "ョ": "yo", "ヨ": "yo",
+    "ラ": "ra", "リ": "ri", "ル": "ru", "レ": "re", "ロ": "ro",
+    "ヮ": "wa", "ワ": "wa", "ヰ": "i", "ヱ": "e", "ヲ": "wo", "ン": "n", "ヴ": "vu", "ヵ": "ka", "ヶ": "ke",
+}
+
+# Youon: an i-row kana followed by a small ャ/ュ/ョ (キャ -> kya, シャ -> sha, チャ -> cha, ジャ -> ja).
+YOUON_BASES = "キギシジチヂニヒビピミリ"
+SMALL_Y_KANA = {"ャ": "a", "ュ": "u", "ョ": "o"}
+
+# Foreign-sound digraphs, plus ン before a vowel, which takes an apostrophe (ンア -> n'a).
+EXTRA_DIGRAPHS = {
+    "チェ": "che", "ディ": "di",
+    "ファ": "fa", "フィ": "fi", "フェ": "fe", "フォ": "fo",
+    "ヴァ": "va", "ヴィ": "vi", "ヴェ": "ve", "ヴォ": "vo",
+    "ンア": "n'a", "ンイ": "n'i", "ンウ": "n'u", "ンエ": "n'e", "ンオ": "n'o",
+}
+
+# Kana whose consonant is doubled after a sokuon (ッカ -> kka, ッチ -> tchi). Pykakasi
+# leaves ゼ out (ッゼ -> tsuze), and ナ/マ/ワ-row kana and vowels are never doubled.
+GEMINATE_KANA = set("カガキギクグケゲコゴサザシジスズセソゾタダチヂツヅテデトドハバパヒビピフブプヘベペホボポヤユヨラリルレロヴ")
+
+# Pykakasi does not geminate these digraphs and spells ッヂャ/ッヂュ/ッヂョ with a "y".
+NON_GEMINATE_DIGRAPHS = {"チェ", "ディ"}
+GEMINATE_OVERRIDES = {"ッヂャ": "jjya", "ッヂュ": "jjyu", "ッヂョ": "jjyo"}
+
+
+def _build_table() -> dict:
+    """Build the katakana -> Hepburn lookup table (keys are one to three kana long)."""
+    table = dict(KANA_ROWS)
+
+    for base in YOUON_BASES:
+        stem = KANA_ROWS[base][:-1]  # Drop the "i": ki -> k, shi -> sh, ji -> j.
+        glide = "" if stem in ("sh", "ch", "j") else "y"
+        for small, vowel in SMALL_Y_KANA.items():
+            table[base + small] = stem + glide + vowel
+
+    table.update(EXTRA_DIGRAPHS)
+
+    for kana, romaji in list(table.items()):
+        if kana[0] not in GEMINATE_KANA or kana in NON_GEMINATE_DIGRAPHS:
+            continue
+        doubled = "t" if romaji.startswith("ch") else romaji[0]
+        table["ッ" + kana] = doubled + romaji
+
+    table.update(GEMINATE_OVERRIDES)
+    return table
+
+
+KATAKANA_HEPBURN_TABLE = _build_table()
+MAX_KEY_LENGTH = max(len(key) for key in KATAKANA_HEPBURN_TABLE)
+
+
+def katakana_to_hepburn(text: str) -> Optional[str]:
+    """
+    Transliterate a katakana string to Hepburn romaji.
+
+    Returns None when the text contains anything other than katakana and the long
+    vowel mark, so the caller can fall back to Pykakasi.
+    """
+    if not KATAKANA_READING_REGEX.fullmatch(text):
+        return None
+
+    table = KATAKANA_HEPBURN_TABLE
+    parts = []
+    i, length = 0, len(text)
+    while i < length:
+        if text[i] == LONG_VOWEL_MARK:
+            # Repeat the last letter written (コーヒー -> koohii), or a dash at the start.
+            parts.append(parts[-1][-1] if parts else "-")
+            i += 1
+            continue
+        # Greedy longest match; single kana are always in the table.
+        for size in range(min(MAX_KEY_LENGTH, length - i), 0, -1):
+            romaji = table.get(text[i:i + size])
+            if romaji is not None:
+                parts.append(romaji)
+                i += size
+                break
+    return "".join(parts)
@@ -0,0 +1,200 @@
+"""
+Metrics Module
+
+Counters and histograms in the Prometheus text format, aggregated in Redis so that
+the `/metrics` endpoint reports the totals of every gunicorn worker and Celery
+worker process, wherever they run.
+
+Each time series is one field of a single Redis hash, named exactly as its line in
+the exposition format (e.g. `track_cache_requests_total{result="hit"}`), so
+aggregation is a plain HINCRBY and rendering a plain HGETALL. Recording only
+updates an in-process buffer; at most every METRICS_FLUSH_INTERVAL seconds it is
+flushed to Redis in one pipeline on a background thread, so instrumentation adds no
+round-trip to requests. Celery workers also flush after every task.
+"""
+
+# Standard library imports
+import bisect
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Third-party imports
+import redis
+from flask import g, request
+
+# Local application imports
+from src.config import Config
+from src.extensions import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from a Redis round-trip to a slow Genius scrape.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Every metric with its type and help text; recording an undeclared metric is a bug.
+METRICS = {
+    "track_cache_requests_total": ("counter", "Track cache reads by result (l1_hit, hit, durable_hit or miss)."),
+    "track_cache_evictions_total": ("counter", "Tracks evicted from the LFU cache."),
+    "track_cache_operation_seconds": ("histogram", "Latency of track cache operations against Redis."),
+    "http_requests_total": ("counter", "HTTP requests by endpoint, method and status code."),
+    "http_request_duration_seconds": ("histogram", "HTTP request latency by endpoint."),
+    "celery_task_duration_seconds": ("histogram", "Celery task run time by task."),
+    "celery_task_failures_total": ("counter", "Celery tasks that failed (raised or fell back to an error value), by task."),
+}
+
+SERIES_REGEX = re.compile(r'^(?P<name>[a-z_]+?)(?P<suffix>_bucket|_sum|_count)?(?:\{(?P<labels>.*)\})?$')
+LE_REGEX = re.compile(r',?le="([^"]+)"')
+
+
+def _series(name, labels):
+    """Format a series name, e.g. _series("x_total", {"a": "b"}) -> 'x_total{a="b"}'."""
+    if not labels:
+        return name
+    label_text = ",".join(f'{key}="{str(value).replace(chr(34), "")}"' for key, value in labels.items())
+    return f"{name}{{{label_text}}}"
+
+
+class Metrics:
+    """
+    A process-wide metrics recorder.
+    - inc() and observe() buffer updates in memory, under a lock.
+    - Buffers are flushed to one Redis hash, at most every `flush_interval` seconds,
+      on a background daemon thread.
+    - render() returns the fleet-wide totals in the Prometheus text format.
+    """
+
+    REDIS_KEY = "metrics:v1"
+
+    def __init__(self, flush_interval=None):
+        self.flush_interval = Config.METRICS_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self._reset()
+        # A forked child (prefork Celery, gunicorn) must not flush its parent's buffer again.
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(int)
+        self._sums = defaultdict(float)
+        self._last_flush = time.monotonic()
+        self._flush_thread = None
+
+    def inc(self, name, labels=None, amount=1):
+        """Add `amount` to a counter."""
+        with self._lock:
+            self._counts[_series(name, labels)] += amount
+        self._maybe_flush()
+
+    def observe(self, name, value, labels=None, buckets=DEFAULT_BUCKETS):
+        """Record one observation (in seconds) in a histogram."""
+        labels = labels or {}
+        first_bucket = bisect.bisect_left(buckets, value)
+        with self._lock:
+            # Lower buckets get a 0 increment so that every bucket of the series exists.
+            for index, bound in enumerate(buckets):
+                self._counts[_series(f"{name}_bucket", {**labels, "le": bound})] += index >= first_bucket
+            self._counts[_series(f"{name}_bucket", {**labels, "le": "+Inf"})] += 1
+            self._counts[_series(f"{name}_count", labels)] += 1
+            self._sums[_series(f"{name}_sum", labels)] += value
+        self._maybe_flush()
+
+    @contextmanager
+    def timer(self, name, labels=None):
+        """Observe the duration of the `with` block in a histogram."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, labels)
+
+    def _maybe_flush(self):
+        """Start a background flush once the interval has passed, unless one is still running."""
+        if time.monotonic() - self._last_flush < self.flush_interval:
+            return
+        with self._lock:
+            if time.monotonic() - self._last_flush < self.flush_interval or (
+                self._flush_thread is not None and self._flush_thread.is_alive()
+            ):
+                return
+            self._last_flush = time.monotonic()
+            self._flush_thread = threading.Thread(target=self.flush, name="metrics-flush", daemon=True)
+        self._flush_thread.start()
+
+    def flush(self):
+        """Send the buffered updates to Redis in one pipeline."""
+        with self._lock:
+            counts, sums = self._counts, self._sums
+            self._counts, self._sums = defaultdict(int), defaultdict(float)
+            self._last_flush = time.monotonic()
+        if not counts and not sums:
+            return
+        try:
+            pipe = get_redis_client().pipeline(transaction=False)
+            for field, amount in counts.items():
+                pipe.hincrby(self.REDIS_KEY, field, amount)
+            for field, amount in sums.items():
+                pipe.hincrbyfloat(self.REDIS_KEY, field, amount)
+            pipe.execute()
+        except redis.exceptions.RedisError as e:
+            logger.error("Redis error while flushing metrics (%d series dropped): %s", len(counts) + len(sums), e)
+
+    def render(self):
+        """Return the aggregated metrics of every process in the Prometheus text format."""
+        self.flush()
+        try:
+            values = get_redis_client(decode_responses=True).hgetall(self.REDIS_KEY)
+        except redis.exceptions.RedisError as e:
+            logger.error("Redis error while reading metrics: %s", e)
+            values = {}
+
+        families = defaultdict(list)
+        for field, value in values.items():
+            match = SERIES_REGEX.match(field)
+            if not match:
+                continue
+            name = match["name"] if match["name"] in METRICS else match["name"] + (match["suffix"] or "")
+            families[name].append(field)
+
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            if name not in families:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for field in sorted(families[name], key=self._sort_key):
+                lines.append(f"{field} {values[field]}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _sort_key(field):
+        """Group a histogram's series by labels, with buckets in ascending `le` order."""
+        match = LE_REGEX.search(field)
+        if not match:
+            return LE_REGEX.sub("", field), 0, float("inf")
+        return LE_REGEX.sub("", field), -1, float(match.group(1))
+
+    def init_app(self, app):
+        """Record the latency and status of every request handled by `app`."""
+
+        @app.before_request
+        def _start_request_timer():
+            g.metrics_request_start = time.perf_counter()
+
+        @app.after_request
+        def _record_request(response):
+            start = g.pop("metrics_request_start", None)
+            if start is not None:
+                endpoint = request.endpoint or "unmatched"
+                self.observe("http_request_duration_seconds", time.perf_counter() - start, {"endpoint": endpoint})
+                self.inc("http_requests_total", {
+                    "endpoint": endpoint, "method": request.method, "status": response.status_code,
+                })
+            return response
+
+
+# A single, shared recorder for the application to use.
+metrics = Metrics()
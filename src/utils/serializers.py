@@ -0,0 +1,126 @@
+"""
+Cache Serializers Module
+
+Encodes the field values of cached track hashes (see LFUCacheManager). Lyrics make
+up nearly all of a track's size and Redis is capped by `maxmemory` in redis.conf,
+so smaller values mean more tracks fit in the cache and more requests hit it.
+
+- MsgpackFieldSerializer packs values with msgpack and compresses those larger than
+  a threshold with zlib or, when the `zstandard` package is installed, zstd.
+- JSONFieldSerializer writes the plain JSON values of earlier versions.
+
+Every encoded value starts with a one-byte format tag. JSON text never starts with
+one of these control bytes, so either serializer reads values written by the other,
+and existing JSON entries stay readable without a migration.
+"""
+
+# Standard library imports
+import json
+import logging
+import zlib
+
+# Third-party imports
+import msgpack
+
+try:
+    import zstandard
+except ImportError:  # zstd compression is optional.
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Format tags: the first byte of every value written by MsgpackFieldSerializer.
+MSGPACK_RAW = b"\x01"
+MSGPACK_ZLIB = b"\x02"
+MSGPACK_ZSTD = b"\x03"
+
+COMPRESSIONS = ("zlib", "zstd", "none")
+
+
+def _zstd_decompress(data):
+    if zstandard is None:
+        raise ValueError("Cache value is zstd-compressed, but the zstandard package is not installed.")
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+DECOMPRESSORS = {
+    MSGPACK_RAW: lambda data: data,
+    MSGPACK_ZLIB: zlib.decompress,
+    MSGPACK_ZSTD: _zstd_decompress,
+}
+
+
+# Raised on corrupt or unrecognized values (msgpack and JSON errors are ValueErrors).
+DECODE_ERRORS = (ValueError, TypeError, zlib.error) + ((zstandard.ZstdError,) if zstandard else ())
+
+
+def decode_value(raw):
+    """
+    Decode a field value written by any serializer in this module. A corrupt or
+    unrecognized value is logged and returned as text, so one bad field cannot
+    fail the whole request that reads it.
+    """
+    try:
+        decompress = DECOMPRESSORS.get(bytes(raw[:1]))
+        if decompress is None:
+            return json.loads(raw)
+        return msgpack.unpackb(decompress(raw[1:]), raw=False)
+    except DECODE_ERRORS as e:
+        logger.warning("Could not decode a cached value (%s); returning it as raw text.", e)
+        return bytes(raw).decode("utf-8", errors="replace")
+
+
+class JSONFieldSerializer:
+    """Plain JSON values, as stored before compression was added."""
+
+    def dumps(self, value):
+        return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+    def loads(self, raw):
+        return decode_value(raw)
+
+
+class MsgpackFieldSerializer:
+    """
+    msgpack values, compressed when at least `min_size` bytes long. A value is only
+    stored compressed if that actually makes it smaller.
+    """
+
+    def __init__(self, compression="zlib", min_size=256, level=None):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown cache compression '{compression}', expected one of {COMPRESSIONS}.")
+        if compression == "zstd" and zstandard is None:
+            logger.warning("TRACK_COMPRESSION is zstd, but the zstandard package is not installed. Using zlib.")
+            compression = "zlib"
+        self.compression = compression
+        self.min_size = min_size
+
+        if compression == "zstd":
+            self.tag = MSGPACK_ZSTD
+            self._compress = zstandard.ZstdCompressor(level=level or 6).compress
+        elif compression == "zlib":
+            self.tag = MSGPACK_ZLIB
+            self._compress = lambda data: zlib.compress(data, level or 6)
+        else:
+            self.tag = None
+            self._compress = None
+
+    def dumps(self, value):
+        packed = msgpack.packb(value, use_bin_type=True)
+        if self._compress and len(packed) >= self.min_size:
+            compressed = self._compress(packed)
+            if len(compressed) < len(packed):
+                return self.tag + compressed
+        return MSGPACK_RAW + packed
+
+    def loads(self, raw):
+        return decode_value(raw)
+
+
+def create_field_serializer(name="msgpack", compression="zlib", min_size=256):
+    """Create the field serializer selected by TRACK_SERIALIZER and TRACK_COMPRESSION."""
+    if name == "json":
+        return JSONFieldSerializer()
+    if name == "msgpack":
+        return MsgpackFieldSerializer(compression=compression, min_size=min_size)
+    raise ValueError(f"Unknown cache serializer '{name}', expected 'msgpack' or 'json'.")
@@ -3,18 +3,25 @@ Text Processors Module
 
 This module provides utility functions for processing lyrics, including:
 - Cleaning raw lyrics.
-- Romanizing Japanese text using SudachiPy for tokenization and Pykakasi for romanization.
+- Romanizing Japanese text using SudachiPy for tokenization and a kana table (with Pykakasi
+  as the fallback) for romanization.
 - A final formatting function to ensure consistent capitalization and spacing.
 """
 
 # Standard library imports
 import re
+from functools import lru_cache
 
 # Local application imports
-from src.extensions import KKS_CONVERTER as kks
-from src.extensions import TOKENIZER_OBJ as tokenizer
+from src.config import Config
+from src.extensions import get_kks_converter, get_tokenizer
+from src.utils.kana_romaji import katakana_to_hepburn
 
 # --- Constants for Performance and Clarity ---
+
+# Bump whenever a change alters romanization output, so cached lines are not reused.
+ROMANIZER_VERSION = 1
+
 JAPANESE_REGEX = re.compile(
     r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff66-\uff9f]"
 )
@@ -25,6 +32,20 @@ PARTICLE_MAP = {
     ("を", "助詞"): "o",
 }
 
+# Genius boilerplate: the "N Contributors ... Lyrics" header, the "You might also like"
+# footer, the trailing "NEmbed" counter, [Section] annotations with zero-width spaces,
+# and translation notes that Genius mixes into the lyrics.
+GENIUS_HEADER_REGEX = re.compile(r"^\d+\s*Contributors?.+?Lyrics\s*", re.DOTALL | re.IGNORECASE)
+GENIUS_FOOTER_REGEX = re.compile(r"\d*You might also like", re.IGNORECASE)
+GENIUS_EMBED_REGEX = re.compile(r"\d+Embed$")
+GENIUS_ANNOTATION_REGEX = re.compile(r"\[[^\]]*\]|\u200b")
+GENIUS_SKIP_LINE_REGEX = re.compile(
+    r"[。？！」]?\s*English:|^\s*The first thing you can do is to", re.IGNORECASE
+)
+
+# Sudachi rejects inputs above ~48 KiB, so batched tokenization is chunked below that.
+TOKENIZE_CHUNK_BYTES = 32 * 1024
+
 PUNCTUATION_MAP = str.maketrans({
     "、": ",", "。": ".", "…": "...", "「": '"', "」": '"',
     "『": '"', "』": '"', "？": "?", "！": "!", "　": " "
@@ -32,6 +53,27 @@ PUNCTUATION_MAP = str.maketrans({
 
 # --- Helper Functions ---
 
+@lru_cache(maxsize=Config.ROMAJI_TOKEN_CACHE_SIZE)
+def token_to_romaji(surface: str, reading: str, pos: str) -> str:
+    """
+    Convert a single token to Hepburn romaji, memoized per (surface, reading, POS).
+
+    Katakana readings go through the table-driven converter in kana_romaji;
+    Pykakasi is only used for tokens with no katakana reading (symbols, Latin
+    text, unknown words). Lyrics repeat the same tokens constantly, so each
+    distinct token is only converted once per process. Use `romaji_cache_info()`
+    to inspect the hit/miss counters.
+    """
+    text_to_convert = reading if reading else surface
+    romaji = katakana_to_hepburn(text_to_convert)
+    if romaji is None:
+        romaji = "".join([part['hepburn'] for part in get_kks_converter().convert(text_to_convert)])
+    return romaji
+
+def romaji_cache_info():
+    """Return the hit/miss statistics of the per-token romaji cache."""
+    return token_to_romaji.cache_info()
+
 def is_japanese_text(text: str) -> bool:
     """
     Check if a string contains any Japanese characters using a pre-compiled regex.
@@ -39,28 +81,44 @@ def is_japanese_text(text: str) -> bool:
     return JAPANESE_REGEX.search(text) is not None
 
 def clean_genius_metadata(lyrics: str) -> str:
-    """Remove unwanted boilerplate metadata and lines from raw Genius lyrics."""
+    """
+    Remove unwanted boilerplate metadata and lines from raw Genius lyrics.
+
+    All patterns are pre-compiled. The header and footer are cut by slicing,
+    annotations are removed in a single substitution, and filtered lines and
+    blank-line runs are dropped together in one pass over the lines.
+    """
     if not isinstance(lyrics, str):
         return "[Error: Invalid input]"
-    
-    lyrics = re.sub(r"^\d+\s*Contributors?.+?Lyrics\s*", "", lyrics, flags=re.DOTALL | re.IGNORECASE)
-    lyrics = re.sub(r"\d*You might also like.*", "", lyrics, flags=re.DOTALL | re.IGNORECASE)
-    lyrics = re.sub(r"\d+Embed$", "", lyrics.strip())
-    lyrics = re.sub(r"\[[^\]]*\]", "", lyrics)
-    lyrics = lyrics.replace('\u200b', '')
+
+    header = GENIUS_HEADER_REGEX.match(lyrics)
+    if header:
+        lyrics = lyrics[header.end():]
+
+    footer = GENIUS_FOOTER_REGEX.search(lyrics)
+    if footer:
+        lyrics = lyrics[:footer.start()]
+
+    lyrics = lyrics.strip()
+    if lyrics.endswith("Embed"):
+        lyrics = GENIUS_EMBED_REGEX.sub("", lyrics)
+    lyrics = GENIUS_ANNOTATION_REGEX.sub("", lyrics)
 
     cleaned_lines = []
+    previous_blank = False
     for line in lyrics.splitlines():
-        if re.search(r"[。？！」]?\s*English:", line, re.IGNORECASE):
-            continue
-        if re.match(r"^\s*The first thing you can do is to.*", line, re.IGNORECASE):
+        if not line:
+            # Collapse runs of blank lines into a single one.
+            if previous_blank:
+                continue
+            previous_blank = True
+        elif GENIUS_SKIP_LINE_REGEX.search(line):
             continue
+        else:
+            previous_blank = False
         cleaned_lines.append(line)
-    
-    lyrics = "\n".join(cleaned_lines)
-    lyrics = re.sub(r"(\r\n|\r|\n){2,}", "\n\n", lyrics)
-    
-    return lyrics.strip()
+
+    return "\n".join(cleaned_lines).strip()
 
 def format_processed_text(text: str) -> str:
     """
@@ -87,69 +145,190 @@ def format_processed_text(text: str) -> str:
 
 # --- Main Romanization Logic ---
 
-def romanize_lyrics(lyrics: str) -> str:
+def tokenize_lines(lines: list) -> list:
     """
-    Romanize Japanese lyrics using a more accurate, context-aware approach.
+    Tokenize many lines with as few SudachiPy calls as possible.
+
+    Lines are joined into newline-separated chunks (bounded by
+    TOKENIZE_CHUNK_BYTES, since Sudachi rejects very long inputs), each chunk is
+    tokenized in a single call, and the morphemes are mapped back to their lines.
+    Tokens are returned as (surface, reading, part_of_speech) tuples, one list per
+    input line. An entry is None when its chunk could not be split cleanly on line
+    boundaries, in which case the caller should tokenize that line on its own.
     """
-    if not lyrics or not isinstance(lyrics, str):
-        return lyrics or "[Error: Invalid input]"
+    token_lists = [None] * len(lines)
+    chunk_start, chunk_bytes = 0, 0
 
-    romanized_lines = []
-    lines = lyrics.splitlines()
+    for index, line in enumerate(lines):
+        line_bytes = len(line.encode("utf-8")) + 1
+        if index > chunk_start and chunk_bytes + line_bytes > TOKENIZE_CHUNK_BYTES:
+            _tokenize_chunk(lines, chunk_start, index, token_lists)
+            chunk_start, chunk_bytes = index, 0
+        chunk_bytes += line_bytes
 
-    for line in lines:
-        if not is_japanese_text(line):
-            romanized_lines.append(line)
+    if chunk_start < len(lines):
+        _tokenize_chunk(lines, chunk_start, len(lines), token_lists)
+    return token_lists
+
+def tokenize_line(line: str) -> list:
+    """Tokenize a single line into (surface, reading, part_of_speech) tuples."""
+    tokenizer = get_tokenizer()
+    return [
+        (token.surface(), token.reading_form(), token.part_of_speech()[0])
+        for token in tokenizer.tokenize(line, tokenizer.SplitMode.C)
+    ]
+
+def _tokenize_chunk(lines: list, start: int, end: int, token_lists: list) -> None:
+    """Tokenize lines[start:end] in one call and distribute the tokens per line."""
+    tokenizer = get_tokenizer()
+    try:
+        morphemes = tokenizer.tokenize("\n".join(lines[start:end]), tokenizer.SplitMode.C)
+    except Exception:
+        return
+
+    line_tokens = [[] for _ in range(start, end)]
+    line_index = 0
+    for morpheme in morphemes:
+        surface = morpheme.surface()
+        if "\n" in surface:
+            # Sudachi merges the joining newline with neighbouring whitespace;
+            # give each line back its own share of it.
+            if not surface.isspace():
+                return
+            pieces = surface.split("\n")
+            for offset, piece in enumerate(pieces):
+                if piece:
+                    line_tokens[line_index + offset].append((piece, piece, "空白"))
+            line_index += len(pieces) - 1
+            continue
+        line_tokens[line_index].append((surface, morpheme.reading_form(), morpheme.part_of_speech()[0]))
+
+    token_lists[start:end] = line_tokens
+
+def _romanize_tokens(tokens: list) -> str:
+    """Romanize the tokens of a single line, handling particles and sokuon."""
+    processed_line = []
+
+    for i, (surface, reading, pos) in enumerate(tokens):
+        pos_tuple = (surface, pos)
+
+        if pos_tuple in PARTICLE_MAP:
+            processed_line.append(PARTICLE_MAP[pos_tuple])
             continue
+
+        if not is_japanese_text(surface):
+            processed_line.append(surface)
+            continue
+
+        current_romaji = token_to_romaji(surface, reading, pos)
+        
+        if "っ" in reading or "ッ" in reading:
+            if i + 1 < len(tokens):
+                next_token = tokens[i+1]
+                if is_japanese_text(next_token[0]):
+                    next_romaji_full = token_to_romaji(*next_token)
+                    
+                    first_consonant = ''
+                    for char in next_romaji_full:
+                        if char not in 'aeiouAEIOU':
+                            first_consonant = char
+                            break
+                    
+                    if first_consonant:
+                        if next_romaji_full.startswith('ch'):
+                            current_romaji = current_romaji.replace('tsu', 't')
+                        else:
+                            current_romaji = current_romaji.replace('tsu', first_consonant)
+            else:
+                current_romaji = current_romaji.replace('tsu', '')
         
+        processed_line.append(current_romaji)
+
+    return " ".join(processed_line).translate(PUNCTUATION_MAP)
+
+def normalize_line(line: str) -> str:
+    """
+    Normalize a lyric line for line-level caching without changing its romaji.
+
+    Leading whitespace never influences the result, and trailing whitespace only
+    matters through its presence (it stops a line-final sokuon from being dropped),
+    so both are reduced to that minimal form.
+    """
+    stripped = line.strip()
+    if stripped and line[-1].isspace():
+        return stripped + " "
+    return stripped
+
+def _romanize_lines(lines: list, line_cache=None, known_lines=None) -> list:
+    """
+    Romanize a batch of raw lyric lines, returning them unformatted and in order.
+
+    Each distinct (normalized) Japanese line is romanized once. `known_lines` holds
+    lines already romanized earlier in the same song. The rest are looked up in the
+    `line_cache` (see `RomajiLineCache`) with a single `get_many` call, and only the
+    misses are tokenized, in batched SudachiPy calls (see `tokenize_lines`), before
+    being written back with `set_many`.
+    """
+    known_lines = {} if known_lines is None else known_lines
+    romanized_lines = list(lines)
+    japanese_indices = [i for i, line in enumerate(romanized_lines) if is_japanese_text(line)]
+    unique_lines = [
+        line for line in dict.fromkeys(normalize_line(romanized_lines[i]) for i in japanese_indices)
+        if line not in known_lines
+    ]
+
+    if line_cache is not None and unique_lines:
+        known_lines.update(line_cache.get_many(unique_lines))
+    pending_lines = [line for line in unique_lines if line not in known_lines]
+    fresh_results = {}
+
+    for line, tokens in zip(pending_lines, tokenize_lines(pending_lines)):
         try:
-            tokens = tokenizer.tokenize(line, tokenizer.SplitMode.C)
-            processed_line = []
-            
-            for i, token in enumerate(tokens):
-                surface = token.surface()
-                reading = token.reading_form()
-                pos_tuple = (surface, token.part_of_speech()[0])
-
-                if pos_tuple in PARTICLE_MAP:
-                    processed_line.append(PARTICLE_MAP[pos_tuple])
-                    continue
-
-                if not is_japanese_text(surface):
-                    processed_line.append(surface)
-                    continue
-
-                text_to_convert = reading if reading else surface
-                romaji_parts = kks.convert(text_to_convert)
-                current_romaji = "".join([part['hepburn'] for part in romaji_parts])
-                
-                if "っ" in reading or "ッ" in reading:
-                    if i + 1 < len(tokens):
-                        next_token = tokens[i+1]
-                        if is_japanese_text(next_token.surface()):
-                            next_token_reading = next_token.reading_form() or next_token.surface()
-                            next_romaji_full = "".join([p['hepburn'] for p in kks.convert(next_token_reading)])
-                            
-                            first_consonant = ''
-                            for char in next_romaji_full:
-                                if char not in 'aeiouAEIOU':
-                                    first_consonant = char
-                                    break
-                            
-                            if first_consonant:
-                                if next_romaji_full.startswith('ch'):
-                                    current_romaji = current_romaji.replace('tsu', 't')
-                                else:
-                                    current_romaji = current_romaji.replace('tsu', first_consonant)
-                    else:
-                        current_romaji = current_romaji.replace('tsu', '')
-                
-                processed_line.append(current_romaji)
-
-            final_line = " ".join(processed_line).translate(PUNCTUATION_MAP)
-            romanized_lines.append(final_line)
+            if tokens is None:
+                tokens = tokenize_line(line)
+            fresh_results[line] = _romanize_tokens(tokens)
 
         except Exception as e:
-            romanized_lines.append(f"[Error processing line: {line} ({e})]")
+            known_lines[line] = f"[Error processing line: {line} ({e})]"
+
+    if line_cache is not None and fresh_results:
+        line_cache.set_many(fresh_results)
+    known_lines.update(fresh_results)
+
+    for line_index in japanese_indices:
+        romanized_lines[line_index] = known_lines[normalize_line(romanized_lines[line_index])]
+
+    return romanized_lines
+
+def romanize_lyrics_iter(lyrics: str, line_cache=None, batch_size=None):
+    """
+    Romanize Japanese lyrics, yielding each formatted output line as it is produced.
+
+    Lines are processed in batches of `batch_size` (the whole song by default), so
+    a caller can publish the first lines of a long song before the rest is done.
+    Joining the yielded lines with newlines gives exactly `romanize_lyrics`' output.
+    """
+    if not lyrics or not isinstance(lyrics, str):
+        return
+
+    lines = lyrics.splitlines()
+    if len(lines) > 1 and lines[-1] == "":
+        # format_processed_text never kept a trailing empty line.
+        lines.pop()
+
+    batch_size = batch_size or len(lines)
+    known_lines = {}
+    for batch_start in range(0, len(lines), batch_size):
+        batch = lines[batch_start:batch_start + batch_size]
+        for romanized_line in _romanize_lines(batch, line_cache, known_lines):
+            yield format_processed_text(romanized_line)
+
+def romanize_lyrics(lyrics: str, line_cache=None) -> str:
+    """
+    Romanize Japanese lyrics using a more accurate, context-aware approach.
+    See `romanize_lyrics_iter` for the line-by-line streaming variant.
+    """
+    if not lyrics or not isinstance(lyrics, str):
+        return lyrics or "[Error: Invalid input]"
 
-    return format_processed_text("\n".join(romanized_lines))
\ No newline at end of file
+    return "\n".join(romanize_lyrics_iter(lyrics, line_cache=line_cache))
@@ -17,6 +17,7 @@ document.addEventListener("DOMContentLoaded", function () {
   // --- State Tracking based on initial HTML ---
   const contentState = {
     lyrics: elements.lyricsContainer.dataset.isLoading === "true",
+    romanization: elements.romanizedText.dataset.loading === "true",
     youtube: elements.youtubeContainer.dataset.isLoading === "true",
     translation: elements.englishTab ? elements.englishTab.disabled : false,
     pageFinalized: false,
@@ -93,6 +94,7 @@ document.addEventListener("DOMContentLoaded", function () {
     const intervalId = setInterval(async () => {
       const allDone =
         !contentState.lyrics &&
+        !contentState.romanization &&
         !contentState.youtube &&
         !contentState.translation;
 
@@ -112,6 +114,13 @@ document.addEventListener("DOMContentLoaded", function () {
             elements.originalText,
             "Content failed to load. Please try refreshing."
           );
+        if (contentState.romanization)
+          updateElementText(
+            elements.romanizedText,
+            elements.romanizedText.dataset.partial === "true"
+              ? elements.romanizedText.textContent
+              : "Romanization timed out. Please try refreshing."
+          );
         if (contentState.translation)
           updateElementText(elements.englishText, "Translation timed out.");
         return;
@@ -155,10 +164,20 @@ document.addEventListener("DOMContentLoaded", function () {
           .includes("loading");
         if (contentState.lyrics && lyricsAreLoaded) {
           updateElementText(elements.originalText, data.original_lyrics);
-          updateElementText(elements.romanizedText, data.romanized_lyrics);
           contentState.lyrics = false;
         }
 
+        // Romanization runs in its own task and publishes a growing prefix
+        // (romanized_lyrics_partial) until the full text is ready.
+        if (contentState.romanization) {
+          if (!data.romanized_lyrics.toLowerCase().includes("loading")) {
+            updateElementText(elements.romanizedText, data.romanized_lyrics);
+            contentState.romanization = false;
+          } else if (data.romanized_lyrics_partial) {
+            showPartialText(elements.romanizedText, data.romanized_lyrics_partial);
+          }
+        }
+
         const translationIsLoaded =
           !data.translated_lyrics.toLowerCase().includes("loading") &&
           !data.translated_lyrics.toLowerCase().includes("in progress");
@@ -183,6 +202,12 @@ document.addEventListener("DOMContentLoaded", function () {
     }, 3000);
   }
 
+  function showPartialText(element, text) {
+    // Keep data-loading="true" so the final text still replaces it.
+    element.textContent = text;
+    element.dataset.partial = "true";
+  }
+
   function updateElementText(element, text) {
     if (element.dataset.loading === "true") {
       element.innerHTML = "";
@@ -194,7 +219,12 @@ document.addEventListener("DOMContentLoaded", function () {
     element.style.opacity = 1;
   }
 
-  if (contentState.lyrics || contentState.youtube || contentState.translation) {
+  if (
+    contentState.lyrics ||
+    contentState.romanization ||
+    contentState.youtube ||
+    contentState.translation
+  ) {
     pollForContent();
   }
 });
@@ -2,9 +2,14 @@
 conftest.py - Shared fixtures for the pytest test suite.
 """
 
+import os
+
 import pytest
 from unittest.mock import MagicMock
 
+# Tests that need the durable store create their own in a temporary directory.
+os.environ.setdefault("DURABLE_STORE_PATH", "")
+
 from src.app import create_app
 
 # --- Application Fixtures ---
@@ -88,11 +93,13 @@ def mock_celery_tasks(mocker):
     mock_fetch = mocker.patch('src.routes.fetch_and_populate_task.delay')
     mock_youtube = mocker.patch('src.routes.fetch_youtube_task.delay')
     mock_translate = mocker.patch('src.routes.translate_and_update_cache_task.delay')
+    mock_romanize = mocker.patch('src.routes.romanize_and_update_cache_task.delay')
     mock_playlist = mocker.patch('src.routes.create_spotify_playlist_task.delay')
     
     return {
         "fetch": mock_fetch,
         "translate": mock_translate,
+        "romanize": mock_romanize,
         "youtube": mock_youtube,
         "playlist": mock_playlist
     }
\ No newline at end of file
@@ -92,7 +92,7 @@ def test_api_prime_cache(authenticated_client, mocker):
         'album_id': 'a1', 'artist_id': 'ar1', 'image_url_lg': 'url'
     }
     mocker.patch('src.routes.get_playlist_details_and_tracks', return_value={'tracks': [mock_track]})
-    mocker.patch('src.routes.cache.get', return_value=None)
+    mocker.patch('src.routes.lfu_cache_manager.exists', return_value=False)
     mock_create_skeleton = mocker.patch('src.routes.create_skeleton_cache_entry')
     mocker.patch('src.routes.fetch_and_populate_task.delay')
 
@@ -100,4 +100,27 @@ def test_api_prime_cache(authenticated_client, mocker):
     assert response.status_code == 200
     data = json.loads(response.data)
     assert data['tasks_dispatched'] == 1
-    mock_create_skeleton.assert_called_once()
\ No newline at end of file
+    mock_create_skeleton.assert_called_once()
+
+def test_api_prime_cache_releases_claims_not_dispatched(authenticated_client, mocker):
+    """
+    Test that when queuing fails midway through a playlist, the tracks that
+    were claimed but not queued are released for the next priming request.
+    """
+    tracks = [
+        {'track_id': track_id, 'title': 'Title', 'artist': 'Artist',
+         'album_id': 'a1', 'artist_id': 'ar1', 'image_url_lg': 'url'}
+        for track_id in ('t1', 't2', 't3')
+    ]
+    mocker.patch('src.routes.get_playlist_details_and_tracks', return_value={'tracks': tracks})
+    mocker.patch('src.routes.lfu_cache_manager.exists', return_value=False)
+    mocker.patch('src.routes.lfu_cache_manager.redis')
+    mocker.patch('src.routes.in_flight.claim', side_effect=lambda stage, track_id: f"token-{track_id}")
+    mock_release = mocker.patch('src.routes.in_flight.release')
+    mocker.patch('src.routes.create_skeleton_cache_entry')
+    mocker.patch('src.routes.fetch_and_populate_task.delay', side_effect=[None, ConnectionError("broker down")])
+
+    response = authenticated_client.post('/api/playlist/prime_cache/p1')
+
+    assert response.status_code == 500
+    assert [c.args for c in mock_release.call_args_list] == [("fetch", "t2", "token-t2"), ("fetch", "t3", "token-t3")]
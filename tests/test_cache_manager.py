@@ -2,45 +2,332 @@
 tests/services/test_cache_manager.py - Unit tests for the LFUCacheManager.
 """
 
-from unittest.mock import MagicMock, patch
+import json
+from unittest.mock import ANY, MagicMock, patch
 
-from src.utils.cache_manager import LFUCacheManager
+import pytest
+import redis
+
+from src.utils.cache_manager import (
+    LEGACY_SERIALIZER, InFlightRegistry, L1Cache, LFUCacheManager, NegativeCache, RomajiLineCache,
+)
 
 def test_lfu_eviction_logic(mocker):
     """
-    Test that the LFU eviction correctly removes the least frequently used,
-    non-favorite item when the cache is full.
+    Test that set() checks capacity, evicts the least frequently used non-favorite,
+    registers the new key and writes the track hash in a single script call,
+    without reading the whole access-count or favorites collections.
     """
     # Mock the dependencies of the cache manager
     mock_redis = MagicMock()
     mocker.patch('src.utils.cache_manager.redis.Redis', return_value=mock_redis)
-    mocker.patch('src.utils.cache_manager.cache')
+
+    # The eviction script reports that 'track_C' was the least used non-favorite
+    mock_script = MagicMock(return_value=[b'track_C'])
+    mock_redis.register_script.return_value = mock_script
 
     # Initialize the manager with a small size for easy testing
     cache_manager = LFUCacheManager(max_entries=3)
-    cache_manager.redis = mock_redis
-
-    # --- Setup the cache state ---
-    # 1. The user's favorites list contains 'track_F'
-    mock_redis.smembers.return_value = {'track_F'}
-    
-    # 2. Configure the mock for two separate calls to zrange
-    # The first call gets ALL keys to calculate size.
-    # The second call gets the LEAST USED keys for potential eviction.
-    mock_redis.zrange.side_effect = [
-        ['track_A', 'track_B', 'track_C', 'track_F'], # First call result
-        ['track_C', 'track_A', 'track_B']             # Second call result
-    ]
-    
-    # 3. Mock the delete method itself to make the assertion clean and robust
-    mock_delete = mocker.patch.object(cache_manager, 'delete')
 
     # --- Trigger the eviction ---
-    # Add a new item, which should cause an eviction because there are 3 non-favorites
     cache_manager.set('track_D', {'data': 'new'})
 
     # --- Assertions ---
-    # The loop inside set() will check potential evictees:
-    # 1. It gets 'track_C'. It checks if it's a favorite. It's not.
-    # 2. It calls delete('track_C') and breaks the loop.
-    mock_delete.assert_called_once_with('track_C')
\ No newline at end of file
+    mock_script.assert_called_once()
+    call = mock_script.call_args.kwargs
+    assert call['keys'] == [
+        'track_access_counts', 'track_history_counts', 'favorite_tracks',
+        cache_manager.key_prefix + 'track_D', 'track_access_epoch',
+    ]
+    assert call['args'][:5] == [
+        'track_D', 3, cache_manager.key_prefix, cache_manager.default_timeout, cache_manager.half_life
+    ]
+    fields = dict(zip(call['args'][5::2], call['args'][6::2]))
+    assert cache_manager.serializer.loads(fields['data']) == 'new'
+    assert 'cached_at' in fields
+    mock_redis.zrange.assert_not_called()
+    mock_redis.smembers.assert_not_called()
+
+def test_get_reads_and_counts_in_one_script_call(mocker):
+    """
+    Test that get() fetches the track hash and bumps the access count with a single
+    script call, that counting can be switched off for polling reads, and that
+    JSON values written before compression was added are still decoded.
+    """
+    mock_redis = MagicMock()
+    mocker.patch('src.utils.cache_manager.redis.Redis', return_value=mock_redis)
+    mock_script = MagicMock(return_value=[b'track_id', b'"A"', b'song_title', b'\x01\xa3\xe6\x9b\xb2'])
+    mock_redis.register_script.return_value = mock_script
+    cache_manager = LFUCacheManager(max_entries=3)
+
+    assert cache_manager.get('track_A') == {'track_id': 'A', 'song_title': '曲'}
+    cache_manager.get('track_A', count_access=False)
+
+    keys = [cache_manager.key_prefix + 'track_A', 'track_access_counts', 'track_history_counts', 'track_access_epoch']
+    half_life = cache_manager.half_life
+    assert mock_script.call_args_list[0].kwargs == {'keys': keys, 'args': ['track_A', 1, half_life]}
+    assert mock_script.call_args_list[1].kwargs == {'keys': keys, 'args': ['track_A', 0, half_life]}
+    mock_redis.get.assert_not_called()
+
+def test_update_fields_migrates_legacy_entries(mocker):
+    """
+    Test that update_fields() sends only the changed fields, and that a track still
+    stored as a pickled dict is converted to a hash (keeping its TTL) and retried.
+    """
+    mock_redis = MagicMock()
+    mocker.patch('src.utils.cache_manager.redis.Redis', return_value=mock_redis)
+    mock_script = MagicMock(side_effect=[-1, 1])
+    mock_redis.register_script.return_value = mock_script
+    mock_redis.get.return_value = LEGACY_SERIALIZER.dumps({'track_id': 'A', 'youtube_url': ''})
+    mock_redis.pttl.return_value = 5000
+    cache_manager = LFUCacheManager(max_entries=3)
+    cache_key = cache_manager.key_prefix + 'track_A'
+
+    assert cache_manager.update_fields('track_A', {'youtube_url': 'http://yt'}, remove=['partial'])
+
+    encode = cache_manager.serializer.dumps
+    assert mock_script.call_args.kwargs == {'keys': [cache_key], 'args': [1, 'youtube_url', encode('http://yt'), 'partial']}
+    pipe = mock_redis.pipeline.return_value
+    pipe.hset.assert_called_once_with(cache_key, mapping={'track_id': encode('A'), 'youtube_url': encode('')})
+    pipe.pexpire.assert_called_once_with(cache_key, 5000)
+
+def test_bulk_favorites_change_expiry_without_reading_tracks(mocker):
+    """
+    Test that bulk favoriting and unfavoriting are one script call each, never read
+    a track, and report how many of the tracks are cached.
+    """
+    mock_redis = MagicMock()
+    mocker.patch('src.utils.cache_manager.redis.Redis', return_value=mock_redis)
+    mock_script = MagicMock(side_effect=[2, 1])
+    mock_redis.register_script.return_value = mock_script
+    cache_manager = LFUCacheManager(max_entries=3)
+
+    assert cache_manager.add_to_favorites_bulk(['track_A', 'track_B', 'track_C']) == 2
+    assert cache_manager.remove_from_favorites_bulk(['track_A', 'track_B']) == 1
+
+    assert mock_script.call_args_list[0].kwargs['args'] == [cache_manager.key_prefix, 'track_A', 'track_B', 'track_C']
+    assert mock_script.call_args_list[1].kwargs['args'] == [
+        cache_manager.key_prefix, cache_manager.default_timeout, 'track_A', 'track_B'
+    ]
+    mock_redis.get.assert_not_called()
+    mock_redis.hgetall.assert_not_called()
+    mock_redis.pipeline.assert_not_called()
+
+def test_formatted_lfu_list_reads_summaries(mocker):
+    """
+    Test that the library listing reads only the summary fields of each track in two
+    pipelined round-trips, paginates history, and skips entries that have expired.
+    """
+    mock_redis = MagicMock()
+    mocker.patch('src.utils.cache_manager.redis.Redis', return_value=mock_redis)
+    cache_manager = LFUCacheManager(max_entries=3)
+
+    def summary(track_id):
+        values = [json.dumps(track_id), json.dumps(f"Song {track_id}"), json.dumps("Artist")]
+        return [value.encode() for value in values] + [None] * (len(cache_manager.SUMMARY_FIELDS) - 3)
+
+    pipe = mock_redis.pipeline.return_value
+    pipe.execute.side_effect = [
+        [{'track_F'}, [('track_B', 4.0), ('track_C', 2.0)], 12, None],
+        [[7.0], summary('F'), summary('B'), [None] * len(cache_manager.SUMMARY_FIELDS)],
+    ]
+
+    result = cache_manager.get_formatted_lfu_list(history_offset=10, history_limit=2)
+
+    pipe.zrevrange.assert_called_once_with('track_history_counts', 10, 11, withscores=True)
+    pipe.hmget.assert_any_call(cache_manager.key_prefix + 'track_B', cache_manager.SUMMARY_FIELDS)
+    assert [song["title"] for song in result["favorites"]] == ["Song F"]
+    assert result["favorites"][0]["access_count"] == 7
+    assert [song["cache_key"] for song in result["history"]] == ["track_B"]
+    assert result["history_total"] == 12
+    pipe.hgetall.assert_not_called()
+
+def test_listing_reports_decayed_access_counts(mocker):
+    """
+    Test that listed access counts are decayed: scores are divided by the weight of
+    an access made now, which doubles every half-life since the epoch.
+    """
+    mock_redis = MagicMock()
+    mocker.patch('src.utils.cache_manager.redis.Redis', return_value=mock_redis)
+    mocker.patch('src.utils.cache_manager.time.time', return_value=1000.0 + 2 * 3600)
+    cache_manager = LFUCacheManager(max_entries=3)
+    cache_manager.half_life = 3600
+
+    pipe = mock_redis.pipeline.return_value
+    pipe.execute.side_effect = [
+        [set(), [('track_B', 12.0)], 1, '1000.0'],
+        [[json.dumps("B").encode()] + [None] * (len(cache_manager.SUMMARY_FIELDS) - 1)],
+    ]
+
+    result = cache_manager.get_formatted_lfu_list()
+
+    assert result["history"][0]["access_count"] == 3
+
+def test_unfavorite_keeps_tracks_without_default_timeout(mocker):
+    """
+    Test that with CACHE_DEFAULT_TIMEOUT=0 (no expiry), unfavoriting passes the
+    timeout through to a script that only sets an expiry when it is positive,
+    rather than running EXPIRE 0 and deleting the track.
+    """
+    mock_redis = MagicMock()
+    mocker.patch('src.utils.cache_manager.redis.Redis', return_value=mock_redis)
+    mocker.patch('src.utils.cache_manager.Config.CACHE_DEFAULT_TIMEOUT', 0)
+    mock_script = MagicMock(return_value=1)
+    mock_redis.register_script.return_value = mock_script
+    cache_manager = LFUCacheManager(max_entries=3)
+
+    assert cache_manager.default_timeout == 0
+    assert cache_manager.remove_from_favorites_bulk(['track_A']) == 1
+    assert mock_script.call_args.kwargs['args'] == [cache_manager.key_prefix, 0, 'track_A']
+    assert "if timeout > 0 then" in LFUCacheManager.UNFAVORITE_SCRIPT
+
+def test_l1_cache_lru_ttl_and_invalidation(mocker):
+    """
+    Test that the L1 cache is size-bounded (LRU), expires entries after its TTL,
+    drops invalidated keys and refuses values read before a racing invalidation.
+    """
+    mock_redis = MagicMock()
+    mock_redis.config_get.return_value = {"notify-keyspace-events": "Kgh$xe"}
+    clock = mocker.patch('src.utils.cache_manager.time.monotonic', return_value=100.0)
+    l1 = L1Cache(mock_redis, "lyrics_", max_entries=2, ttl=30)
+
+    for key in ("track_A", "track_B"):
+        l1.set(key, {"track_id": key}, l1.version())
+    assert l1.get("track_A") == {"track_id": "track_A"}  # A is now the most recently used
+    l1.set("track_C", {"track_id": "track_C"}, l1.version())
+    assert l1.get("track_B") is None
+
+    l1._on_keyspace_event({"channel": "__keyspace@0__:lyrics_track_A"})
+    assert l1.get("track_A") is None
+
+    stale_version = l1.version()
+    l1.invalidate("track_D")
+    l1.set("track_D", {"track_id": "old"}, stale_version)
+    assert l1.get("track_D") is None
+
+    clock.return_value = 131.0
+    assert l1.get("track_C") is None
+    assert l1.stats()["hits"] == 1
+    mock_redis.pubsub.return_value.psubscribe.assert_called_once()
+
+def test_l1_cache_disables_itself_without_keyspace_notifications():
+    """
+    Test that the L1 cache only reads the server's notification setting, and
+    turns itself off instead of changing it when required events are missing.
+    """
+    mock_redis = MagicMock()
+    mock_redis.config_get.return_value = {"notify-keyspace-events": "Ex"}
+    l1 = L1Cache(mock_redis, "lyrics_", max_entries=2, ttl=30)
+
+    assert l1.get("track_A") is None
+    l1.set("track_A", {"track_id": "track_A"}, l1.version())
+
+    assert not l1.enabled
+    assert l1.get("track_A") is None
+    mock_redis.config_set.assert_not_called()
+    mock_redis.pubsub.assert_not_called()
+
+def test_romaji_line_cache_batches_lookups():
+    """
+    Test that the romaji line cache resolves all lines with a single MGET,
+    stores each line under its own key with its own TTL, and tracks its hit rate.
+    """
+    mock_redis = MagicMock()
+    mock_redis.mget.return_value = ["kitto", None]
+    line_cache = RomajiLineCache(mock_redis, version=1, ttl=600)
+
+    found = line_cache.get_many(["きっと", "ずっと"])
+
+    assert found == {"きっと": "kitto"}
+    keys = mock_redis.mget.call_args[0][0]
+    assert len(keys) == 2 and all(key.startswith("romaji_lines:v1:") for key in keys)
+    assert line_cache.hit_rate() == 0.5
+
+    line_cache.set_many({"ずっと": "zutto"})
+    mock_redis.pipeline.return_value.setex.assert_called_once_with(keys[1], 600, "zutto")
+    mock_redis.pipeline.return_value.expire.assert_not_called()
+
+def test_negative_cache_keys_and_back_off_window(mocker):
+    """
+    Test that negative entries are shared by spellings that normalize alike, are
+    separate per provider, and only block lookups until their window ends.
+    """
+    mock_redis = MagicMock()
+    mocker.patch('src.utils.cache_manager.time.time', return_value=1000.0)
+    negative_cache = NegativeCache(mock_redis, ttl=60, max_ttl=3600)
+
+    key = negative_cache._key("genius", "Lemon", "Kenshi  Yonezu")
+    assert negative_cache._key("genius", "ＬＥＭＯＮ", " kenshi yonezu ") == key
+    assert negative_cache._key("youtube", "Lemon", "Kenshi Yonezu") != key
+
+    mock_redis.hget.return_value = "1060"
+    assert negative_cache.is_known_missing("genius", "Lemon", "Kenshi Yonezu")
+    mock_redis.hget.assert_called_with(key, "until")
+    mock_redis.hget.return_value = "999"
+    assert not negative_cache.is_known_missing("genius", "Lemon", "Kenshi Yonezu")
+
+    negative_cache.record_miss("genius", "Lemon", "Kenshi Yonezu")
+    mock_redis.register_script.return_value.assert_called_once_with(keys=[key], args=[60, 3600])
+
+def test_in_flight_registry_dispatches_each_stage_once():
+    """
+    Test that a stage is dispatched only by the caller whose SET NX succeeds, that
+    the task receives the claim token to release it with, and that Redis errors fail open.
+    """
+    mock_redis = MagicMock()
+    mock_redis.set.side_effect = [True, None]
+    registry = InFlightRegistry(mock_redis, ttl=120)
+    task = MagicMock()
+
+    assert registry.dispatch_once("youtube", "A", task, "A", "Song", "Artist")
+    assert not registry.dispatch_once("youtube", "A", task, "A", "Song", "Artist")
+    token = task.delay.call_args.kwargs["claim_token"]
+    task.delay.assert_called_once_with("A", "Song", "Artist", claim_token=token)
+    mock_redis.set.assert_called_with("inflight:youtube:A", ANY, nx=True, ex=120)
+
+    registry.release("youtube", "A", token)
+    mock_redis.register_script.return_value.assert_called_once_with(keys=["inflight:youtube:A"], args=[token])
+
+    mock_redis.set.side_effect = redis.exceptions.ConnectionError("down")
+    assert registry.claim("youtube", "A")
+
+def test_in_flight_release_keeps_a_newer_claim():
+    """
+    Test that a task whose claim expired and was re-claimed by another dispatcher
+    releases nothing, so the newer task keeps the stage.
+    """
+    store = {}
+    mock_redis = MagicMock()
+    mock_redis.set.side_effect = lambda key, value, nx, ex: None if key in store else store.setdefault(key, value)
+    release_script = mock_redis.register_script.return_value
+    release_script.side_effect = lambda keys, args: store.pop(keys[0]) and 1 if store.get(keys[0]) == args[0] else 0
+    registry = InFlightRegistry(mock_redis, ttl=120)
+
+    slow_token = registry.claim("fetch", "A")
+    store.clear()  # The slow task's claim expires.
+    new_token = registry.claim("fetch", "A")
+    assert new_token and new_token != slow_token
+
+    registry.release("fetch", "A", slow_token)
+    assert store == {"inflight:fetch:A": new_token}
+    assert registry.claim("fetch", "A") is None
+
+    registry.release("fetch", "A", new_token)
+    assert store == {}
+    assert "redis.call('GET', KEYS[1]) == ARGV[1]" in InFlightRegistry.RELEASE_SCRIPT
+
+def test_in_flight_registry_releases_claim_when_dispatch_fails():
+    """
+    Test that a stage whose task could not be queued (e.g. broker down) is
+    released at once instead of staying blocked until its claim expires.
+    """
+    mock_redis = MagicMock()
+    mock_redis.set.return_value = True
+    registry = InFlightRegistry(mock_redis, ttl=120)
+    task = MagicMock()
+    task.delay.side_effect = ConnectionError("broker down")
+
+    with pytest.raises(ConnectionError):
+        registry.dispatch_once("youtube", "A", task, "A", "Song", "Artist")
+    token = task.delay.call_args.kwargs["claim_token"]
+    mock_redis.register_script.return_value.assert_called_once_with(keys=["inflight:youtube:A"], args=[token])
@@ -0,0 +1,66 @@
+"""
+tests/test_cache_snapshot.py - Unit tests for the cache snapshot export/import CLI.
+"""
+
+import io
+import subprocess
+import sys
+from unittest.mock import MagicMock
+
+import msgpack
+import pytest
+
+from src.cache_snapshot import SNAPSHOT_FORMAT, export_snapshot, import_snapshot
+
+def test_snapshot_round_trip():
+    """
+    Test that an export scans tracks, scores and favorites (skipping tracks that
+    expired mid-export) and that an import pipelines them back with their TTLs.
+    """
+    source = MagicMock()
+    source.scan_iter.return_value = iter([b'lyrics_track_A', b'lyrics_track_B', b'lyrics_track_F'])
+    source.pipeline.return_value.execute.return_value = [
+        {b'track_id': b'\x01\xa1A'}, 5000, {}, -2, {b'track_id': b'\x01\xa1F'}, -1,
+    ]
+    source.zscan_iter.side_effect = [iter([(b'track_A', 3.0), (b'track_F', 1.0)]), iter([(b'track_A', 3.0)])]
+    source.sscan_iter.return_value = iter([b'track_F'])
+    source.get.return_value = b'1700000000.5'
+    snapshot = io.BytesIO()
+
+    assert export_snapshot(source, snapshot, key_prefix='lyrics_') == (2, 6)
+
+    target = MagicMock()
+    snapshot.seek(0)
+    assert import_snapshot(target, snapshot, key_prefix='lyrics_') == (2, 6)
+
+    pipe = target.pipeline.return_value
+    pipe.hset.assert_any_call('lyrics_track_A', mapping={b'track_id': b'\x01\xa1A'})
+    pipe.hset.assert_any_call('lyrics_track_F', mapping={b'track_id': b'\x01\xa1F'})
+    pipe.pexpire.assert_called_once_with('lyrics_track_A', 5000)
+    pipe.zadd.assert_any_call('track_access_counts', {'track_A': 3.0, 'track_F': 1.0})
+    pipe.zadd.assert_any_call('track_history_counts', {'track_A': 3.0})
+    pipe.sadd.assert_called_once_with('favorite_tracks', 'track_F')
+    pipe.set.assert_called_once_with('track_access_epoch', '1700000000.5')
+
+def test_import_rejects_other_snapshot_versions():
+    """
+    Test that files of another format or version are refused before anything is written.
+    """
+    target = MagicMock()
+    with pytest.raises(ValueError, match="version"):
+        import_snapshot(target, io.BytesIO(msgpack.packb({"format": SNAPSHOT_FORMAT, "version": 99})))
+    with pytest.raises(ValueError, match="Not a cache snapshot"):
+        import_snapshot(target, io.BytesIO(msgpack.packb([1, 2])))
+    target.pipeline.assert_not_called()
+
+def test_snapshot_tool_does_not_load_the_cache_manager():
+    """
+    Test that importing the snapshot tool does not create the cache manager,
+    whose startup work would write to Redis before an import begins.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, src.cache_snapshot; print('src.utils.cache_manager' in sys.modules)"],
+        capture_output=True, text=True, check=True,
+    )
+    assert result.stdout.strip() == "False"
+
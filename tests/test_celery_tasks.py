@@ -2,16 +2,20 @@
 tests/tasks/test_celery_tasks.py - Unit tests for Celery task logic.
 """
 
-from unittest.mock import MagicMock
+from unittest.mock import ANY, MagicMock
 
-from src.celery_worker import fetch_and_populate_task, translate_and_update_cache_task
+import src.celery_worker
+from src.celery_worker import (
+    fetch_and_populate_task,
+    romanize_and_update_cache_task,
+    translate_and_update_cache_task,
+)
 
 def test_fetch_and_populate_task(app, mocker):
     """
     Test the main content fetching task within a real app context.
     """
     with app.app_context():
-        mock_cache = mocker.patch('src.extensions.cache')
         mock_genius_client = MagicMock()
         mock_genius_client.search_songs.return_value = {
             "hits": [{"result": {"id": 123, "title": "Test Song", "primary_artist": {"name": "Test Artist"}}}]
@@ -21,48 +25,144 @@ def test_fetch_and_populate_task(app, mocker):
         
         mocker.patch('src.services.youtube_services.search_youtube_video', return_value="http://youtube.com/test")
         mock_translate_task = mocker.patch('src.celery_worker.translate_and_update_cache_task.delay')
-        mocker.patch('src.utils.cache_manager.lfu_cache_manager')
-
-        mock_cache.get.return_value = {"song_title": "Test Song"}
+        mock_romanize_task = mocker.patch('src.celery_worker.romanize_and_update_cache_task.delay')
+        mocker.patch('src.celery_worker.fetch_youtube_task.delay')
+        mock_manager = mocker.patch('src.utils.cache_manager.lfu_cache_manager')
 
         fetch_and_populate_task(None, "track1", "Test Song", "Test Artist")
 
-        mock_translate_task.assert_called_once_with("track1", "こんにちは")
+        mock_translate_task.assert_called_once_with("track1", "こんにちは", "Test Song", "Test Artist", claim_token=ANY)
+        mock_romanize_task.assert_called_once_with(None, "track1", "こんにちは", claim_token=ANY)
         
-        updated_content = mock_cache.set.call_args[0][1]
-        assert updated_content['original_lyrics'] == "こんにちは"
-        assert "Konnichiha" in updated_content['romanized_lyrics']
+        mock_manager.update_fields.assert_called_once_with(
+            "track_track1", {"original_lyrics": "こんにちは", "romanized_lyrics": "Loading..."}
+        )
+
+def test_fetch_task_skips_songs_recently_not_found(app, mocker):
+    """
+    Test that a song Genius recently had no lyrics for is not searched again, while
+    a fresh miss is recorded in the negative cache.
+    """
+    with app.app_context():
+        mock_genius_client = MagicMock()
+        mock_genius_client.search_songs.return_value = {"hits": []}
+        mocker.patch('src.services.genius_services.get_genius_client', return_value=mock_genius_client)
+        mocker.patch('src.celery_worker.fetch_youtube_task.delay')
+        mock_manager = mocker.patch('src.utils.cache_manager.lfu_cache_manager')
+        mock_negative = mocker.patch('src.utils.cache_manager.negative_cache')
+
+        mock_negative.is_known_missing.return_value = False
+        fetch_and_populate_task(None, "track1", "Test Song", "Test Artist")
+        mock_negative.record_miss.assert_called_once_with("genius", "Test Song", "Test Artist")
+
+        mock_negative.is_known_missing.return_value = True
+        fetch_and_populate_task(None, "track1", "Test Song", "Test Artist")
+
+        mock_genius_client.search_songs.assert_called_once()
+        mock_negative.record_miss.assert_called_once()
+        mock_manager.update_fields.assert_called_with("track_track1", {
+            "original_lyrics": "Lyrics not found for this track.",
+            "romanized_lyrics": "Lyrics not found for this track.",
+        })
+
+def test_romanize_task(app, mocker):
+    """
+    Test that the romanization task writes romanized lyrics back to the cache.
+    """
+    with app.app_context():
+        mock_manager = mocker.patch('src.utils.cache_manager.lfu_cache_manager')
+
+        romanize_and_update_cache_task(None, "track1", "こんにちは")
+
+        mock_manager.update_fields.assert_called_with(
+            "track_track1", {'romanized_lyrics': "Konnichiha"}, remove=['romanized_lyrics_partial']
+        )
+
+def test_romanize_task_releases_its_own_claim(app, mocker):
+    """
+    Test that a task releases its stage with the claim token it was dispatched with.
+    """
+    with app.app_context():
+        mocker.patch('src.utils.cache_manager.lfu_cache_manager')
+        mock_release = mocker.patch('src.utils.cache_manager.in_flight.release')
+
+        romanize_and_update_cache_task(None, "track1", "こんにちは", claim_token="token")
+
+        mock_release.assert_called_once_with("romanize", "track1", "token")
+
+def test_romanize_task_publishes_partial_lines(app, mocker):
+    """
+    Test that the romanization task publishes a growing prefix before the final result.
+    """
+    with app.app_context():
+        mocker.patch.dict(app.config, {"ROMANIZE_PUBLISH_BATCH_LINES": 1})
+        mock_manager = mocker.patch('src.utils.cache_manager.lfu_cache_manager')
+
+        romanize_and_update_cache_task(None, "track1", "こんにちは\nきっと")
+
+        updates = mock_manager.update_fields.call_args_list
+        assert updates[0].args[1] == {'romanized_lyrics_partial': "Konnichiha"}
+        assert updates[-1].args[1] == {'romanized_lyrics': "Konnichiha\nKitto"}
+        assert updates[-1].kwargs == {'remove': ['romanized_lyrics_partial']}
+
+def test_romanize_task_failure_drops_partial_lines(app, mocker):
+    """
+    Test that a failed romanization replaces the published prefix with the error,
+    so the track page does not keep showing stale partial lines.
+    """
+    with app.app_context():
+        mocker.patch.dict(app.config, {"ROMANIZE_PUBLISH_BATCH_LINES": 1})
+        mock_manager = mocker.patch('src.utils.cache_manager.lfu_cache_manager')
+        mocker.patch('src.celery_worker.romanize_lyrics_iter', side_effect=RuntimeError("dictionary error"))
+
+        romanize_and_update_cache_task(None, "track1", "こんにちは")
+
+        mock_manager.update_fields.assert_called_once_with(
+            "track_track1", {'romanized_lyrics': "An error occurred."}, remove=['romanized_lyrics_partial']
+        )
 
 def test_translate_task(app, mocker):
     """
     Test the translation sub-task's success path.
     """
     with app.app_context():
-        mock_cache = mocker.patch('src.extensions.cache')
-        mock_translator = mocker.patch('src.celery_worker.GoogleTranslator')
+        mock_manager = mocker.patch('src.utils.cache_manager.lfu_cache_manager')
+        mock_translator = mocker.patch('src.celery_worker.get_translator')
         
         mock_translator.return_value.translate.return_value = "Hello world"
-        mock_cache.get.return_value = {"original_lyrics": "こんにちは"}
 
         translate_and_update_cache_task("track1", "こんにちは")
 
-        updated_content = mock_cache.set.call_args[0][1]
-        assert updated_content['translated_lyrics'] == "Hello world"
+        mock_manager.update_fields.assert_called_once_with("track_track1", {'translated_lyrics': "Hello world"})
 
 def test_translate_task_failure(app, mocker):
     """
     Test that the translation task correctly handles an exception from the translator.
     """
     with app.app_context():
-        mock_cache = mocker.patch('src.extensions.cache')
-        mock_translator = mocker.patch('src.celery_worker.GoogleTranslator')
+        mock_manager = mocker.patch('src.utils.cache_manager.lfu_cache_manager')
+        mock_translator = mocker.patch('src.celery_worker.get_translator')
         
         # Simulate the translator raising an exception
         mock_translator.return_value.translate.side_effect = Exception("API limit reached")
-        mock_cache.get.return_value = {"original_lyrics": "こんにちは"}
 
         translate_and_update_cache_task("track1", "こんにちは")
 
         # Assert that the cache was updated with a 'failed' status
-        updated_content = mock_cache.set.call_args[0][1]
-        assert updated_content['translated_lyrics'] == "Translation failed."
\ No newline at end of file
+        mock_manager.update_fields.assert_called_once_with("track_track1", {'translated_lyrics': "Translation failed."})
+
+def test_tasks_reuse_one_app_per_process(app, mocker):
+    """
+    Test that tasks run outside an app context share one app per process instead
+    of calling create_app() for every task.
+    """
+    mock_create_app = mocker.patch('src.app.create_app', return_value=app)
+    mocker.patch.object(src.celery_worker, '_flask_app', None)
+    mock_manager = mocker.patch('src.utils.cache_manager.lfu_cache_manager')
+    mocker.patch('src.celery_worker.get_translator').return_value.translate.return_value = "Hello"
+
+    translate_and_update_cache_task("track1", "こんにちは")
+    translate_and_update_cache_task("track2", "こんにちは")
+
+    mock_create_app.assert_called_once()
+    assert mock_manager.update_fields.call_count == 2
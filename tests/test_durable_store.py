@@ -0,0 +1,123 @@
+"""
+tests/test_durable_store.py - Unit tests for the SQLite durable track store.
+"""
+
+from unittest.mock import MagicMock
+
+from src.utils.cache_manager import LFUCacheManager
+from src.utils.durable_store import DurableTrackStore
+from src.utils.serializers import MsgpackFieldSerializer
+
+COMPLETE_TRACK = {
+    "track_id": "A",
+    "song_title": "曲",
+    "original_lyrics": "歌詞",
+    "romanized_lyrics": "kashi",
+    "translated_lyrics": "lyrics",
+    "youtube_url": "http://yt",
+}
+
+def test_records_and_favorite_flags_round_trip(tmp_path):
+    """
+    Test that records and favorite flags are stored independently in a WAL-mode
+    database, and that deleting a key removes both.
+    """
+    store = DurableTrackStore(str(tmp_path / "data" / "tracks.db"), MsgpackFieldSerializer())
+
+    store.set_favorite(["track_A", "track_B"], True)
+    assert store.put("track_A", COMPLETE_TRACK)
+
+    assert store.get("track_A") == (COMPLETE_TRACK, True)
+    assert store.get("track_B") == (None, True)
+    assert store.get("track_C") is None
+    assert sorted(store.favorite_keys()) == ["track_A", "track_B"]
+
+    store.set_favorite(["track_A", "track_C"], False)
+    assert store.get("track_A") == (COMPLETE_TRACK, False)
+    assert store.get("track_C") is None
+
+    store.delete("track_A")
+    assert store.get("track_A") is None
+    assert store._connection().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+def test_completed_tracks_are_written_through_and_restored(mocker, tmp_path):
+    """
+    Test that a track is saved once its last result field is final, and that a
+    Redis miss is refilled from the durable store, as a favorite when it is one.
+    """
+    mock_redis = MagicMock()
+    mocker.patch('src.utils.cache_manager.redis.Redis', return_value=mock_redis)
+    mocker.patch('src.utils.cache_manager.Config.DURABLE_STORE_PATH', str(tmp_path / "tracks.db"))
+    mock_script = MagicMock()
+    mock_redis.register_script.return_value = mock_script
+    cache_manager = LFUCacheManager(max_entries=3)
+    encode = cache_manager.serializer.dumps
+
+    def hash_fields(content):
+        return [part for field, value in content.items() for part in (field.encode(), encode(value))]
+
+    # Translation still loading: nothing is saved.
+    mock_script.side_effect = [1, hash_fields({**COMPLETE_TRACK, "translated_lyrics": "Loading..."})]
+    cache_manager.update_fields('track_A', {'youtube_url': 'http://yt'})
+    assert cache_manager.durable.get('track_A') is None
+
+    mock_script.side_effect = [1, hash_fields(COMPLETE_TRACK)]
+    cache_manager.update_fields('track_A', {'translated_lyrics': 'lyrics'})
+    assert cache_manager.durable.get('track_A') == (COMPLETE_TRACK, False)
+
+    # Evicted from Redis: get() misses, then the track is written back with set().
+    mock_script.side_effect = [2, None, []]
+    cache_manager.add_to_favorites_bulk(['track_A'])
+    assert cache_manager.get('track_A')["romanized_lyrics"] == "kashi"
+    mock_redis.sadd.assert_called_with(cache_manager.FAVORITES_KEY, 'track_A')
+    set_call = mock_script.call_args.kwargs
+    assert set_call['keys'][3] == cache_manager.key_prefix + 'track_A'
+    assert set_call['args'][5:7] == ['track_id', encode('A')]
+
+def test_non_favorites_are_pruned_after_the_retention_period(mocker, tmp_path):
+    """
+    Test that records of non-favorites not saved or restored within the retention
+    period are pruned, while favorites and recently touched records are kept.
+    """
+    clock = mocker.patch('src.utils.durable_store.time.time', return_value=1000.0)
+    store = DurableTrackStore(str(tmp_path / "tracks.db"), MsgpackFieldSerializer(), retention=100)
+    for key in ("track_A", "track_B", "track_F"):
+        store.put(key, COMPLETE_TRACK)
+    store.set_favorite(["track_F"], True)
+
+    clock.return_value = 1050.0
+    store.touch("track_B")
+    clock.return_value = 1120.0
+
+    assert store.prune() == 1
+    assert store.get("track_A") is None
+    assert store.get("track_B") == (COMPLETE_TRACK, False)
+    assert store.get("track_F") == (COMPLETE_TRACK, True)
+
+def test_backfill_pipelines_reads_and_saves_complete_tracks(mocker, tmp_path):
+    """
+    Test that the explicit backfill reads tracks in pipelined batches and saves
+    only complete ones, and that creating the manager does not backfill.
+    """
+    mock_redis = MagicMock()
+    mocker.patch('src.utils.cache_manager.redis.Redis', return_value=mock_redis)
+    mocker.patch('src.utils.cache_manager.Config.DURABLE_STORE_PATH', str(tmp_path / "tracks.db"))
+    mock_redis.exists.return_value = 1
+    cache_manager = LFUCacheManager(max_entries=3)
+    mock_redis.scan_iter.assert_not_called()
+
+    encode = cache_manager.serializer.dumps
+    prefix = cache_manager.key_prefix.encode()
+    mock_redis.scan_iter.return_value = iter([prefix + b'track_A', prefix + b'track_B'])
+    mock_redis.pipeline.return_value.execute.return_value = [
+        {field.encode(): encode(value) for field, value in COMPLETE_TRACK.items()},
+        {b'track_id': encode('B'), b'translated_lyrics': encode('Loading...')},
+    ]
+    mock_redis.smembers.return_value = {'track_B'}
+
+    assert cache_manager.backfill_durable_store(batch_size=2) == 1
+    assert mock_redis.pipeline.return_value.hgetall.call_count == 2
+    mock_redis.hgetall.assert_not_called()
+    assert cache_manager.durable.get('track_A') == (COMPLETE_TRACK, False)
+    assert cache_manager.durable.get('track_B') == (None, True)
+
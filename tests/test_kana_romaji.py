@@ -0,0 +1,46 @@
+"""
+tests/test_kana_romaji.py - Unit tests for the table-driven katakana transliterator.
+"""
+
+import itertools
+
+import pytest
+
+from src.extensions import get_kks_converter
+from src.utils.kana_romaji import katakana_to_hepburn
+
+KATAKANA = [chr(code) for code in range(ord("ァ"), ord("ヶ") + 1)] + ["ー"]
+
+def pykakasi_hepburn(text):
+    return "".join(part['hepburn'] for part in get_kks_converter().convert(text))
+
+@pytest.mark.parametrize("reading, expected", [
+    ("キョウ", "kyou"),
+    ("ガッコウ", "gakkou"),
+    ("マッチャ", "matcha"),
+    ("コーヒー", "koohii"),
+    ("シンイチ", "shin'ichi"),
+    ("ヴァイオリン", "vaiorin"),
+    ("キーッ", "kiitsu"),
+])
+def test_katakana_to_hepburn_examples(reading, expected):
+    """
+    Test sokuon, long vowels, youon digraphs and the syllabic n.
+    """
+    assert katakana_to_hepburn(reading) == expected
+
+@pytest.mark.parametrize("text", ["", "きょう", "漢字", "love", "カ、"])
+def test_katakana_to_hepburn_rejects_non_katakana(text):
+    """
+    Test that anything other than plain katakana is left for Pykakasi.
+    """
+    assert katakana_to_hepburn(text) is None
+
+def test_katakana_to_hepburn_matches_pykakasi():
+    """
+    Test that the table reproduces Pykakasi's Hepburn output for every one- and
+    two-character katakana string, and for each of those after ッ, ン and ー.
+    """
+    for pair in itertools.chain(KATAKANA, map("".join, itertools.product(KATAKANA, repeat=2))):
+        for text in (pair, "ッ" + pair, "ン" + pair, "ー" + pair):
+            assert katakana_to_hepburn(text) == pykakasi_hepburn(text), text
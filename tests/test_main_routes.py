@@ -2,7 +2,7 @@
 tests/routes/test_main_routes.py - Integration tests for main page routes.
 """
 
-from unittest.mock import MagicMock
+from unittest.mock import ANY, MagicMock
 
 def test_search_page_protected(client):
     """
@@ -21,13 +21,42 @@ def test_search_page_authenticated(authenticated_client):
     assert response.status_code == 200
     assert b"Your Library" in response.data
 
+def test_search_page_history_pagination(authenticated_client, mocker):
+    """
+    Test that /search requests one page of history and opens the History tab
+    when browsing past the first page.
+    """
+    mock_list = mocker.patch(
+        'src.routes.lfu_cache_manager.get_formatted_lfu_list',
+        return_value={"favorites": [], "history": [], "history_total": 120},
+    )
+
+    response = authenticated_client.get('/search?history_page=2')
+
+    assert response.status_code == 200
+    mock_list.assert_called_once_with(history_offset=50, history_limit=50)
+    assert b"Page 2 of 3" in response.data
+    assert b"history_page=3" in response.data
+
+def test_metrics_endpoint_skips_auth(client, mocker):
+    """
+    Test that /metrics is served without a Spotify session, as Prometheus text.
+    """
+    mocker.patch('src.routes.metrics.render', return_value='track_cache_requests_total{result="hit"} 3\n')
+
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert b'track_cache_requests_total{result="hit"} 3' in response.data
+
 def test_track_details_cache_miss(authenticated_client, mocker, mock_spotify, mock_celery_tasks):
     """
     Test the 'cache miss' scenario for the track details page.
     It should create a skeleton entry and dispatch background tasks.
     """
     # Simulate the cache returning nothing
-    mocker.patch('src.routes.cache.get', return_value=None)
+    mocker.patch('src.routes.lfu_cache_manager.get', return_value=None)
     
     # Configure the mock_spotify object directly to avoid context errors
     mock_spotify.track.return_value = {
@@ -48,9 +77,46 @@ def test_track_details_cache_miss(authenticated_client, mocker, mock_spotify, mo
     
     # Assert that the main background task was dispatched
     mock_celery_tasks['fetch'].assert_called_once_with(
-        None, 'test_track_id', 'Test Song', 'Test Artist'
+        None, 'test_track_id', 'Test Song', 'Test Artist', claim_token=ANY
     )
 
+def test_track_details_attaches_to_fetch_in_flight(authenticated_client, mocker, mock_celery_tasks):
+    """
+    Test that a miss on a track another request is already fetching neither
+    rewrites its skeleton nor dispatches a second fetch.
+    """
+    mocker.patch('src.routes.lfu_cache_manager.get', return_value=None)
+    mocker.patch('src.routes.in_flight.claim', return_value=None)
+    mock_create_skeleton = mocker.patch('src.routes.create_skeleton_cache_entry')
+
+    response = authenticated_client.get('/track/test_track_id')
+
+    assert response.status_code == 200
+    assert b'class="skeleton skeleton-text"' in response.data
+    mock_create_skeleton.assert_not_called()
+    mock_celery_tasks['fetch'].assert_not_called()
+
+def test_track_details_releases_fetch_claim_when_dispatch_fails(authenticated_client, mocker, mock_spotify, mock_celery_tasks):
+    """
+    Test that a fetch that could not be queued releases its claim, so the next
+    request dispatches it again instead of waiting for the claim to expire.
+    """
+    mocker.patch('src.routes.lfu_cache_manager.get', return_value=None)
+    mocker.patch('src.routes.in_flight.claim', return_value='token')
+    mock_release = mocker.patch('src.routes.in_flight.release')
+    mocker.patch('src.routes.create_skeleton_cache_entry', return_value={'song_title': 'Song', 'artist_name': 'Artist'})
+    mock_celery_tasks['fetch'].side_effect = ConnectionError("broker down")
+    mock_spotify.track.return_value = {
+        "id": "test_track_id", "name": "Song",
+        "artists": [{"id": "test_artist_id", "name": "Artist"}],
+        "album": {"id": "test_album_id", "images": []}
+    }
+
+    response = authenticated_client.get('/track/test_track_id')
+
+    assert response.status_code == 302
+    mock_release.assert_called_once_with("fetch", "test_track_id", "token")
+
 def test_track_details_cache_hit_self_healing(authenticated_client, mocker, mock_celery_tasks):
     """
     Test the 'cache hit' scenario with incomplete data (self-healing).
@@ -64,7 +130,7 @@ def test_track_details_cache_hit_self_healing(authenticated_client, mocker, mock
         "youtube_url": "",
         "translated_lyrics": "Translation failed."
     }
-    mocker.patch('src.routes.cache.get', return_value=cached_content)
+    mocker.patch('src.routes.lfu_cache_manager.get', return_value=cached_content)
     
     response = authenticated_client.get('/track/test_track_id')
     
@@ -73,8 +139,22 @@ def test_track_details_cache_hit_self_healing(authenticated_client, mocker, mock
     
     mock_celery_tasks['fetch'].assert_not_called()
     mock_celery_tasks['youtube'].assert_called_once_with(
-        'test_track_id', 'Test Song', 'Test Artist'
+        'test_track_id', 'Test Song', 'Test Artist', claim_token=ANY
     )
     mock_celery_tasks['translate'].assert_called_once_with(
-        'test_track_id', 'Some lyrics'
-    )
\ No newline at end of file
+        'test_track_id', 'Some lyrics', 'Test Song', 'Test Artist', claim_token=ANY
+    )
+
+def test_track_status_does_not_count_access(authenticated_client, mocker):
+    """
+    Test that status polling reads the cache without bumping the LFU score.
+    """
+    mock_get = mocker.patch('src.routes.lfu_cache_manager.get', return_value={
+        "romanized_lyrics": "Kitto", "youtube_url": "http://y", "translated_lyrics": "Surely"
+    })
+
+    response = authenticated_client.get('/api/track/status/test_track_id')
+
+    assert response.status_code == 200
+    assert response.get_json()["status"] == "complete"
+    mock_get.assert_called_once_with("track_test_track_id", count_access=False)
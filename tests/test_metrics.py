@@ -0,0 +1,73 @@
+"""
+tests/test_metrics.py - Unit tests for the Redis-aggregated metrics recorder.
+"""
+
+import threading
+from unittest.mock import MagicMock
+
+from src.utils.metrics import Metrics
+
+def test_updates_are_buffered_and_flushed_in_one_pipeline(mocker):
+    """
+    Test that recording does not touch Redis until the flush interval has passed,
+    and that a flush sends every buffered series in a single pipeline.
+    """
+    mock_client = MagicMock()
+    mocker.patch('src.utils.metrics.get_redis_client', return_value=mock_client)
+    recorder = Metrics(flush_interval=3600)
+
+    recorder.inc("track_cache_requests_total", {"result": "hit"})
+    recorder.inc("track_cache_requests_total", {"result": "hit"}, amount=2)
+    recorder.observe("celery_task_duration_seconds", 0.3, {"task": "t"}, buckets=(0.1, 1.0))
+    mock_client.pipeline.assert_not_called()
+
+    recorder.flush()
+
+    pipe = mock_client.pipeline.return_value
+    pipe.hincrby.assert_any_call(Metrics.REDIS_KEY, 'track_cache_requests_total{result="hit"}', 3)
+    pipe.hincrby.assert_any_call(Metrics.REDIS_KEY, 'celery_task_duration_seconds_bucket{task="t",le="0.1"}', 0)
+    pipe.hincrby.assert_any_call(Metrics.REDIS_KEY, 'celery_task_duration_seconds_bucket{task="t",le="1.0"}', 1)
+    pipe.hincrbyfloat.assert_called_once_with(Metrics.REDIS_KEY, 'celery_task_duration_seconds_sum{task="t"}', 0.3)
+    pipe.execute.assert_called_once()
+
+def test_due_flush_runs_off_the_recording_thread(mocker):
+    """
+    Test that once the interval has passed, recording hands the flush to a
+    background thread instead of calling Redis itself.
+    """
+    flushed_on = []
+    mock_client = MagicMock()
+    mock_client.pipeline.side_effect = lambda **kwargs: flushed_on.append(threading.current_thread()) or MagicMock()
+    mocker.patch('src.utils.metrics.get_redis_client', return_value=mock_client)
+    recorder = Metrics(flush_interval=0)
+
+    recorder.inc("track_cache_requests_total", {"result": "hit"})
+    recorder._flush_thread.join(timeout=5)
+
+    assert flushed_on and flushed_on[0] is not threading.current_thread()
+
+def test_render_groups_series_into_prometheus_families(mocker):
+    """
+    Test that the aggregated hash is rendered with HELP/TYPE headers and with
+    histogram buckets in ascending order.
+    """
+    mock_client = MagicMock()
+    mock_client.hgetall.return_value = {
+        'http_request_duration_seconds_bucket{endpoint="main.search",le="+Inf"}': "2",
+        'http_request_duration_seconds_bucket{endpoint="main.search",le="0.5"}': "1",
+        'http_request_duration_seconds_count{endpoint="main.search"}': "2",
+        'http_request_duration_seconds_sum{endpoint="main.search"}': "1.2",
+        'track_cache_evictions_total': "4",
+    }
+    mocker.patch('src.utils.metrics.get_redis_client', return_value=mock_client)
+
+    lines = Metrics(flush_interval=3600).render().splitlines()
+
+    assert lines[:3] == [
+        "# HELP track_cache_evictions_total Tracks evicted from the LFU cache.",
+        "# TYPE track_cache_evictions_total counter",
+        "track_cache_evictions_total 4",
+    ]
+    assert lines[4] == "# TYPE http_request_duration_seconds histogram"
+    assert lines[5].startswith('http_request_duration_seconds_bucket{endpoint="main.search",le="0.5"}')
+    assert lines[6].startswith('http_request_duration_seconds_bucket{endpoint="main.search",le="+Inf"}')
@@ -0,0 +1,53 @@
+"""
+tests/test_romanize.py - Unit tests for the batch romanizer CLI.
+"""
+
+import io
+import json
+
+from src.romanize import main, read_jsonl, romanize_stream
+from src.utils.text_processors import clean_genius_metadata, romanize_lyrics
+
+RAW_LYRICS = "1 Contributor\nSong Lyrics[Verse 1]\n君の名前を\n呼んでいる\n1Embed"
+
+def test_read_jsonl_flags_bad_lines():
+    """
+    Test that invalid JSON and records without lyrics become error records.
+    """
+    stream = io.StringIO('{"id": 1, "lyrics": "あ"}\nnot json\n\n{"id": 2}\n')
+    songs = list(read_jsonl(stream, "lyrics"))
+
+    assert songs[0] == ({"id": 1, "lyrics": "あ"}, "あ")
+    assert songs[1][1] is None and "Invalid JSON" in songs[1][0]["error"]
+    assert songs[2] == ({"line": 4, "error": "Missing 'lyrics' field."}, None)
+
+def test_romanize_stream_keeps_input_order():
+    """
+    Test that results match romanize_lyrics and come back in input order even
+    when the in-flight window is smaller than the input.
+    """
+    songs = [({"id": i}, RAW_LYRICS if i % 2 else "東京タワー") for i in range(6)]
+    records = list(romanize_stream(iter(songs), workers=2, window=2))
+
+    assert [record["id"] for record in records] == list(range(6))
+    assert records[1]["original_lyrics"] == clean_genius_metadata(RAW_LYRICS)
+    assert records[1]["romanized_lyrics"] == romanize_lyrics(clean_genius_metadata(RAW_LYRICS))
+    assert records[0]["romanized_lyrics"] == romanize_lyrics("東京タワー")
+
+def test_main_romanizes_directory(tmp_path):
+    """
+    Test the CLI end to end on a directory of lyric files.
+    """
+    lyrics_dir = tmp_path / "lyrics"
+    (lyrics_dir / "album").mkdir(parents=True)
+    (lyrics_dir / "album" / "song.txt").write_text(RAW_LYRICS, encoding="utf-8")
+    output = tmp_path / "out.jsonl"
+
+    assert main([str(lyrics_dir), "--output", str(output), "--workers", "1"]) == 0
+
+    records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert records == [{
+        "path": "album/song.txt",
+        "original_lyrics": clean_genius_metadata(RAW_LYRICS),
+        "romanized_lyrics": romanize_lyrics(clean_genius_metadata(RAW_LYRICS)),
+    }]
@@ -0,0 +1,64 @@
+"""
+tests/test_serializers.py - Unit tests for the cache field serializers.
+"""
+
+import pytest
+
+from src.utils.serializers import (
+    MSGPACK_RAW,
+    MSGPACK_ZLIB,
+    JSONFieldSerializer,
+    MsgpackFieldSerializer,
+    create_field_serializer,
+)
+
+LYRICS = "\n".join(["きっと会えるよね", "Kitto aeru yo ne"] * 40)
+
+def test_msgpack_compresses_only_large_values():
+    """
+    Test that values above the threshold are compressed, small ones are stored
+    as plain msgpack, and both round-trip.
+    """
+    serializer = MsgpackFieldSerializer(compression="zlib", min_size=256)
+
+    small, large = serializer.dumps("track1"), serializer.dumps(LYRICS)
+
+    assert small[:1] == MSGPACK_RAW
+    assert large[:1] == MSGPACK_ZLIB
+    assert len(large) < len(JSONFieldSerializer().dumps(LYRICS)) / 4
+    assert serializer.loads(small) == "track1"
+    assert serializer.loads(large) == LYRICS
+
+def test_serializers_read_each_others_values():
+    """
+    Test that JSON values written by earlier versions stay readable after
+    switching to msgpack, and that switching back still reads msgpack values.
+    """
+    legacy, compact = JSONFieldSerializer(), create_field_serializer("msgpack", "zlib", 16)
+    value = {"lines": [LYRICS], "count": 3, "url": None}
+
+    assert compact.loads(legacy.dumps(value)) == value
+    assert legacy.loads(compact.dumps(value)) == value
+
+def test_unknown_settings_are_rejected():
+    """Test that a misconfigured serializer or compression fails at startup."""
+    with pytest.raises(ValueError):
+        create_field_serializer("pickle")
+    with pytest.raises(ValueError):
+        MsgpackFieldSerializer(compression="lz4")
+
+@pytest.mark.parametrize("raw", [
+    MSGPACK_ZLIB + b"not zlib data",
+    MSGPACK_RAW + b"\xc1",
+    b"{not json",
+    b"\xff\xfe",
+])
+def test_malformed_values_are_returned_as_text(raw):
+    """
+    Test that a corrupt or unrecognized stored value is returned as text
+    instead of raising, so reading it cannot fail the request.
+    """
+    value = MsgpackFieldSerializer().loads(raw)
+
+    assert isinstance(value, str)
+
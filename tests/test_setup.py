@@ -2,6 +2,9 @@
 test_setup.py - Basic tests to ensure the testing environment is configured correctly.
 """
 
+import subprocess
+import sys
+
 def test_app_creation(app):
     """
     Test if the Flask app fixture is created successfully.
@@ -15,4 +18,33 @@ def test_home_page_unauthenticated(client):
     """
     response = client.get('/')
     assert response.status_code == 200
-    assert b"Login with Spotify" in response.data
\ No newline at end of file
+    assert b"Login with Spotify" in response.data
+
+def test_web_app_boots_without_nlp_libraries():
+    """
+    Import-time audit: building the web app must not load SudachiPy, Pykakasi or
+    deep_translator. They are only initialized on first use inside the workers.
+    """
+    audit = (
+        "import sys; from src.app import create_app; create_app(); "
+        "print(','.join(m for m in ('sudachipy', 'pykakasi', 'deep_translator') if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", audit], capture_output=True, text=True, timeout=120, check=True
+    )
+    assert result.stdout.strip().splitlines()[-1:] in ([], [""])
+
+def test_redis_clients_share_one_bounded_pool(app):
+    """
+    Test that Flask-Caching and every get_redis_client() caller borrow from the same
+    bounded, health-checked pool instead of opening their own connections.
+    """
+    from src.config import Config
+    from src.extensions import cache, get_redis_client
+
+    pool = get_redis_client().connection_pool
+    assert cache.cache._write_client.connection_pool is pool
+    assert get_redis_client().connection_pool is pool
+    assert get_redis_client(decode_responses=True).connection_pool is not pool
+    assert pool.max_connections == Config.CACHE_OPTIONS["REDIS_MAX_CONNECTIONS"]
+    assert pool.connection_kwargs["health_check_interval"] == Config.REDIS_HEALTH_CHECK_INTERVAL
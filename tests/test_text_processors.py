@@ -2,7 +2,23 @@
 tests/services/test_text_processors.py - Unit tests for text processing functions.
 """
 
-from src.utils.text_processors import clean_genius_metadata, romanize_lyrics, format_processed_text
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.utils.text_processors import (
+    clean_genius_metadata,
+    romanize_lyrics,
+    romanize_lyrics_iter,
+    format_processed_text,
+    token_to_romaji,
+    tokenize_line,
+    tokenize_lines,
+    romaji_cache_info,
+)
+
+GENIUS_FIXTURES = sorted((Path(__file__).parent / "fixtures" / "genius").glob("*.txt"))
 
 def test_clean_genius_metadata():
     """
@@ -17,6 +33,17 @@ def test_clean_genius_metadata():
     assert "Embed" not in cleaned
     assert cleaned == "Hello world"
 
+@pytest.mark.parametrize("fixture_path", GENIUS_FIXTURES, ids=lambda path: path.stem)
+def test_clean_genius_metadata_fixture_corpus(fixture_path):
+    """
+    Test the cleaner against recorded Genius payloads and their expected output.
+    """
+    with open(fixture_path, encoding="utf-8", newline="") as f:
+        raw_lyrics = f.read()
+    with open(fixture_path.with_suffix(".expected"), encoding="utf-8", newline="") as f:
+        expected = f.read()
+    assert clean_genius_metadata(raw_lyrics) == expected
+
 def test_format_processed_text():
     """
     Test the final formatting of text (capitalization, spacing).
@@ -31,4 +58,55 @@ def test_romanize_lyrics_simple():
     """
     japanese_text = "こんにちは"
     romanized = romanize_lyrics(japanese_text)
-    assert romanized == "Konnichiha"
\ No newline at end of file
+    assert romanized == "Konnichiha"
+
+def test_romanize_lyrics_reuses_cached_tokens():
+    """
+    Test that repeated tokens are served from the per-token romaji cache.
+    """
+    token_to_romaji.cache_clear()
+    romanize_lyrics("きっと きっと")
+    info = romaji_cache_info()
+    assert info.misses == 1
+    assert info.hits >= 1
+
+def test_tokenize_lines_matches_per_line_tokenization():
+    """
+    Test that batched tokenization maps tokens back to the same lines as
+    tokenizing each line separately, including lines with edge whitespace.
+    """
+    lines = ["君の声が 聞こえる ", "  ずっと待ってた", "きっと会えるよね"]
+    batched = tokenize_lines(lines)
+    for line, tokens in zip(lines, batched):
+        expected = [token for token in tokenize_line(line) if not token[0].isspace()]
+        assert [token for token in tokens if not token[0].isspace()] == expected
+
+def test_romanize_lyrics_multiline_matches_single_lines():
+    """
+    Test that romanizing a whole song gives the same result as romanizing each line.
+    """
+    lines = ["夜明け前の街を歩いていた", "", "Hello 東京 tonight", "ちょっと待って！"]
+    expected = "\n".join(romanize_lyrics(line) if line else "" for line in lines)
+    assert romanize_lyrics("\n".join(lines)) == expected
+
+def test_romanize_lyrics_uses_line_cache():
+    """
+    Test that each distinct line is looked up once and only misses are romanized and stored.
+    """
+    line_cache = MagicMock()
+    line_cache.get_many.return_value = {"きっと会えるよね": "Cached romaji"}
+
+    romanized = romanize_lyrics("きっと会えるよね\nこんにちは\nこんにちは", line_cache=line_cache)
+
+    line_cache.get_many.assert_called_once_with(["きっと会えるよね", "こんにちは"])
+    line_cache.set_many.assert_called_once_with({"こんにちは": "konnichiha"})
+    assert romanized == "Cached romaji\nKonnichiha\nKonnichiha"
+
+def test_romanize_lyrics_iter_streams_lines():
+    """
+    Test that the streaming generator yields formatted lines matching romanize_lyrics.
+    """
+    lyrics = "こんにちは\n\nHello 東京\nきっと\n"
+    streamed = list(romanize_lyrics_iter(lyrics, batch_size=2))
+    assert streamed == ["Konnichiha", "", "Hello toukyou", "Kitto"]
+    assert "\n".join(streamed) == romanize_lyrics(lyrics)